@@ -0,0 +1,224 @@
+"""Month-partitioned columnar archive of glucose readings.
+
+Layout::
+
+    <root>/2025-01/id.npy  patient_id.npy  timestamp.npy  reading.npy  meta.json
+
+Each partition holds four equal-length NumPy ``.npy`` columns (int64 IDs and
+patient IDs, float64 epoch seconds and mg/dL readings) sorted by
+``(patient_id, timestamp)``, so one patient's readings are a contiguous
+slice found by binary search. Readers open the columns with
+``mmap_mode="r"``: nothing is parsed or converted, and a scan only reads
+the pages it touches. Timestamps are the naive ``glucose_logs`` values
+counted from 1970-01-01 (the same convention as ``db.expressions``).
+"""
+import json
+import os
+import shutil
+import tempfile
+from datetime import datetime, timedelta
+from itertools import chain
+
+import numpy as np
+from sqlalchemy import select, delete, func
+
+from db.expressions import epoch_seconds
+from models.glucose_log import GlucoseLog
+
+FORMAT_VERSION = 1
+COLUMNS = ("id", "patient_id", "timestamp", "reading")
+DTYPES = {"id": np.int64, "patient_id": np.int64, "timestamp": np.float64, "reading": np.float64}
+EPOCH = datetime(1970, 1, 1)
+
+
+def to_epoch(value: datetime) -> float:
+    return (value - EPOCH).total_seconds()
+
+
+def month_start(value: datetime) -> datetime:
+    return datetime(value.year, value.month, 1)
+
+
+def next_month(month: datetime) -> datetime:
+    return (month + timedelta(days=32)).replace(day=1)
+
+
+def partition_name(month: datetime) -> str:
+    return month.strftime("%Y-%m")
+
+
+def months_with_data(connection, since: datetime = None, until: datetime = None):
+    """Month starts between ``since`` and ``until`` (exclusive) that may hold readings."""
+    stmt = select(func.min(GlucoseLog.timestamp), func.max(GlucoseLog.timestamp))
+    if since is not None:
+        stmt = stmt.where(GlucoseLog.timestamp >= since)
+    if until is not None:
+        stmt = stmt.where(GlucoseLog.timestamp < until)
+    first, last = connection.execute(stmt).one()
+    if first is None:
+        return []
+    months, month = [], month_start(first)
+    while month <= last:
+        months.append(month)
+        month = next_month(month)
+    return months
+
+
+def fetch_columns(connection, start: datetime, end: datetime):
+    """Readings with ``start <= timestamp < end`` as a dict of NumPy columns (one query, no ORM)."""
+    ts = epoch_seconds(connection.dialect.name, GlucoseLog.timestamp)
+    stmt = (
+        select(GlucoseLog.id, GlucoseLog.patient_id, ts, GlucoseLog.reading)
+        .where(GlucoseLog.timestamp >= start, GlucoseLog.timestamp < end)
+    )
+    flat = np.fromiter(chain.from_iterable(connection.execute(stmt)), dtype=np.float64)
+    table = flat.reshape(-1, len(COLUMNS))
+    return {name: table[:, i].astype(DTYPES[name]) for i, name in enumerate(COLUMNS)}
+
+
+def _load(path: str, mmap: bool = True):
+    mode = "r" if mmap else None
+    return {name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode=mode) for name in COLUMNS}
+
+
+def write_partition(root: str, month: datetime, columns) -> int:
+    """Write (or merge into) the partition for ``month``; returns its total row count.
+
+    Rows already archived for the month are kept; a reading exported twice
+    (same ID) is stored once, with the newer copy winning. The partition is
+    built in a temporary directory, fsynced, then swapped into place.
+    """
+    name = partition_name(month)
+    path = os.path.join(root, name)
+    os.makedirs(root, exist_ok=True)
+    if os.path.isdir(path):
+        old = _load(path, mmap=False)
+        columns = {c: np.concatenate([old[c], columns[c]]) for c in COLUMNS}
+        # np.unique keeps the first occurrence; reverse so the newest copy is first.
+        _, keep = np.unique(columns["id"][::-1], return_index=True)
+        keep = columns["id"].size - 1 - keep
+        columns = {c: columns[c][keep] for c in COLUMNS}
+    order = np.lexsort((columns["timestamp"], columns["patient_id"]))
+    rows = int(order.size)
+
+    staging = tempfile.mkdtemp(prefix=f".{name}-", dir=root)
+    for c in COLUMNS:
+        with open(os.path.join(staging, f"{c}.npy"), "wb") as f:
+            np.save(f, np.ascontiguousarray(columns[c][order], dtype=DTYPES[c]))
+            f.flush()
+            os.fsync(f.fileno())
+    ts = columns["timestamp"]
+    meta = {
+        "format": FORMAT_VERSION,
+        "month": name,
+        "rows": rows,
+        "patients": int(np.unique(columns["patient_id"]).size),
+        "first": (EPOCH + timedelta(seconds=float(ts.min()))).isoformat() if rows else None,
+        "last": (EPOCH + timedelta(seconds=float(ts.max()))).isoformat() if rows else None,
+    }
+    with open(os.path.join(staging, "meta.json"), "w") as f:
+        json.dump(meta, f, indent=2)
+        f.flush()
+        os.fsync(f.fileno())
+
+    if os.path.isdir(path):
+        retired = f"{staging}.old"
+        os.rename(path, retired)
+        os.rename(staging, path)
+        shutil.rmtree(retired)
+    else:
+        os.rename(staging, path)
+    return rows
+
+
+def export_readings(connection, root: str, since: datetime = None, until: datetime = None):
+    """Copy readings in ``[since, until)`` into month partitions; yields ``(month, rows_exported)``."""
+    for month in months_with_data(connection, since, until):
+        start = max(month, since) if since else month
+        end = min(next_month(month), until) if until else next_month(month)
+        columns = fetch_columns(connection, start, end)
+        if columns["id"].size:
+            write_partition(root, month, columns)
+            yield month, int(columns["id"].size)
+
+
+def archive_readings(engine, root: str, before: datetime):
+    """Move readings older than ``before`` out of ``glucose_logs`` into the archive.
+
+    Each month is exported and fsynced before its rows are deleted (Core
+    ``DELETE``, one transaction per month, limited to the IDs just written so
+    readings logged meanwhile are never lost). ``glucose_rollups`` is left
+    alone on purpose: dashboards and lists keep counting archived history.
+    Yields ``(month, rows_moved, patient_ids)``.
+    """
+    with engine.connect() as connection:
+        months = months_with_data(connection, until=before)
+    for month in months:
+        end = min(next_month(month), before)
+        with engine.connect() as connection:
+            columns = fetch_columns(connection, month, end)
+        if not columns["id"].size:
+            continue
+        write_partition(root, month, columns)
+        with engine.begin() as connection:
+            connection.execute(
+                delete(GlucoseLog).where(
+                    GlucoseLog.timestamp >= month,
+                    GlucoseLog.timestamp < end,
+                    GlucoseLog.id <= int(columns["id"].max()),
+                )
+            )
+        yield month, int(columns["id"].size), {int(pid) for pid in np.unique(columns["patient_id"])}
+
+
+class GlucoseArchive:
+    """Memory-mapped read access to an archive directory."""
+
+    def __init__(self, root: str):
+        self.root = root
+        self._open = {}
+
+    def partitions(self, since: datetime = None, until: datetime = None):
+        """Partition names overlapping ``[since, until)``, oldest first."""
+        if not os.path.isdir(self.root):
+            return []
+        names = sorted(
+            entry for entry in os.listdir(self.root)
+            if not entry.startswith(".") and os.path.isfile(os.path.join(self.root, entry, "meta.json"))
+        )
+        low = partition_name(since) if since else None
+        high = until and partition_name(until - timedelta(microseconds=1))
+        return [n for n in names if (low is None or n >= low) and (high is None or n <= high)]
+
+    def meta(self, name: str) -> dict:
+        with open(os.path.join(self.root, name, "meta.json")) as f:
+            return json.load(f)
+
+    def columns(self, name: str):
+        """The partition's columns as read-only memory maps."""
+        if name not in self._open:
+            self._open[name] = _load(os.path.join(self.root, name))
+        return self._open[name]
+
+    def patient_ids(self, since: datetime = None, until: datetime = None):
+        ids = [np.unique(self.columns(n)["patient_id"]) for n in self.partitions(since, until)]
+        return np.unique(np.concatenate(ids)).tolist() if ids else []
+
+    def patient_arrays(self, patient_id: int, since: datetime = None, until: datetime = None):
+        """``(timestamps, readings)`` for one patient in time order, sliced out of each partition."""
+        ts_parts, reading_parts = [], []
+        lo_ts = to_epoch(since) if since else -np.inf
+        hi_ts = to_epoch(until) if until else np.inf
+        for name in self.partitions(since, until):
+            cols = self.columns(name)
+            pids = cols["patient_id"]
+            lo, hi = np.searchsorted(pids, patient_id, "left"), np.searchsorted(pids, patient_id, "right")
+            if lo == hi:
+                continue
+            ts = cols["timestamp"][lo:hi]
+            a, b = np.searchsorted(ts, lo_ts, "left"), np.searchsorted(ts, hi_ts, "left")
+            ts_parts.append(ts[a:b])
+            reading_parts.append(cols["reading"][lo:hi][a:b])
+        if not ts_parts:
+            return np.empty(0), np.empty(0)
+        return np.concatenate(ts_parts), np.concatenate(reading_parts)
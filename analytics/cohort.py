@@ -0,0 +1,65 @@
+import heapq
+import json
+from concurrent.futures import ProcessPoolExecutor
+
+from analytics.glycemic import patient_reports
+from db.setup import make_engine
+
+# One engine per worker process, created by the pool initializer.
+_worker_engine = None
+
+
+def _init_worker(database_url: str):
+    global _worker_engine
+    _worker_engine = make_engine(database_url)
+
+
+def _report_chunk(patient_ids):
+    with _worker_engine.connect() as connection:
+        return [report._asdict() for report in patient_reports(connection, patient_ids)]
+
+
+def iter_chunks(pages, chunk_size: int):
+    """Regroup pages of patient IDs into lists of ``chunk_size``."""
+    chunk = []
+    for page in pages:
+        for pid in page:
+            chunk.append(pid)
+            if len(chunk) == chunk_size:
+                yield chunk
+                chunk = []
+    if chunk:
+        yield chunk
+
+
+def run_cohort(database_url: str, chunks, workers: int = None):
+    """Yield report dicts for every chunk, computed on a process pool.
+
+    Chunks are submitted up front and results come back in submission order,
+    so with ID-ordered chunks the output is ordered by patient ID and
+    identical from run to run regardless of worker count or scheduling.
+    """
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(database_url,)) as pool:
+        for reports in pool.map(_report_chunk, chunks):
+            yield from reports
+
+
+def merge_report_files(streams, out):
+    """Merge ID-ordered NDJSON report streams into one ID-ordered stream.
+
+    Files are read lazily (``heapq.merge``); if two inputs report the same
+    patient, the copy from the later input wins.
+    """
+    def keyed(index, stream):
+        for line in stream:
+            if line.strip():
+                record = json.loads(line)
+                yield record["patient_id"], index, record
+
+    previous = None
+    for pid, _, record in heapq.merge(*(keyed(i, s) for i, s in enumerate(streams))):
+        if previous is not None and previous[0] != pid:
+            out.write(json.dumps(previous[1]) + "\n")
+        previous = (pid, record)
+    if previous is not None:
+        out.write(json.dumps(previous[1]) + "\n")
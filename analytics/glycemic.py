@@ -0,0 +1,140 @@
+from itertools import chain
+from typing import NamedTuple
+
+import numpy as np
+from sqlalchemy import select
+
+from db.expressions import epoch_seconds
+from models.glucose_log import GlucoseLog, TARGET_LOW, TARGET_HIGH
+
+# Consensus thresholds (mg/dL) beyond the 70-180 target range.
+LEVEL2_LOW = 54.0
+LEVEL2_HIGH = 250.0
+
+
+class GlycemicReport(NamedTuple):
+    patient_id: int
+    count: int = 0
+    days: float = 0.0
+    mean: float = 0.0
+    sd: float = 0.0
+    cv: float = 0.0          # % (SD / mean)
+    gmi: float = 0.0         # % glucose management indicator
+    ea1c: float = 0.0        # % estimated HbA1c (ADAG)
+    tir: float = 0.0         # % readings 70-180
+    tar: float = 0.0         # % readings > 180
+    tar_level2: float = 0.0  # % readings > 250
+    tbr: float = 0.0         # % readings < 70
+    tbr_level2: float = 0.0  # % readings < 54
+    mage: float = 0.0
+    trend: float = 0.0       # mg/dL per week, least-squares slope
+
+
+REPORT_HEADERS = ["Patient ID", "Readings", "Days", "Mean", "SD", "CV %", "GMI %", "eA1c %",
+                  "TIR %", "TAR %", "TAR>250 %", "TBR %", "TBR<54 %", "MAGE", "Trend/wk"]
+
+
+def _readings_stmt(dialect_name: str, patient_ids):
+    ts = epoch_seconds(dialect_name, GlucoseLog.timestamp)
+    return (
+        select(GlucoseLog.patient_id, ts, GlucoseLog.reading)
+        .where(GlucoseLog.patient_id.in_(list(patient_ids)), GlucoseLog.timestamp.is_not(None))
+        .order_by(GlucoseLog.patient_id, GlucoseLog.timestamp)
+    )
+
+
+def load_arrays(connection, patient_ids):
+    """Fetch readings for ``patient_ids`` in one query into three parallel arrays.
+
+    Returns ``(patient_id int64, epoch_seconds float64, reading float64)``
+    sorted by patient then time. Rows go straight from the cursor into a
+    flat float buffer; no ORM objects or per-row datetimes are built.
+    """
+    result = connection.execute(_readings_stmt(connection.dialect.name, patient_ids))
+    flat = np.fromiter(chain.from_iterable(result), dtype=np.float64)
+    table = flat.reshape(-1, 3)
+    return table[:, 0].astype(np.int64), table[:, 1], table[:, 2]
+
+
+def split_by_patient(pids, ts, readings):
+    """Yield ``(patient_id, ts, readings)`` views for each contiguous patient run."""
+    if pids.size == 0:
+        return
+    bounds = np.flatnonzero(np.diff(pids)) + 1
+    starts = np.r_[0, bounds]
+    ends = np.r_[bounds, pids.size]
+    for lo, hi in zip(starts, ends):
+        yield int(pids[lo]), ts[lo:hi], readings[lo:hi]
+
+
+def mage(readings: np.ndarray, sd: float) -> float:
+    """Mean amplitude of glycemic excursions.
+
+    Turning points come from sign changes of the first difference (flat runs
+    collapsed); MAGE is the mean peak-to-nadir swing among swings larger than
+    one SD. This is the common vectorised approximation of Service's method.
+    """
+    if readings.size < 3 or sd == 0:
+        return 0.0
+    step = np.diff(readings)
+    moving = readings[np.r_[True, step != 0]]
+    if moving.size < 3:
+        return 0.0
+    direction = np.sign(np.diff(moving))
+    turns = np.flatnonzero(direction[1:] != direction[:-1]) + 1
+    extrema = moving[np.r_[0, turns, moving.size - 1]]
+    swings = np.abs(np.diff(extrema))
+    swings = swings[swings > sd]
+    return float(swings.mean()) if swings.size else 0.0
+
+
+def weekly_trend(ts: np.ndarray, readings: np.ndarray) -> float:
+    """Least-squares slope of reading over time, in mg/dL per week."""
+    if readings.size < 2:
+        return 0.0
+    weeks = (ts - ts[0]) / (7 * 86400.0)
+    spread = weeks - weeks.mean()
+    denom = float(np.dot(spread, spread))
+    if denom == 0:
+        return 0.0
+    return float(np.dot(spread, readings - readings.mean()) / denom)
+
+
+def compute_report(patient_id: int, ts: np.ndarray, readings: np.ndarray) -> GlycemicReport:
+    """All metrics for one patient's time-ordered arrays, fully vectorised."""
+    n = int(readings.size)
+    if n == 0:
+        return GlycemicReport(patient_id=patient_id)
+    mean = float(readings.mean())
+    sd = float(readings.std())
+
+    def pct(mask):
+        return round(100.0 * np.count_nonzero(mask) / n, 1)
+
+    return GlycemicReport(
+        patient_id=patient_id,
+        count=n,
+        days=round(float(ts[-1] - ts[0]) / 86400.0, 1),
+        mean=round(mean, 1),
+        sd=round(sd, 1),
+        cv=round(100.0 * sd / mean, 1) if mean else 0.0,
+        gmi=round(3.31 + 0.02392 * mean, 2),
+        ea1c=round((mean + 46.7) / 28.7, 2),
+        tir=pct((readings >= TARGET_LOW) & (readings <= TARGET_HIGH)),
+        tar=pct(readings > TARGET_HIGH),
+        tar_level2=pct(readings > LEVEL2_HIGH),
+        tbr=pct(readings < TARGET_LOW),
+        tbr_level2=pct(readings < LEVEL2_LOW),
+        mage=round(mage(readings, sd), 1),
+        trend=round(weekly_trend(ts, readings), 2),
+    )
+
+
+def patient_reports(connection, patient_ids):
+    """Reports for ``patient_ids`` (one query); patients without readings get empty reports."""
+    found = {pid: compute_report(pid, ts, r) for pid, ts, r in split_by_patient(*load_arrays(connection, patient_ids))}
+    return [found.get(pid, GlycemicReport(patient_id=pid)) for pid in patient_ids]
+
+
+def report_row(report: GlycemicReport):
+    return list(report)
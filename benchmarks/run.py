@@ -0,0 +1,186 @@
+"""Time the CLI/model hot paths against a synthetic database.
+
+    python -m benchmarks.run --patients 200 --days 14 -o bench.json
+    python -m benchmarks.run --database-url sqlite:///big.db --reuse -o bench.json
+"""
+import contextlib
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime, timedelta
+
+import click
+import sqlalchemy
+from sqlalchemy import func, select
+from sqlalchemy.orm import sessionmaker
+
+from db.setup import Base, make_engine
+from db.unit_of_work import uow
+from models.patient import Patient
+from models.glucose_log import GlucoseLog
+from cli.listing import patient_rows, glucose_rows, GLUCOSE_HEADERS
+from cli.render import RowWriter
+from benchmarks.synthetic import populate
+
+
+def _timed(fn, repeat: int):
+    samples = []
+    ops = 0
+    for _ in range(repeat):
+        started = time.perf_counter()
+        ops = fn()
+        samples.append(time.perf_counter() - started)
+    best = min(samples)
+    return {
+        "ops": ops,
+        "best_s": round(best, 6),
+        "median_s": round(statistics.median(samples), 6),
+        "ops_per_s": round(ops / best, 1) if best > 0 and ops else None,
+    }
+
+
+def _git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmarks(Session, repeat: int, range_hours: int, inserts: int):
+    results = {}
+    session = Session()
+    try:
+        latest = session.scalar(select(func.max(GlucoseLog.timestamp)))
+        end = latest or datetime.now()
+        start = end - timedelta(hours=range_hours)
+
+        def patient_list_per_patient_avg():
+            patients = Patient.get_all(session)
+            for p in patients:
+                p.average_glucose
+            session.expunge_all()
+            return len(patients)
+
+        def patient_list_paged():
+            n = 0
+            for page in Patient.iter_all(session):
+                n += len(patient_rows(session, page))
+            session.expunge_all()
+            return n
+
+        def find_by_date_range():
+            n = len(GlucoseLog.find_by_date_range(session, start, end))
+            session.expunge_all()
+            return n
+
+        def find_by_name():
+            n = 0
+            for term in ("kim", "Wanjiru", "ach", "zzz"):
+                n += len(Patient.find_by_name(session, term))
+            session.expunge_all()
+            return n
+
+        def render_glucose_list():
+            writer = RowWriter(GLUCOSE_HEADERS, "csv")
+            with open(os.devnull, "w") as sink, contextlib.redirect_stdout(sink):
+                for page in GlucoseLog.iter_all(session, limit=100000):
+                    writer.write_page(glucose_rows(page))
+            session.expunge_all()
+            return writer.count
+
+        results["patient_list_per_patient_avg"] = _timed(patient_list_per_patient_avg, repeat)
+        results["patient_list_paged"] = _timed(patient_list_paged, repeat)
+        results[f"find_by_date_range_{range_hours}h"] = _timed(find_by_date_range, repeat)
+        results["find_by_name"] = _timed(find_by_name, repeat)
+        results["render_glucose_list_100k"] = _timed(render_glucose_list, repeat)
+
+        # Writes go to a throwaway patient so the dataset stays the same between runs.
+        scratch = Patient.create(session, name="Benchmark Scratch", date_of_birth=datetime(1980, 1, 1).date())
+        base = datetime(2000, 1, 1)
+
+        def insert_per_row():
+            for i in range(inserts):
+                GlucoseLog.create(session, scratch, 100.0 + i % 50, base + timedelta(minutes=5 * i))
+            return inserts
+
+        def insert_per_row_uow():
+            with uow(session):
+                for i in range(inserts):
+                    GlucoseLog.create(session, scratch, 100.0 + i % 50, base + timedelta(days=1, minutes=5 * i))
+            return inserts
+
+        def insert_bulk():
+            rows = [{"patient_id": scratch.id, "reading": 100.0 + i % 50, "timestamp": base + timedelta(minutes=5 * i)}
+                    for i in range(inserts * 10)]
+            return GlucoseLog.bulk_create(session, rows)
+
+        results["insert_per_row"] = _timed(insert_per_row, 1)
+        results["insert_per_row_uow"] = _timed(insert_per_row_uow, 1)
+        results["insert_bulk"] = _timed(insert_bulk, 1)
+        scratch.delete(session)
+    finally:
+        session.close()
+    return results
+
+
+@click.command()
+@click.option("--database-url", default="sqlite:///benchmark.db", show_default=True,
+              help="Database to benchmark (never point this at real data)")
+@click.option("--patients", type=click.IntRange(min=1), default=100, show_default=True)
+@click.option("--days", type=click.IntRange(min=1), default=7, show_default=True, help="Days of readings per patient")
+@click.option("--interval-minutes", type=click.IntRange(min=1), default=5, show_default=True, help="CGM cadence")
+@click.option("--seed", type=int, default=42, show_default=True)
+@click.option("--reuse", is_flag=True, help="Benchmark the existing database instead of regenerating it")
+@click.option("--repeat", type=click.IntRange(min=1), default=3, show_default=True)
+@click.option("--range-hours", type=click.IntRange(min=1), default=24, show_default=True,
+              help="Window for the date-range query")
+@click.option("--inserts", type=click.IntRange(min=1), default=200, show_default=True,
+              help="Rows for the per-row insert test (bulk uses 10x)")
+@click.option("--output", "-o", type=click.File("w"), default="-", show_default=True, help="JSON results file")
+def main(database_url, patients, days, interval_minutes, seed, reuse, repeat, range_hours, inserts, output):
+    """Generate a synthetic dataset and time the hot paths."""
+    engine = make_engine(database_url)
+    Session = sessionmaker(bind=engine)
+    dataset = None
+    if not reuse:
+        Base.metadata.drop_all(engine)
+        Base.metadata.create_all(engine)
+        session = Session()
+        started = time.perf_counter()
+        try:
+            dataset = populate(
+                session, patients, days, interval_minutes, seed,
+                progress=lambda c: click.echo(f"\r  generated {c['readings']:,} readings", nl=False, err=True),
+            )
+        finally:
+            session.close()
+        click.echo("", err=True)
+        dataset["seconds"] = round(time.perf_counter() - started, 2)
+    else:
+        Base.metadata.create_all(engine)
+
+    report = {
+        "meta": {
+            "git_revision": _git_revision(),
+            "run_at": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "sqlalchemy": sqlalchemy.__version__,
+            "database": engine.url.render_as_string(hide_password=True),
+            "params": {"patients": patients, "days": days, "interval_minutes": interval_minutes, "seed": seed,
+                       "repeat": repeat, "range_hours": range_hours, "inserts": inserts, "reuse": reuse},
+        },
+        "dataset": dataset,
+        "results": run_benchmarks(Session, repeat, range_hours, inserts),
+    }
+    json.dump(report, output, indent=2)
+    output.write("\n")
+    engine.dispose()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
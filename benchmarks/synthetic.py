@@ -0,0 +1,84 @@
+"""Synthetic patients and CGM-like glucose readings for benchmarking."""
+from datetime import date, datetime, timedelta
+
+import numpy as np
+
+from models.patient import Patient
+from models.glucose_log import GlucoseLog
+from models.medication import Medication
+
+FIRST_NAMES = ["Amina", "Brian", "Chloe", "David", "Esther", "Faith", "George", "Hassan", "Irene", "James",
+               "Kamau", "Lucy", "Moses", "Njeri", "Otieno", "Peter", "Quincy", "Rose", "Samuel", "Wanjiru"]
+LAST_NAMES = ["Achieng", "Barasa", "Chege", "Kariuki", "Kimani", "Mutua", "Mwangi", "Njoroge", "Ochieng",
+              "Odhiambo", "Omondi", "Otieno", "Wafula", "Wambui", "Wanjala"]
+DRUGS = [("Metformin", "500mg twice daily"), ("Insulin glargine", "20 units at night"), ("Glipizide", "5mg daily"),
+         ("Sitagliptin", "100mg daily"), ("Empagliflozin", "10mg daily")]
+
+
+def patient_rows(count: int, rng: np.random.Generator):
+    first = rng.integers(len(FIRST_NAMES), size=count)
+    last = rng.integers(len(LAST_NAMES), size=count)
+    ages = rng.integers(8 * 365, 85 * 365, size=count)
+    today = date.today()
+    return [
+        {
+            "name": f"{FIRST_NAMES[f]} {LAST_NAMES[l]}",
+            "date_of_birth": today - timedelta(days=int(a)),
+            "contact": f"{FIRST_NAMES[f].lower()}.{LAST_NAMES[l].lower()}{i}@example.com",
+        }
+        for i, (f, l, a) in enumerate(zip(first, last, ages))
+    ]
+
+
+def cgm_readings(start: datetime, days: int, interval_minutes: int, rng: np.random.Generator):
+    """``(timestamps, readings)`` for one patient at a fixed CGM cadence.
+
+    A per-patient baseline, a daily meal/dawn cycle and smoothed sensor
+    noise (white noise convolved with a short moving average, so neighbouring
+    readings are correlated the way CGM traces are), clipped to 40-400 mg/dL.
+    """
+    n = days * 24 * 60 // interval_minutes
+    minutes = np.arange(n) * interval_minutes
+    baseline = rng.normal(140, 25)
+    hour = (minutes / 60.0) % 24
+    cycle = 35 * np.sin((hour - 6) / 24 * 2 * np.pi) + 25 * np.exp(-((hour % 6) - 1.5) ** 2)
+    kernel = np.ones(6) / np.sqrt(6)
+    noise = np.convolve(rng.normal(0, 8, size=n), kernel, mode="same")
+    readings = np.clip(baseline + cycle + noise, 40, 400).round(1)
+    timestamps = [start + timedelta(minutes=int(m)) for m in minutes]
+    return timestamps, readings
+
+
+def populate(session, patients: int, days: int, interval_minutes: int = 5, seed: int = 42,
+             batch_size: int = 20000, progress=None) -> dict:
+    """Insert ``patients`` synthetic patients with ``days`` of readings each."""
+    rng = np.random.default_rng(seed)
+    start = datetime.combine(date.today() - timedelta(days=days), datetime.min.time())
+    inserted = {"patients": 0, "readings": 0, "medications": 0}
+    for offset in range(0, patients, 1000):
+        rows = patient_rows(min(1000, patients - offset), rng)
+        created = [Patient(**row) for row in rows]
+        session.add_all(created)
+        session.flush()
+        meds = []
+        for p in created:
+            name, dosage = DRUGS[int(rng.integers(len(DRUGS)))]
+            meds.append(Medication(name=name, dosage=dosage, start_date=start.date(), patient_id=p.id))
+        session.add_all(meds)
+        session.commit()
+        inserted["patients"] += len(created)
+        inserted["medications"] += len(meds)
+
+        batch = []
+        for p in created:
+            timestamps, readings = cgm_readings(start, days, interval_minutes, rng)
+            batch.extend({"patient_id": p.id, "reading": float(r), "timestamp": t} for t, r in zip(timestamps, readings))
+            if len(batch) >= batch_size:
+                inserted["readings"] += GlucoseLog.bulk_create(session, batch)
+                batch = []
+                if progress:
+                    progress(inserted)
+        inserted["readings"] += GlucoseLog.bulk_create(session, batch)
+        if progress:
+            progress(inserted)
+    return inserted
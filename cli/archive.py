@@ -0,0 +1,98 @@
+#export-glucose / archive-glucose / archive-report
+#Month-partitioned columnar files for historical readings, read back via mmap
+
+import os
+import time
+from datetime import datetime
+
+import click
+from sqlalchemy.exc import SQLAlchemyError
+from db.setup import engine
+from models.patient_summary import invalidate
+from analytics.archive import export_readings, archive_readings, GlucoseArchive, partition_name
+from analytics.glycemic import compute_report, report_row, REPORT_HEADERS
+from cli.render import RowWriter, FORMATS
+
+ARCHIVE_DIR = os.getenv("GLUCOSE_ARCHIVE_DIR", "archive")
+
+
+def _archive_dir_option(func):
+    return click.option("--archive-dir", type=click.Path(file_okay=False), default=ARCHIVE_DIR, show_default=True,
+                        help="Archive root (env GLUCOSE_ARCHIVE_DIR)")(func)
+
+
+def _date(ctx, param, value):
+    if value is None:
+        return None
+    try:
+        return datetime.strptime(value, "%Y-%m-%d")
+    except ValueError:
+        raise click.BadParameter("use YYYY-MM-DD")
+
+
+@click.command("export-glucose")
+@_archive_dir_option
+@click.option("--since", callback=_date, help="First day to export (YYYY-MM-DD)")
+@click.option("--until", callback=_date, help="Export readings before this day (YYYY-MM-DD)")
+def export_glucose(archive_dir, since, until):
+    """Copy glucose readings into month-partitioned columnar files (rows stay in the database)."""
+    started = time.perf_counter()
+    total = 0
+    try:
+        with engine.connect() as connection:
+            for month, rows in export_readings(connection, archive_dir, since, until):
+                click.echo(f"✅ {partition_name(month)}: {rows:,} reading(s)")
+                total += rows
+    except SQLAlchemyError as e:
+        click.echo(f"❌ Database error: {e}")
+        return
+    if not total:
+        click.echo("⚠️ No readings in that range.")
+        return
+    click.echo(f"Exported {total:,} reading(s) to {archive_dir} in {time.perf_counter() - started:.2f}s.")
+
+
+@click.command("archive-glucose")
+@_archive_dir_option
+@click.option("--before", required=True, callback=_date, help="Move readings older than this day (YYYY-MM-DD)")
+@click.option("--yes", is_flag=True, help="Do not ask for confirmation")
+def archive_glucose(archive_dir, before, yes):
+    """Move old glucose readings out of the database into the archive."""
+    if not yes and not click.confirm(
+        f"Move readings before {before:%Y-%m-%d} to {archive_dir} and delete them from the database?"
+    ):
+        return
+    total = 0
+    try:
+        for month, rows, patient_ids in archive_readings(engine, archive_dir, before):
+            invalidate(patient_ids)  # recent-log lists may have included archived readings
+            click.echo(f"✅ {partition_name(month)}: moved {rows:,} reading(s)")
+            total += rows
+    except SQLAlchemyError as e:
+        click.echo(f"❌ Database error: {e}")
+        return
+    if not total:
+        click.echo("⚠️ No readings to archive.")
+        return
+    click.echo(f"Archived {total:,} reading(s). Glucose rollups still include them; "
+               "avoid rebuild-rollups unless you want archived history dropped from the stats.")
+
+
+@click.command("archive-report")
+@_archive_dir_option
+@click.option("--patient-id", "patient_ids", type=int, multiple=True, help="Patient to report on (repeatable)")
+@click.option("--all", "all_patients", is_flag=True, help="Report on every archived patient")
+@click.option("--since", callback=_date, help="First day to include (YYYY-MM-DD)")
+@click.option("--until", callback=_date, help="Include readings before this day (YYYY-MM-DD)")
+@click.option("--format", "fmt", type=click.Choice(FORMATS), default="table", show_default=True)
+def archive_report(archive_dir, patient_ids, all_patients, since, until, fmt):
+    """Glycemic report computed straight from the memory-mapped archive."""
+    if not patient_ids and not all_patients:
+        raise click.UsageError("Pass --patient-id or --all.")
+    archive = GlucoseArchive(archive_dir)
+    if not archive.partitions(since, until):
+        click.echo(f"⚠️ No archived months in {archive_dir} for that range.")
+        return
+    ids = archive.patient_ids(since, until) if all_patients else list(patient_ids)
+    writer = RowWriter(REPORT_HEADERS, fmt)
+    writer.write_page(report_row(compute_report(pid, *archive.patient_arrays(pid, since, until))) for pid in ids)
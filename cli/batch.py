@@ -0,0 +1,436 @@
+#batch
+#Run a JSON-lines file of operations in one session: grouped commits,
+#coalesced glucose writes, pipelined patient reads and per-operation latency
+
+import json
+import time
+from datetime import datetime
+
+import click
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+from db.setup import Session
+from db.unit_of_work import uow, begin_explicit
+from models.patient import Patient, RECENT_LOGS
+from models.glucose_log import GlucoseLog, parse_timestamp
+from models.glucose_series import GlucoseSeries
+from models.medication import Medication
+from models.patient_summary import patient_summaries, stats_by_patient, disable_fill
+
+GROUP_SIZE = 500
+PIPELINE = 100
+LIST_LIMIT = 1000
+STATS_HEADERS = ["Op", "Count", "Errors", "Total ms", "Avg ms", "p95 ms"]
+
+
+class OpError(ValueError):
+    """An operation that could not run; reported on its output line."""
+
+
+class _Rollback(Exception):
+    """Ends a group without committing (--dry-run)."""
+
+
+# ----- payload fields -----
+def _get(op, name, required=True):
+    value = op.get(name)
+    if value is None and required:
+        raise OpError(f"missing field {name!r}")
+    return value
+
+
+def _id(op, name, aliases, required=True):
+    """An integer ID, or ``"$alias"`` naming a row created earlier in the batch (its ``"as"``)."""
+    value = _get(op, name, required)
+    if value is None:
+        return None
+    if isinstance(value, str) and value.startswith("$"):
+        if value[1:] not in aliases:
+            raise OpError(f"unknown alias {value!r}")
+        return aliases[value[1:]]
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        raise OpError(f"{name} must be an integer or $alias, got {value!r}")
+
+
+def _count(op, name, default, minimum=1):
+    value = op.get(name)
+    if value is None:
+        return default
+    try:
+        value = int(value)
+    except (TypeError, ValueError):
+        raise OpError(f"{name} must be an integer, got {value!r}")
+    if value < minimum:
+        raise OpError(f"{name} must be at least {minimum}, got {value}")
+    return value
+
+
+def _day(op, name, required=False):
+    value = _get(op, name, required)
+    try:
+        return datetime.strptime(value, "%Y-%m-%d").date() if value is not None else None
+    except (TypeError, ValueError):
+        raise OpError(f"{name} must be YYYY-MM-DD, got {value!r}")
+
+
+def _moment(op, name):
+    value = op.get(name)
+    try:
+        return parse_timestamp(value) if value is not None else None
+    except (TypeError, ValueError):
+        raise OpError(f"{name} must be an ISO date/time, got {value!r}")
+
+
+def _found(instance, what, id_):
+    if instance is None:
+        raise OpError(f"No {what} found with ID {id_}")
+    return instance
+
+
+# ----- single operations: fn(session, op, aliases) -> result -----
+def add_patient(session, op, aliases):
+    patient = Patient.create(session, name=str(_get(op, "name")), date_of_birth=_day(op, "date_of_birth", True),
+                             contact=str(op.get("contact") or ""))
+    return {"id": patient.id}
+
+
+def delete_patient(session, op, aliases):
+    pid = _id(op, "patient_id", aliases)
+    _found(Patient.get_by_id(session, pid), "patient", pid).delete(session)
+    return {"id": pid}
+
+
+def delete_glucose(session, op, aliases):
+    log_id = _id(op, "log_id", aliases)
+    _found(GlucoseLog.get_by_id(session, log_id), "glucose log", log_id).delete(session)
+    return {"id": log_id}
+
+
+def add_medication(session, op, aliases):
+    pid = _id(op, "patient_id", aliases)
+    med = Medication.create(session, patient=_found(Patient.get_by_id(session, pid), "patient", pid),
+                            name=str(_get(op, "name")), dosage=str(op.get("dosage") or ""),
+                            start_date=_day(op, "start_date"), end_date=_day(op, "end_date"))
+    return {"id": med.id}
+
+
+def stop_medication(session, op, aliases):
+    med_id = _id(op, "medication_id", aliases)
+    med = _found(Medication.get_by_id(session, med_id), "medication", med_id)
+    med.stop(session, _day(op, "end_date"))
+    return {"id": med.id, "end_date": med.end_date}
+
+
+def delete_medication(session, op, aliases):
+    med_id = _id(op, "medication_id", aliases)
+    _found(Medication.get_by_id(session, med_id), "medication", med_id).delete(session)
+    return {"id": med_id}
+
+
+def find_patient(session, op, aliases):
+    limit = _count(op, "limit", 50)
+    return [{"id": p.id, "name": p.name, "date_of_birth": p.date_of_birth}
+            for p in Patient.find_by_name(session, str(_get(op, "name")), limit)]
+
+
+def list_glucose(session, op, aliases):
+    limit = _count(op, "limit", LIST_LIMIT)
+    pages = GlucoseSeries.iter_pages(session, patient_id=_id(op, "patient_id", aliases, required=False),
+                                     start=_moment(op, "since"), end=_moment(op, "until"), limit=limit)
+    return [r._asdict() for page in pages for r in page]
+
+
+def patients_on(session, op, aliases):
+    return [{"id": p.id, "name": p.name}
+            for p in Medication.patients_on(session, str(_get(op, "drug")), _day(op, "at"))]
+
+
+def glucose_stats(session, op, aliases):
+    ids = _get(op, "patient_ids")
+    if not isinstance(ids, list):
+        raise OpError("patient_ids must be a list")
+    pids = [_id({"id": v}, "id", aliases) for v in ids]
+    return {pid: stats._asdict() for pid, stats in stats_by_patient(session, pids).items()}
+
+
+WRITES = {
+    "add-patient": add_patient,
+    "delete-patient": delete_patient,
+    "delete-glucose": delete_glucose,
+    "add-medication": add_medication,
+    "stop-medication": stop_medication,
+    "delete-medication": delete_medication,
+}
+READS = {
+    "find-patient": find_patient,
+    "list-glucose": list_glucose,
+    "patients-on": patients_on,
+    "glucose-stats": glucose_stats,
+}
+
+
+# ----- runs: consecutive ops of one kind executed together; fn(session, ops, aliases) -> [result | OpError] -----
+def log_glucose_run(session, ops, aliases):
+    """Readings from consecutive ``log-glucose`` ops in one multi-row insert."""
+    rows, results = [], []
+    for op in ops:
+        try:
+            reading = float(_get(op, "reading"))
+            if reading <= 0:
+                raise OpError("Reading must be positive.")
+            row = {"patient_id": _id(op, "patient_id", aliases), "reading": reading,
+                   "timestamp": _moment(op, "timestamp") or datetime.now()}
+        except (TypeError, ValueError) as e:
+            results.append(e if isinstance(e, OpError) else OpError(str(e)))
+            continue
+        rows.append(row)
+        results.append(row)
+    known = set(session.scalars(select(Patient.id).where(Patient.id.in_({r["patient_id"] for r in rows}))))
+    results = [r if isinstance(r, OpError) or r["patient_id"] in known
+               else OpError(f"No patient found with ID {r['patient_id']}") for r in results]
+    good = [r for r in results if not isinstance(r, OpError)]
+    try:
+        with session.begin_nested():
+            GlucoseLog.bulk_insert(session, good)
+        return results
+    except IntegrityError:
+        pass
+    # Something in the run violates a constraint: isolate it row by row.
+    checked = []
+    for r in results:
+        if not isinstance(r, OpError):
+            try:
+                with session.begin_nested():
+                    GlucoseLog.bulk_insert(session, [r])
+            except IntegrityError as e:
+                r = OpError(f"Rejected: {e.orig}")
+        checked.append(r)
+    return checked
+
+
+def view_patient_run(session, ops, aliases):
+    """Consecutive ``view-patient`` ops answered together (``patient_summaries``)."""
+    wanted = []
+    for op in ops:
+        try:
+            wanted.append((_id(op, "patient_id", aliases), _count(op, "recent", RECENT_LOGS, minimum=0)))
+        except OpError as e:
+            wanted.append(e)
+    found = {}
+    for recent in {w[1] for w in wanted if not isinstance(w, OpError)}:
+        ids = [w[0] for w in wanted if not isinstance(w, OpError) and w[1] == recent]
+        found[recent] = patient_summaries(session, ids, recent)
+    results = []
+    for w in wanted:
+        if isinstance(w, OpError):
+            results.append(w)
+            continue
+        summary = found[w[1]].get(w[0])
+        if summary is None:
+            results.append(OpError(f"No patient found with ID {w[0]}"))
+        else:
+            results.append({
+                "id": summary.id, "name": summary.name, "date_of_birth": summary.date_of_birth,
+                "contact": summary.contact, "age": summary.age, "stats": summary.stats._asdict(),
+                "medications": [m._asdict() for m in summary.medications],
+                "recent": [g._asdict() for g in summary.recent_logs],
+            })
+    return results
+
+
+RUNS = {"log-glucose": (log_glucose_run, True), "view-patient": (view_patient_run, False)}
+OPS = sorted([*WRITES, *READS, *RUNS])
+
+
+def _parse(lines):
+    """Yield ``(line_no, op_name, payload, error)`` for each non-blank input line."""
+    for line_no, line in enumerate(lines, start=1):
+        if not line.strip():
+            continue
+        try:
+            payload = json.loads(line)
+        except ValueError as e:
+            yield line_no, None, None, f"invalid JSON: {e}"
+            continue
+        name = payload.get("op") if isinstance(payload, dict) else None
+        if name not in WRITES and name not in READS and name not in RUNS:
+            yield line_no, name, None, f"Unknown op {name!r}"
+            continue
+        yield line_no, name, payload, None
+
+
+def _coalesce(items, size: int):
+    """Group consecutive ops that run together (``RUNS``) into lists of up to ``size``."""
+    run = []
+    for item in items:
+        if run and (item[1] != run[0][1] or len(run) >= size):
+            yield run
+            run = []
+        if item[3] is None and item[1] in RUNS:
+            run.append(item)
+        else:
+            yield [item]
+    if run:
+        yield run
+
+
+class BatchRunner:
+    """Executes parsed ops in groups of ``group_size`` writes, one transaction per group."""
+
+    def __init__(self, session, group_size: int = GROUP_SIZE, pipeline: int = PIPELINE, dry_run: bool = False,
+                 emit=None):
+        self.session = session
+        disable_fill(session)  # reads inside an open group may see writes that are later rolled back
+        self.group_size = group_size
+        self.pipeline = pipeline
+        self.dry_run = dry_run
+        self.emit = emit or (lambda record: None)
+        self.aliases = {}
+        self.timings = {}   # op -> [ms, ...]
+        self.errors = {}    # op -> count
+        self.commits = []   # ms per commit
+        self._records = []
+        self._writes = 0
+
+    def run(self, lines):
+        units = _coalesce(_parse(lines), self.pipeline)
+        done = False
+        while not done:
+            self._records, self._writes, self._new_aliases = [], 0, []
+            try:
+                with uow(self.session):
+                    begin_explicit(self.session)  # per-op savepoints must not commit on release
+                    for unit in units:
+                        self._run_unit(unit)
+                        if self._writes >= self.group_size:
+                            break
+                    else:
+                        done = True
+                    self._last = time.perf_counter()
+                    if self.dry_run:
+                        raise _Rollback()
+                self.commits.append((time.perf_counter() - self._last) * 1000)
+            except _Rollback:
+                self._forget_aliases()
+            except SQLAlchemyError as e:
+                # The commit failed: nothing in this group was written.
+                self._forget_aliases()
+                for record in self._records:
+                    if record["ok"] and (record["op"] in WRITES or RUNS.get(record["op"], (None, False))[1]):
+                        self._fail(record, f"group rolled back: {e}")
+            for record in self._records:
+                self.emit(record)
+
+    def _forget_aliases(self):
+        for alias in self._new_aliases:
+            self.aliases.pop(alias, None)
+
+    def _run_unit(self, unit):
+        line_no, name, payload, error = unit[0]
+        if error is not None:
+            self._record(line_no, name, 0.0, error=error)
+            return
+        started = time.perf_counter()
+        if name in RUNS:
+            fn, writes = RUNS[name]
+            try:
+                results = fn(self.session, [item[2] for item in unit], self.aliases)
+            except SQLAlchemyError as e:
+                results = [OpError(f"Database error: {e}")] * len(unit)
+            ms = (time.perf_counter() - started) * 1000 / len(unit)
+            for (line_no, _, _, _), result in zip(unit, results):
+                if isinstance(result, OpError):
+                    self._record(line_no, name, ms, error=str(result))
+                else:
+                    self._record(line_no, name, ms, result=result)
+                    self._writes += writes
+            return
+        writes = name in WRITES
+        try:
+            if writes:
+                with self.session.begin_nested():
+                    result = WRITES[name](self.session, payload, self.aliases)
+            else:
+                result = READS[name](self.session, payload, self.aliases)
+        except (TypeError, ValueError, SQLAlchemyError) as e:
+            # TypeError too: a malformed field must fail its line, not the whole run.
+            error = f"Database error: {e}" if isinstance(e, SQLAlchemyError) else str(e)
+            self._record(line_no, name, (time.perf_counter() - started) * 1000, error=error)
+            return
+        self._record(line_no, name, (time.perf_counter() - started) * 1000, result=result)
+        if writes:
+            self._writes += 1
+            alias = payload.get("as")
+            if alias and isinstance(result, dict) and "id" in result:
+                self.aliases[str(alias)] = result["id"]
+                self._new_aliases.append(str(alias))
+
+    def _record(self, line_no, name, ms, result=None, error=None):
+        record = {"line": line_no, "op": name, "ok": error is None, "ms": round(ms, 3)}
+        if error is None:
+            record["result"] = result
+        else:
+            record["error"] = error
+            self.errors[name] = self.errors.get(name, 0) + 1
+        self.timings.setdefault(name, []).append(ms)
+        self._records.append(record)
+
+    def _fail(self, record, error):
+        record.pop("result", None)
+        record.update(ok=False, error=error)
+        self.errors[record["op"]] = self.errors.get(record["op"], 0) + 1
+
+    @property
+    def failed(self) -> int:
+        return sum(self.errors.values())
+
+    def stats_rows(self):
+        rows = []
+        for name, times in sorted(self.timings.items(), key=lambda item: str(item[0])):
+            ordered = sorted(times)
+            p95 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+            rows.append([name or "(invalid)", len(times), self.errors.get(name, 0), round(sum(times), 1),
+                         round(sum(times) / len(times), 3), round(p95, 3)])
+        if self.commits:
+            rows.append(["(commit)", len(self.commits), 0, round(sum(self.commits), 1),
+                         round(sum(self.commits) / len(self.commits), 3), round(max(self.commits), 3)])
+        return rows
+
+
+@click.command("batch")
+@click.argument("ops_file", type=click.File("r"), default="-")
+@click.option("--group-size", type=click.IntRange(min=1), default=GROUP_SIZE, show_default=True,
+              help="Writes per transaction")
+@click.option("--pipeline", type=click.IntRange(min=1), default=PIPELINE, show_default=True,
+              help="Max consecutive log-glucose / view-patient ops executed together")
+@click.option("--dry-run", is_flag=True, help="Run everything, then roll back every group")
+@click.option("--errors-only", is_flag=True, help="Only print the results of failed operations")
+def batch(ops_file, group_size, pipeline, dry_run, errors_only):
+    """Run JSON-lines operations from OPS_FILE (or stdin) in one session.
+
+    Each line is {"op": NAME, ...fields}. One NDJSON result line per op
+    goes to stdout, latency per op type to stderr. Exits 1 if any op failed.
+    """
+    def emit(record):
+        if not errors_only or not record["ok"]:
+            click.echo(json.dumps(record, default=str))
+
+    session = Session()
+    started = time.perf_counter()
+    runner = BatchRunner(session, group_size, pipeline, dry_run, emit)
+    try:
+        runner.run(ops_file)
+    finally:
+        session.close()
+    elapsed = time.perf_counter() - started
+
+    from tabulate import tabulate
+
+    total = sum(len(t) for t in runner.timings.values())
+    click.echo(tabulate(runner.stats_rows(), headers=STATS_HEADERS, tablefmt="fancy_grid"), err=True)
+    click.echo(f"{total:,} op(s), {runner.failed:,} failed, in {elapsed:.2f}s ({total / elapsed:,.0f} ops/s)"
+               f"{'; rolled back (--dry-run)' if dry_run else ''}.", err=True)
+    if runner.failed:
+        raise SystemExit(1)
@@ -0,0 +1,76 @@
+#changes / prune-changes
+#Resumable NDJSON feed of inserts, updates and deletes (models.change_log)
+
+import json
+import os
+
+import click
+from sqlalchemy.exc import SQLAlchemyError
+from db.setup import Session
+from models.change_log import ChangeLog, CAPTURED_NAMES, capture_enabled
+
+
+def _read_cursor(path):
+    if path is None or not os.path.exists(path):
+        return 0
+    with open(path) as f:
+        value = f.read().strip()
+    try:
+        return int(value or 0)
+    except ValueError:
+        raise click.UsageError(f"{path} does not hold a cursor: {value!r}")
+
+
+def _write_cursor(path, cursor: int):
+    # Replace atomically, so a crash never leaves a half-written cursor.
+    tmp = f"{path}.tmp"
+    with open(tmp, "w") as f:
+        f.write(f"{cursor}\n")
+    os.replace(tmp, path)
+
+
+@click.command("changes")
+@click.option("--since", type=click.IntRange(min=0), default=None,
+              help="Cursor to resume after (default 0: snapshot of every row, then all changes)")
+@click.option("--cursor-file", type=click.Path(dir_okay=False), default=None,
+              help="Read --since from this file and store the last cursor emitted in it")
+@click.option("--table", "tables", multiple=True, type=click.Choice(CAPTURED_NAMES), help="Only these tables (repeatable)")
+@click.option("--limit", type=click.IntRange(min=1), default=None, help="Stop after this many changes")
+@click.option("--page-size", type=click.IntRange(min=1), default=1000, show_default=True, help="Changes per query")
+def changes(since, cursor_file, tables, limit, page_size):
+    """Stream changes after a cursor as NDJSON, oldest first."""
+    cursor = since if since is not None else _read_cursor(cursor_file)
+    session = Session()
+    emitted = 0
+    try:
+        if not capture_enabled(session.connection()):
+            click.echo("❌ Change capture is not set up on this database (needs SQLite with JSON functions).", err=True)
+            raise SystemExit(1)
+        for page in ChangeLog.iter_since(session, cursor, tables, limit=limit, page_size=page_size):
+            click.echo("\n".join(json.dumps(change.to_dict()) for change in page))
+            cursor = page[-1].id
+            emitted += len(page)
+    except SQLAlchemyError as e:
+        click.echo(f"❌ Database error: {e}", err=True)
+        raise SystemExit(1)
+    finally:
+        session.close()
+    if cursor_file is not None:
+        _write_cursor(cursor_file, cursor)
+    click.echo(f"{emitted} change(s); next cursor {cursor}", err=True)
+
+
+@click.command("prune-changes")
+@click.option("--through", type=click.IntRange(min=0), required=True,
+              help="Delete changes up to and including this cursor (already consumed downstream)")
+def prune_changes(through):
+    """Drop consumed entries from the change log."""
+    session = Session()
+    try:
+        deleted = ChangeLog.prune(session, through)
+        click.echo(f"✅ Pruned {deleted:,} change(s).")
+    except SQLAlchemyError as e:
+        session.rollback()
+        click.echo(f"❌ Database error: {e}")
+    finally:
+        session.close()
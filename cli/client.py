@@ -0,0 +1,134 @@
+#Thin client: forward log-glucose / patient-report to a running `serve` daemon
+#Kept free of SQLAlchemy/NumPy imports so forwarding stays cheap; falls back
+#to the direct commands when no daemon is listening.
+
+import json
+import os
+import socket
+import tempfile
+
+import click
+from dotenv import load_dotenv
+
+from cli.render import FORMATS
+
+load_dotenv()
+
+DEFAULT_SOCKET = os.path.join(tempfile.gettempdir(), "diabetes-cli.sock")
+CONNECT_TIMEOUT = 0.25
+REQUEST_TIMEOUT = 30.0
+
+
+class DaemonError(RuntimeError):
+    """The daemon accepted the connection but the request did not complete."""
+
+
+def daemon_address() -> str:
+    """``DIABETES_DAEMON`` as ``unix:/path``, ``tcp:host:port`` or a bare socket path."""
+    return os.getenv("DIABETES_DAEMON", f"unix:{DEFAULT_SOCKET}")
+
+
+def _connect(address: str):
+    if address.startswith("tcp:"):
+        host, _, port = address[4:].rpartition(":")
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        target = (host or "127.0.0.1", int(port))
+    else:
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        target = address[5:] if address.startswith("unix:") else address
+    sock.settimeout(CONNECT_TIMEOUT)
+    try:
+        sock.connect(target)
+    except OSError:
+        sock.close()
+        raise
+    return sock
+
+
+def request(op: str, address: str = None, **payload):
+    """Send one request; returns the response dict, or None if no daemon is running.
+
+    Only a failed *connect* returns None: once a request is on the wire the
+    caller must not retry it directly (a reading could be logged twice), so
+    later failures raise ``DaemonError``.
+    """
+    if os.getenv("DIABETES_NO_DAEMON"):
+        return None
+    try:
+        sock = _connect(address or daemon_address())
+    except (OSError, ValueError):
+        return None
+    try:
+        sock.settimeout(REQUEST_TIMEOUT)
+        sock.sendall(json.dumps({"op": op, **payload}).encode() + b"\n")
+        buffer = b""
+        while not buffer.endswith(b"\n"):
+            chunk = sock.recv(65536)
+            if not chunk:
+                raise DaemonError("daemon closed the connection")
+            buffer += chunk
+        return json.loads(buffer)
+    except (OSError, ValueError) as e:
+        raise DaemonError(str(e))
+    finally:
+        sock.close()
+
+
+def _direct(ctx, command, **kwargs):
+    from db.schema import ensure_schema
+
+    ensure_schema()
+    return ctx.invoke(command, **kwargs)
+
+
+@click.command("log-glucose")
+@click.option('--patient-id', prompt='Patient ID', help='ID of the patient')
+@click.option('--reading', prompt='Glucose reading (mg/dL)', type=float, help='Blood sugar level')
+@click.pass_context
+def log_glucose(ctx, patient_id, reading):
+    """Log a glucose reading for a patient."""
+    try:
+        response = request("log", patient_id=int(patient_id), reading=reading)
+    except DaemonError as e:
+        click.echo(f"❌ Daemon error: {e}")
+        return
+    except ValueError:
+        response = None
+    if response is None:
+        from cli.commands import log_glucose as direct
+        return _direct(ctx, direct, patient_id=patient_id, reading=reading)
+    if response["ok"]:
+        click.echo(f"✅ Glucose reading of {reading} mg/dL logged for {response['result']['patient']}")
+    else:
+        click.echo(f"❌ {response['error']}")
+
+
+@click.command("patient-report")
+@click.option("--patient-id", "patient_ids", type=int, multiple=True, help="Patient to report on (repeatable)")
+@click.option("--all", "all_patients", is_flag=True, help="Report on every patient")
+@click.option("--chunk-size", type=click.IntRange(min=1), default=200, show_default=True,
+              help="Patients whose readings are fetched per query in --all mode")
+@click.option("--format", "fmt", type=click.Choice(FORMATS), default="table", show_default=True)
+@click.pass_context
+def patient_report(ctx, patient_ids, all_patients, chunk_size, fmt):
+    """Clinical glycemic report for one or more patients."""
+    response = None
+    if patient_ids and not all_patients:
+        try:
+            response = request("report", patient_ids=list(patient_ids))
+        except DaemonError as e:
+            click.echo(f"❌ Daemon error: {e}")
+            return
+    if response is None:
+        from cli.reports import patient_report as direct
+        return _direct(ctx, direct, patient_ids=patient_ids, all_patients=all_patients,
+                       chunk_size=chunk_size, fmt=fmt)
+    if not response["ok"]:
+        click.echo(f"❌ {response['error']}")
+        return
+    from cli.render import RowWriter
+
+    writer = RowWriter(response["result"]["headers"], fmt)
+    writer.write_page(response["result"]["rows"])
+    for pid in response["result"].get("missing", []):
+        click.echo(f"⚠️ Patient {pid} not found.", err=True)
@@ -0,0 +1,107 @@
+#add-patient
+#Prompt for glucose reading and patient ID
+#add-medication
+#Show average glucose, current meds, and recent logs for a patient,
+
+import click
+from sqlalchemy.exc import SQLAlchemyError
+from db.setup import Session
+from db.unit_of_work import uow
+from models.patient import Patient, RECENT_LOGS
+from models.glucose_log import GlucoseLog
+from datetime import datetime
+
+
+@click.command()
+@click.option('--name', prompt='Patient name', help='Full name of the patient')
+@click.option('--dob', prompt='Date of birth (YYYY-MM-DD)', help='Date of birth in YYYY-MM-DD format')
+@click.option('--contact', prompt='Contact info', help='Phone or email')
+def add_patient(name, dob, contact):
+    """Add a new patient to the system."""
+    session = Session()
+    try:
+        dob_parsed = datetime.strptime(dob, "%Y-%m-%d").date()
+        reading = None
+        if click.confirm("Log an initial glucose reading now?", default=False):
+            reading = click.prompt("Reading (mg/dL)", type=float)
+            if reading <= 0:
+                click.echo("Reading must be positive. Skipping initial log.")
+                reading = None
+
+        with uow(session):
+            new_patient = Patient.create(session, name=name, date_of_birth=dob_parsed, contact=contact)
+            if reading is not None:
+                GlucoseLog.create(session, patient=new_patient, reading=reading)
+        click.echo(f"✅ Patient '{name}' added successfully.")
+        if reading is not None:
+            click.echo("Initial glucose logged.")
+    except ValueError:
+        click.echo("❌ Invalid date format. Please use YYYY-MM-DD.")
+    except SQLAlchemyError as e:
+        session.rollback()
+        click.echo(f"❌ Database error: {e}")
+    finally:
+        session.close()
+
+
+@click.command()
+@click.option('--patient-id', prompt='Patient ID', help='ID of the patient')
+@click.option('--reading', prompt='Glucose reading (mg/dL)', type=float, help='Blood sugar level')
+def log_glucose(patient_id, reading):
+    """Log a glucose reading for a patient."""
+    session = Session()
+    try:
+        patient = session.query(Patient).get(int(patient_id))
+        if not patient:
+            click.echo(f"❌ No patient found with ID {patient_id}")
+            return
+
+        new_log = GlucoseLog(reading=reading, patient=patient)
+        session.add(new_log)
+        session.commit()
+        click.echo(f"✅ Glucose reading of {reading} mg/dL logged for {patient.name}")
+    except SQLAlchemyError as e:
+        session.rollback()
+        click.echo(f"❌ Database error: {e}")
+    finally:
+        session.close()
+
+
+@click.command()
+@click.option('--patient-id', prompt='Patient ID', type=int, help='ID of the patient')
+@click.option('--recent', type=click.IntRange(min=1), default=RECENT_LOGS, show_default=True, help='Number of latest glucose logs to show')
+def view_patient(patient_id, recent):
+    """Show average glucose, current meds, and recent logs for a patient."""
+    from cli.menus import show_dashboard
+
+    session = Session()
+    try:
+        show_dashboard(session, patient_id, recent=recent)
+    except SQLAlchemyError as e:
+        click.echo(f"❌ Database error: {e}")
+    finally:
+        session.close()
+
+
+@click.command()
+def view_patients():
+    """Display all registered patients in a table."""
+    from tabulate import tabulate
+
+    session = Session()
+    try:
+        headers = ["ID", "Name", "Date of Birth", "Contact"]
+        shown = False
+        for patients in Patient.iter_all(session):
+            table = [
+                [p.id, p.name, p.date_of_birth.strftime("%Y-%m-%d"), p.contact]
+                for p in patients
+            ]
+            click.echo(tabulate(table, headers=headers, tablefmt="fancy_grid"))
+            shown = True
+        if not shown:
+            click.echo("⚠️ No patients found.")
+    except SQLAlchemyError as e:
+        click.echo(f"❌ Database error: {e}")
+    finally:
+        session.close()
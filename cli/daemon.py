@@ -0,0 +1,281 @@
+#serve
+#Long-running daemon: keeps the engine warm and answers NDJSON requests on a
+#Unix socket (or localhost TCP). Readings are coalesced into micro-batches.
+
+import asyncio
+import json
+import os
+import signal
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import click
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+
+from db.setup import Session
+from models.patient import Patient, RECENT_LOGS
+from models.glucose_log import GlucoseLog, parse_timestamp
+from models.patient_summary import patient_summary, summary_cache
+from cli.client import daemon_address, request
+
+BATCH_SIZE = 500
+FLUSH_MS = 20
+READ_WORKERS = 4
+
+
+class RequestError(ValueError):
+    """A request the daemon rejected; reported back to the client."""
+
+
+class GlucoseDaemon:
+    """Request handlers plus the write-coalescing queue.
+
+    Database work runs on threads so the event loop never blocks: a single
+    writer thread commits batches (SQLite has one writer anyway) while reads
+    use a small pool, which WAL mode lets run alongside the writer.
+    """
+
+    def __init__(self, batch_size: int = BATCH_SIZE, flush_ms: int = FLUSH_MS):
+        self.batch_size = batch_size
+        self.flush_interval = flush_ms / 1000.0
+        self.queue = None
+        self.writer_pool = ThreadPoolExecutor(max_workers=1)
+        self.reader_pool = ThreadPoolExecutor(max_workers=READ_WORKERS)
+        self.stats = {"requests": 0, "readings": 0, "batches": 0, "errors": 0}
+        self.started = time.time()
+
+    # ----- protocol -----
+    async def handle(self, reader, writer):
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                if not line.strip():
+                    continue
+                self.stats["requests"] += 1
+                try:
+                    payload = json.loads(line)
+                    response = {"ok": True, "result": await self.dispatch(payload)}
+                except (RequestError, json.JSONDecodeError) as e:
+                    response = {"ok": False, "error": str(e)}
+                except SQLAlchemyError as e:
+                    response = {"ok": False, "error": f"Database error: {e}"}
+                except Exception as e:
+                    # A bug in one request must not drop the client or its later requests.
+                    click.echo(f"❌ Request failed: {e!r}", err=True)
+                    response = {"ok": False, "error": f"Internal error: {e}"}
+                if not response["ok"]:
+                    self.stats["errors"] += 1
+                writer.write(json.dumps(response, default=str).encode() + b"\n")
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def dispatch(self, payload):
+        op = payload.get("op") if isinstance(payload, dict) else None
+        if op == "log":
+            return await self.log(payload)
+        if op == "lookup":
+            return await self._read(self._lookup, payload)
+        if op == "report":
+            return await self._read(self._report, payload)
+        if op == "ping":
+            return {"pid": os.getpid(), "uptime_s": round(time.time() - self.started, 1),
+                    "queued": self.queue.qsize(), **self.stats, "cache": summary_cache.report()}
+        raise RequestError(f"Unknown op {op!r}")
+
+    async def _read(self, fn, payload):
+        return await asyncio.get_running_loop().run_in_executor(self.reader_pool, fn, payload)
+
+    # ----- writes -----
+    async def log(self, payload):
+        try:
+            patient_id = int(payload["patient_id"])
+            reading = float(payload["reading"])
+            timestamp = payload.get("timestamp")
+            timestamp = parse_timestamp(timestamp) if timestamp else datetime.now()
+        except KeyError as e:
+            raise RequestError(f"missing field {e}")
+        except (TypeError, ValueError) as e:
+            raise RequestError(str(e))
+        if reading <= 0:
+            raise RequestError("Reading must be positive.")
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put(({"patient_id": patient_id, "reading": reading, "timestamp": timestamp}, future))
+        name = await future  # read in the batch's own transaction, so never stale after a rename
+        return {"patient": name, "patient_id": patient_id, "reading": reading, "timestamp": timestamp.isoformat()}
+
+    async def writer_loop(self):
+        """Drain the queue into batches of up to ``batch_size`` rows.
+
+        A batch closes when it is full or ``flush_ms`` after its first
+        reading arrived, so a lone reading waits at most one flush interval
+        while a burst from many clients becomes a single INSERT and commit.
+        """
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self.queue.get()]
+            deadline = loop.time() + self.flush_interval
+            while len(batch) < self.batch_size:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self.queue.get(), remaining))
+                except asyncio.TimeoutError:
+                    break
+            rows = [row for row, _ in batch]
+            try:
+                errors, names = await loop.run_in_executor(self.writer_pool, self._write_batch, rows)
+            except SQLAlchemyError as e:
+                errors, names = [f"Database error: {e}"] * len(batch), {}
+            except Exception as e:
+                # Fail this batch only: the writer must keep draining the queue.
+                click.echo(f"❌ Batch of {len(batch)} reading(s) failed: {e!r}", err=True)
+                errors, names = [f"Internal error: {e}"] * len(batch), {}
+            for (row, future), error in zip(batch, errors):
+                if not future.done():
+                    if error:
+                        future.set_exception(RequestError(error))
+                    else:
+                        future.set_result(names[row["patient_id"]])
+                self.queue.task_done()
+            self.stats["batches"] += 1
+            self.stats["readings"] += errors.count(None)
+
+    def _write_batch(self, rows):
+        """Commit ``rows``; returns one error message (or None) per row, and ``{patient_id: name}``."""
+        session = Session()
+        try:
+            ids = {row["patient_id"] for row in rows}
+            known = dict(session.execute(select(Patient.id, Patient.name).where(Patient.id.in_(ids))).all())
+            errors = [None if row["patient_id"] in known else f"No patient found with ID {row['patient_id']}"
+                      for row in rows]
+            good = [row for row, error in zip(rows, errors) if error is None]
+            try:
+                GlucoseLog.bulk_create(session, good)
+                return errors, known
+            except IntegrityError:
+                session.rollback()
+            # Something in the batch violates a constraint: isolate it row by row.
+            results = iter(self._write_rows(session, good))
+            return [error or next(results) for error in errors], known
+        finally:
+            session.close()
+
+    @staticmethod
+    def _write_rows(session, rows):
+        errors = []
+        for row in rows:
+            try:
+                with session.begin_nested():
+                    session.add(GlucoseLog(**row))
+                errors.append(None)
+            except IntegrityError as e:
+                errors.append(f"Rejected: {e.orig}")
+        session.commit()
+        return errors
+
+    # ----- reads -----
+    def _lookup(self, payload):
+        session = Session()
+        try:
+            if payload.get("patient_id") is not None:
+                try:
+                    patient_id = int(payload["patient_id"])
+                    recent = int(payload.get("recent", RECENT_LOGS))
+                except (TypeError, ValueError) as e:
+                    raise RequestError(str(e))
+                if recent < 0:
+                    raise RequestError("recent must not be negative")
+                summary = patient_summary(session, patient_id, recent=recent)
+                if summary is None:
+                    raise RequestError(f"No patient found with ID {payload['patient_id']}")
+                return {
+                    "id": summary.id,
+                    "name": summary.name,
+                    "date_of_birth": summary.date_of_birth,
+                    "contact": summary.contact,
+                    "age": summary.age,
+                    "stats": summary.stats._asdict(),
+                    "medications": [m._asdict() for m in summary.medications],
+                    "recent": [g._asdict() for g in summary.recent_logs],
+                }
+            if payload.get("name"):
+                return [{"id": p.id, "name": p.name, "date_of_birth": p.date_of_birth}
+                        for p in Patient.find_by_name(session, str(payload["name"]))]
+            raise RequestError("lookup needs patient_id or name")
+        finally:
+            session.close()
+
+    def _report(self, payload):
+        from analytics.glycemic import patient_reports, report_row, REPORT_HEADERS
+
+        try:
+            patient_ids = [int(pid) for pid in payload["patient_ids"]]
+        except (KeyError, TypeError, ValueError):
+            raise RequestError("report needs a list of patient_ids")
+        patient_ids = list(dict.fromkeys(patient_ids))
+        session = Session()
+        try:
+            known = set(session.scalars(select(Patient.id).where(Patient.id.in_(patient_ids))))
+            found = [pid for pid in patient_ids if pid in known]
+            rows = [report_row(r) for r in patient_reports(session.connection(), found)] if found else []
+        finally:
+            session.close()
+        return {"headers": REPORT_HEADERS, "rows": rows, "missing": [pid for pid in patient_ids if pid not in known]}
+
+    # ----- lifecycle -----
+    async def serve(self, address: str):
+        self.queue = asyncio.Queue()
+        if address.startswith("tcp:"):
+            host, _, port = address[4:].rpartition(":")
+            server = await asyncio.start_server(self.handle, host or "127.0.0.1", int(port))
+            path = None
+        else:
+            path = address[5:] if address.startswith("unix:") else address
+            if os.path.exists(path):
+                os.unlink(path)  # stale socket; the caller checked nothing answers on it
+            server = await asyncio.start_unix_server(self.handle, path=path)
+            os.chmod(path, 0o600)
+
+        loop = asyncio.get_running_loop()
+        stop = asyncio.Event()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(sig, stop.set)
+        writer = asyncio.ensure_future(self.writer_loop())
+        try:
+            await stop.wait()
+        finally:
+            server.close()
+            await self.queue.join()  # flush readings already accepted
+            writer.cancel()
+            self.writer_pool.shutdown()
+            self.reader_pool.shutdown()
+            if path and os.path.exists(path):
+                os.unlink(path)
+
+
+@click.command("serve")
+@click.option("--socket", "address", default=None,
+              help="unix:/path or tcp:127.0.0.1:PORT (default: $DIABETES_DAEMON or a socket in the temp dir)")
+@click.option("--batch-size", type=click.IntRange(min=1), default=BATCH_SIZE, show_default=True,
+              help="Most readings committed per batch")
+@click.option("--flush-ms", type=click.IntRange(min=0), default=FLUSH_MS, show_default=True,
+              help="How long a batch waits for more readings before committing")
+def serve(address, batch_size, flush_ms):
+    """Run the logging daemon; log-glucose and patient-report forward to it."""
+    address = address or daemon_address()
+    if request("ping", address=address) is not None:
+        click.echo(f"⚠️ A daemon is already listening on {address}")
+        return
+    click.echo(f"✅ Listening on {address} (Ctrl+C to stop)", err=True)
+    daemon = GlucoseDaemon(batch_size=batch_size, flush_ms=flush_ms)
+    asyncio.run(daemon.serve(address))
+    click.echo(f"✅ Stopped after {daemon.stats['readings']} reading(s) in {daemon.stats['batches']} batch(es).",
+               err=True)
@@ -0,0 +1,199 @@
+#import-glucose
+#Stream CSV/NDJSON readings into glucose_logs in batched transactions
+
+import csv
+import json
+import os
+import time
+from datetime import datetime
+from itertools import chain, islice
+
+import click
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+from db.setup import Session
+from models.patient import Patient
+from models.glucose_log import GlucoseLog, parse_timestamp
+
+
+class RowError(ValueError):
+    """A single input row that could not be turned into a reading."""
+
+
+def _parse_timestamp(value):
+    if value in (None, ""):
+        return datetime.now()
+    return parse_timestamp(value)
+
+
+def _to_row(record) -> dict:
+    try:
+        return {
+            "patient_id": int(record["patient_id"]),
+            "reading": float(record["reading"]),
+            "timestamp": _parse_timestamp(record.get("timestamp")),
+        }
+    except KeyError as e:
+        raise RowError(f"missing field {e}")
+    except (TypeError, ValueError) as e:
+        raise RowError(str(e))
+
+
+def _iter_csv(lines):
+    for record in csv.DictReader(lines):
+        yield record
+
+
+def _iter_ndjson(lines):
+    for line in lines:
+        line = line.strip()
+        if not line:
+            yield None
+            continue
+        try:
+            yield json.loads(line)
+        except json.JSONDecodeError as e:
+            yield RowError(f"invalid JSON: {e.msg}")
+
+
+def _detect_format(name: str, first_line: str) -> str:
+    ext = os.path.splitext(name or "")[1].lower()
+    if ext == ".csv":
+        return "csv"
+    if ext in (".ndjson", ".jsonl", ".json"):
+        return "ndjson"
+    return "ndjson" if first_line.lstrip().startswith("{") else "csv"
+
+
+def iter_readings(stream, fmt: str = "auto"):
+    """Yield ``(line_no, row_or_error)`` from a CSV or NDJSON text stream.
+
+    The stream is consumed lazily so arbitrarily large exports never sit in
+    memory. Rows that cannot be parsed are yielded as ``RowError`` instances
+    so the caller can report them without aborting the import.
+    """
+    first = stream.readline()
+    if not first:
+        return
+    if fmt == "auto":
+        fmt = _detect_format(getattr(stream, "name", ""), first)
+    lines = chain([first], stream)
+    records = _iter_csv(lines) if fmt == "csv" else _iter_ndjson(lines)
+    # CSV data starts on line 2 (after the header row).
+    start = 2 if fmt == "csv" else 1
+    for line_no, record in enumerate(records, start=start):
+        if record is None:
+            continue
+        if isinstance(record, RowError):
+            yield line_no, record
+            continue
+        try:
+            yield line_no, _to_row(record)
+        except RowError as e:
+            yield line_no, e
+
+
+def _batched(iterable, size: int):
+    it = iter(iterable)
+    while True:
+        batch = list(islice(it, size))
+        if not batch:
+            return
+        yield batch
+
+
+class _Importer:
+    """Writes parsed rows batch by batch and keeps the running totals."""
+
+    def __init__(self, session):
+        self.session = session
+        self.known_patients = set()
+        self.read = 0
+        self.inserted = 0
+        self.rejected = 0
+        self.batches = 0
+
+    def _check_patients(self, rows):
+        missing = {r["patient_id"] for r in rows} - self.known_patients
+        if missing:
+            found = self.session.scalars(select(Patient.id).where(Patient.id.in_(missing))).all()
+            self.known_patients.update(found)
+
+    def write_batch(self, batch):
+        """Insert one batch; returns a list of ``(line_no, reason)`` failures."""
+        self.batches += 1
+        self.read += len(batch)
+        failures = []
+        rows, line_nos = [], []
+        for line_no, row in batch:
+            if isinstance(row, RowError):
+                failures.append((line_no, str(row)))
+            else:
+                rows.append(row)
+                line_nos.append(line_no)
+        self._check_patients(rows)
+        good = []
+        for line_no, row in zip(line_nos, rows):
+            if row["patient_id"] not in self.known_patients:
+                failures.append((line_no, f"no patient with ID {row['patient_id']}"))
+            else:
+                good.append((line_no, row))
+        try:
+            self.inserted += GlucoseLog.bulk_create(self.session, [row for _, row in good])
+        except IntegrityError:
+            # Something in the batch tripped a constraint (most often
+            # ck_glucose_reading_positive); isolate the offending rows.
+            self.session.rollback()
+            failures.extend(self._write_rows(good))
+        self.rejected += len(failures)
+        return sorted(failures)
+
+    def _write_rows(self, good):
+        failures = []
+        for line_no, row in good:
+            try:
+                with self.session.begin_nested():
+                    self.session.add(GlucoseLog(**row))
+                self.inserted += 1
+            except IntegrityError as e:
+                failures.append((line_no, str(e.orig)))
+        self.session.commit()
+        return failures
+
+
+@click.command("import-glucose")
+@click.argument("sources", nargs=-1, type=click.File("r"))
+@click.option("--format", "fmt", type=click.Choice(["auto", "csv", "ndjson"]), default="auto", show_default=True,
+              help="Input format; auto detects from the file extension or first line")
+@click.option("--batch-size", type=click.IntRange(min=1), default=1000, show_default=True,
+              help="Readings written per transaction")
+def import_glucose(sources, fmt, batch_size):
+    """Bulk import glucose readings from CSV/NDJSON files (or stdin).
+
+    Each record needs patient_id and reading; timestamp (ISO 8601) is
+    optional and defaults to now.
+    """
+    sources = sources or (click.get_text_stream("stdin"),)
+    session = Session()
+    importer = _Importer(session)
+    started = time.perf_counter()
+    try:
+        for source in sources:
+            name = getattr(source, "name", "<stdin>")
+            for batch in _batched(iter_readings(source, fmt), batch_size):
+                failures = importer.write_batch(batch)
+                if failures:
+                    click.echo(f"⚠️ Batch {importer.batches} ({name}): {len(failures)} row(s) rejected", err=True)
+                    for line_no, reason in failures:
+                        click.echo(f"   line {line_no}: {reason}", err=True)
+    except SQLAlchemyError as e:
+        session.rollback()
+        click.echo(f"❌ Database error: {e}")
+    finally:
+        session.close()
+    elapsed = time.perf_counter() - started
+    rate = importer.inserted / elapsed if elapsed > 0 else 0.0
+    click.echo(
+        f"✅ Imported {importer.inserted} of {importer.read} reading(s) in {importer.batches} batch(es); "
+        f"{importer.rejected} rejected. {elapsed:.2f}s ({rate:,.0f} rows/s)"
+    )
@@ -1,318 +1,179 @@
-#add-patient
-#Prompt for glucose reading and patient ID
-#add-medication
-#Show average glucose, current meds, and recent logs for a patient,
+import importlib
+import time
 
 import click
-from sqlalchemy.exc import SQLAlchemyError
-from db.setup import Session
-from models.patient import Patient
-from models.glucose_log import GlucoseLog
-from models.medication import Medication
-from tabulate import tabulate
-from datetime import datetime, date
-
-
-def _print_table(rows, headers):
-    click.echo(tabulate(rows, headers=headers, tablefmt="fancy_grid"))
-
-
-def _parse_date(value: str) -> date:
-    return datetime.strptime(value, "%Y-%m-%d").date()
-
-
-@click.group(invoke_without_command=True)
+from click.utils import make_default_short_help
+
+# Subcommands are imported only when invoked, so `log-glucose` never pays for
+# NumPy, tabulate or the reporting code.  name -> "module:attribute"
+LAZY_COMMANDS = {
+    "add-patient": "cli.commands:add_patient",
+    "log-glucose": "cli.client:log_glucose",
+    "view-patient": "cli.commands:view_patient",
+    "view-patients": "cli.commands:view_patients",
+    "import-glucose": "cli.ingest:import_glucose",
+    "list-patients": "cli.listing:list_patients",
+    "list-glucose": "cli.listing:list_glucose",
+    "list-medications": "cli.listing:list_medications",
+    "list-alerts": "cli.listing:list_alerts",
+    "glucose-series": "cli.listing:glucose_series",
+    "stop-medication": "cli.regimen:stop_medication",
+    "patients-on": "cli.regimen:patients_on",
+    "glucose-regimen": "cli.regimen:glucose_regimen",
+    "regimen-outcomes": "cli.regimen:regimen_outcomes",
+    "patient-report": "cli.client:patient_report",
+    "cohort-report": "cli.reports:cohort_report",
+    "cohort-merge": "cli.reports:cohort_merge",
+    "export-glucose": "cli.archive:export_glucose",
+    "archive-glucose": "cli.archive:archive_glucose",
+    "archive-report": "cli.archive:archive_report",
+    "rebuild-rollups": "cli.maintenance:rebuild_rollups",
+    "rebuild-search-index": "cli.maintenance:rebuild_search_index",
+    "cache-stats": "cli.maintenance:cache_stats",
+    "changes": "cli.changes:changes",
+    "prune-changes": "cli.changes:prune_changes",
+    "serve": "cli.daemon:serve",
+    "batch": "cli.batch:batch",
+    "shards": "cli.shards:list_shards",
+    "shard-search": "cli.shards:shard_search",
+    "shard-stats": "cli.shards:shard_stats",
+}
+
+# Short help for `--help`, so listing the commands imports none of them.
+# Keep in step with each command's docstring.
+COMMAND_HELP = {
+    "add-patient": "Add a new patient to the system.",
+    "log-glucose": "Log a glucose reading for a patient.",
+    "view-patient": "Show average glucose, current meds, and recent logs for a patient.",
+    "view-patients": "Display all registered patients in a table.",
+    "import-glucose": "Bulk import glucose readings from CSV/NDJSON files (or stdin).",
+    "list-patients": "Stream all patients with their glucose stats.",
+    "list-glucose": "Stream glucose logs in ID order.",
+    "list-medications": "Stream medications in ID order.",
+    "list-alerts": "Stream glucose alerts in ID order.",
+    "glucose-series": "Glucose readings as a time series: bucketed averages or LTTB-downsampled points.",
+    "stop-medication": "Record the last day a medication was taken.",
+    "patients-on": "List patients taking DRUG (exact name, any case) on a given day.",
+    "glucose-regimen": "Stream glucose readings with the medications being taken that day.",
+    "regimen-outcomes": "Cohort glucose stats on vs. off each drug, for the patients prescribed it.",
+    "patient-report": "Clinical glycemic report for one or more patients.",
+    "cohort-report": "Glycemic report for every patient, computed in parallel processes.",
+    "cohort-merge": "Merge cohort-report NDJSON files into one file ordered by patient ID.",
+    "export-glucose": "Copy glucose readings into month-partitioned columnar files (rows stay in the database).",
+    "archive-glucose": "Move old glucose readings out of the database into the archive.",
+    "archive-report": "Glycemic report computed straight from the memory-mapped archive.",
+    "rebuild-rollups": "Recompute hourly/daily glucose rollups from raw readings.",
+    "rebuild-search-index": "Create (if needed) and repopulate the patient/medication name search indexes.",
+    "cache-stats": "Hit/miss counters for the patient summary cache (disk tier and running daemon).",
+    "changes": "Stream changes after a cursor as NDJSON, oldest first.",
+    "prune-changes": "Drop consumed entries from the change log.",
+    "serve": "Run the logging daemon; log-glucose and patient-report forward to it.",
+    "batch": "Run JSON-lines operations from OPS_FILE (or stdin) in one session.",
+    "shards": "List the configured shards.",
+    "shard-search": "Ranked patient name search across every shard at once.",
+    "shard-stats": "Cohort glucose stats per shard and combined, queried concurrently.",
+}
+
+# Commands that never touch the database skip the schema check, as do the
+# daemon-forwarding ones (cli.client), which check it only when running directly.
+# The shard commands open their own engines (db.shards) instead of the default one.
+DB_FREE_COMMANDS = {"cohort-merge", "cache-stats", "archive-report", "log-glucose", "patient-report",
+                    "shards", "shard-search", "shard-stats"}
+
+
+class LazyGroup(click.Group):
+    """Click group that resolves subcommands from ``LAZY_COMMANDS`` on demand."""
+
+    def __init__(self, *args, lazy_commands=None, command_help=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.lazy_commands = dict(lazy_commands or {})
+        self.command_help = dict(command_help or {})
+        self.load_times = {}
+
+    def list_commands(self, ctx):
+        return sorted(set(super().list_commands(ctx)) | set(self.lazy_commands))
+
+    def get_command(self, ctx, name):
+        # Accept the snake_case spellings older docs used (e.g. view_patients).
+        name = name.replace("_", "-")
+        if name not in self.lazy_commands:
+            return super().get_command(ctx, name)
+        started = time.perf_counter()
+        module_name, attr = self.lazy_commands[name].split(":")
+        command = getattr(importlib.import_module(module_name), attr)
+        self.load_times[name] = (module_name, time.perf_counter() - started)
+        return command
+
+    def format_commands(self, ctx, formatter):
+        # click.Group would load every command for its short help (SQLAlchemy, NumPy, ...).
+        names = self.list_commands(ctx)
+        limit = formatter.width - 6 - max((len(name) for name in names), default=0)
+        rows = []
+        for name in names:
+            if name in self.lazy_commands:
+                rows.append((name, make_default_short_help(self.command_help.get(name, ""), limit)))
+                continue
+            command = super().get_command(ctx, name)
+            if command is not None and not command.hidden:
+                rows.append((name, command.get_short_help_str(limit)))
+        if rows:
+            with formatter.section("Commands"):
+                formatter.write_dl(rows)
+
+
+def _ms(seconds: float) -> str:
+    return f"{seconds * 1000:8.1f} ms"
+
+
+def _select_shard(ctx, param, value):
+    # Eager, so it runs while arguments are parsed: before any command module
+    # (and with it db.setup's engine) is imported.
+    if value is not None:
+        from db.shards import select_shard
+        try:
+            select_shard(value)
+        except (KeyError, ValueError) as e:
+            raise click.BadParameter(e.args[0], ctx=ctx, param=param)
+    return value
+
+
+@click.group(cls=LazyGroup, lazy_commands=LAZY_COMMANDS, command_help=COMMAND_HELP, invoke_without_command=True)
+@click.option("--profile-startup", is_flag=True, help="Report import and initialization time on stderr")
+@click.option("--trace", is_flag=True, help="Print per-command query counts, timings and N+1 warnings on stderr")
+@click.option("--shard", metavar="NAME", is_eager=True, expose_value=False, callback=_select_shard,
+              help="Run against this clinic database from SHARD_URLS")
 @click.pass_context
-def cli(ctx):
+def cli(ctx, profile_startup, trace):
     """Diabetes Management CLI"""
-    if ctx.invoked_subcommand is None:
-        click.echo("Welcome to the Diabetes CLI System!")
-        while True:
-            click.echo("\nSelect an option:")
-            options = [
-                "Patients",
-                "Glucose Logs",
-                "Medications",
-                "Exit",
-            ]
-            for i, label in enumerate(options, start=1):
-                click.echo(f"{i}. {label}")
-            choice = click.prompt("Enter choice number", type=int)
-            if choice == 1:
-                _patients_menu()
-            elif choice == 2:
-                _glucose_menu()
-            elif choice == 3:
-                _medications_menu()
-            elif choice == 4:
-                click.echo("Thank you for using the Diabetes CLI System!")
-                break
-            else:
-                click.echo("Invalid choice. Choose amongst the options.")
-
-
-def _patients_menu():
-    session = Session()
-    try:
-        click.echo("\nPatients Menu:")
-        click.echo("1. List all")
-        click.echo("2. Create")
-        click.echo("3. Delete")
-        click.echo("4. Find by name")
-        click.echo("5. View related (logs + medications)")
-        action = click.prompt("Enter choice number", type=int)
-        if action == 1:
-            patients = Patient.get_all(session)
-            if not patients:
-                click.echo("No patients found.")
-                return
-            rows = [[p.id, p.name, p.date_of_birth.strftime("%Y-%m-%d"), p.contact, p.age, p.average_glucose] for p in patients]
-            _print_table(rows, ["ID", "Name", "DOB", "Contact", "Age", "Avg Glucose"])
-        elif action == 2:
-            name = click.prompt("Name")
-            dob_str = click.prompt("DOB (YYYY-MM-DD)")
-            contact = click.prompt("Contact", default="")
-            dob = _parse_date(dob_str)
-            p = Patient.create(session, name=name, date_of_birth=dob, contact=contact)
-            click.echo(f"Created patient {p.id}: {p.name}")
-            # Optional initial glucose reading
-            if click.confirm("Log an initial glucose reading now?", default=False):
-                reading = click.prompt("Reading (mg/dL)", type=float)
-                if reading <= 0:
-                    click.echo("Reading must be positive. Skipping initial log.")
-                else:
-                    GlucoseLog.create(session, patient=p, reading=reading)
-                    click.echo("Initial glucose logged.")
-        elif action == 3:
-            pid = click.prompt("Patient ID", type=int)
-            p = Patient.get_by_id(session, pid)
-            if not p:
-                click.echo("Patient not found.")
-                return
-            p.delete(session)
-            click.echo("Deleted.")
-        elif action == 4:
-            term = click.prompt("Search term (name)")
-            matches = Patient.find_by_name(session, term)
-            if not matches:
-                click.echo("No matches.")
-                return
-            rows = [[p.id, p.name, p.date_of_birth.strftime("%Y-%m-%d"), p.contact] for p in matches]
-            _print_table(rows, ["ID", "Name", "DOB", "Contact"])
-        elif action == 5:
-            pid = click.prompt("Patient ID", type=int)
-            p = Patient.get_by_id(session, pid)
-            if not p:
-                click.echo("Patient not found.")
-                return
-            click.echo(f"\nPatient: {p.name} (Age {p.age})  Avg Glucose: {p.average_glucose}")
-            logs = p.glucose_logs
-            meds = p.medications
-            if logs:
-                rows = [[g.id, g.reading, g.timestamp.strftime("%Y-%m-%d %H:%M")] for g in logs]
-                _print_table(rows, ["Log ID", "Reading", "Timestamp"])
-            else:
-                click.echo("No glucose logs.")
-            if meds:
-                rows = [[m.id, m.name, m.dosage, (m.start_date.strftime("%Y-%m-%d") if m.start_date else "-")] for m in meds]
-                _print_table(rows, ["Med ID", "Name", "Dosage", "Start Date"])
-            else:
-                click.echo("No medications.")
-        else:
-            click.echo("Invalid choice.")
-    except Exception as e:
-        session.rollback()
-        click.echo(f"Error: {e}")
-    finally:
-        session.close()
-
-
-def _glucose_menu():
-    session = Session()
-    try:
-        click.echo("\nGlucose Logs Menu:")
-        click.echo("1. List all")
-        click.echo("2. Create")
-        click.echo("3. Delete")
-        click.echo("4. Find by date range")
-        click.echo("5. List by patient")
-        action = click.prompt("Enter choice number", type=int)
-        if action == 1:
-            logs = GlucoseLog.get_all(session)
-            if not logs:
-                click.echo("No glucose logs found.")
-                return
-            rows = [[g.id, g.patient_id, g.reading, g.timestamp.strftime("%Y-%m-%d %H:%M")] for g in logs]
-            _print_table(rows, ["ID", "Patient ID", "Reading", "Timestamp"])
-        elif action == 2:
-            pid = click.prompt("Patient ID", type=int)
-            patient = Patient.get_by_id(session, pid)
-            if not patient:
-                click.echo("Patient not found.")
-                return
-            reading = click.prompt("Reading (mg/dL)", type=float)
-            if reading <= 0:
-                click.echo("Reading must be positive.")
-                return
-            GlucoseLog.create(session, patient=patient, reading=reading)
-            click.echo("Logged.")
-        elif action == 3:
-            gid = click.prompt("Glucose Log ID", type=int)
-            g = GlucoseLog.get_by_id(session, gid)
-            if not g:
-                click.echo("Log not found.")
-                return
-            g.delete(session)
-            click.echo("Deleted.")
-        elif action == 4:
-            start = _parse_date(click.prompt("Start date (YYYY-MM-DD)"))
-            end = _parse_date(click.prompt("End date (YYYY-MM-DD)"))
-            logs = GlucoseLog.find_by_date_range(session, datetime.combine(start, datetime.min.time()), datetime.combine(end, datetime.max.time()))
-            if not logs:
-                click.echo("No logs in range.")
-                return
-            rows = [[g.id, g.patient_id, g.reading, g.timestamp.strftime("%Y-%m-%d %H:%M")] for g in logs]
-            _print_table(rows, ["ID", "Patient ID", "Reading", "Timestamp"])
-        elif action == 5:
-            pid = click.prompt("Patient ID", type=int)
-            logs = session.query(GlucoseLog).filter(GlucoseLog.patient_id == pid).all()
-            if not logs:
-                click.echo("No logs for patient.")
-                return
-            rows = [[g.id, g.reading, g.timestamp.strftime("%Y-%m-%d %H:%M")] for g in logs]
-            _print_table(rows, ["Log ID", "Reading", "Timestamp"])
-        else:
-            click.echo("Invalid choice.")
-    except Exception as e:
-        session.rollback()
-        click.echo(f"Error: {e}")
-    finally:
-        session.close()
+    started = (ctx.obj or {}).get("started")
+    schema_started = time.perf_counter()
+    created = None
+    if ctx.invoked_subcommand not in DB_FREE_COMMANDS:
+        from db.schema import ensure_schema
+        created = ensure_schema()
+    schema_time = time.perf_counter() - schema_started
+
+    if profile_startup:
+        echo = lambda msg: click.echo(msg, err=True)  # noqa: E731
+        echo("Startup profile:")
+        if started is not None:
+            echo(f"  main + cli imports        {_ms(schema_started - started - sum(t for _, t in ctx.command.load_times.values()))}")
+        for name, (module_name, seconds) in ctx.command.load_times.items():
+            echo(f"  load {name:<20} {_ms(seconds)}  ({module_name})")
+        if created is not None:
+            echo(f"  schema check              {_ms(schema_time)}  ({'create_all ran' if created else 'marker current, create_all skipped'})")
+        if started is not None:
+            echo(f"  total before command      {_ms(time.perf_counter() - started)}")
+
+    if trace:
+        from db.instrumentation import enable_tracing
+        from db.setup import engine
+        enable_tracing(engine)
+    if ctx.invoked_subcommand is not None and (trace or ctx.invoked_subcommand not in DB_FREE_COMMANDS):
+        # Names the command in --trace output and the slow-query log.
+        from db.instrumentation import query_scope
+        ctx.with_resource(query_scope(ctx.invoked_subcommand, emit=lambda msg: click.echo(msg, err=True)))
 
-
-def _medications_menu():
-    session = Session()
-    try:
-        click.echo("\nMedications Menu:")
-        click.echo("1. List all")
-        click.echo("2. Create")
-        click.echo("3. Delete")
-        click.echo("4. List by patient")
-        action = click.prompt("Enter choice number", type=int)
-        if action == 1:
-            meds = Medication.get_all(session)
-            if not meds:
-                click.echo("No medications found.")
-                return
-            rows = [[m.id, m.patient_id, m.name, m.dosage, (m.start_date.strftime("%Y-%m-%d") if m.start_date else "-")] for m in meds]
-            _print_table(rows, ["ID", "Patient ID", "Name", "Dosage", "Start Date"])
-        elif action == 2:
-            pid = click.prompt("Patient ID", type=int)
-            patient = Patient.get_by_id(session, pid)
-            if not patient:
-                click.echo("Patient not found.")
-                return
-            name = click.prompt("Medication name")
-            dosage = click.prompt("Dosage", default="")
-            start = click.prompt("Start date (YYYY-MM-DD)", default="")
-            start_date = _parse_date(start) if start else None
-            Medication.create(session, patient=patient, name=name, dosage=dosage, start_date=start_date)
-            click.echo("Created medication.")
-        elif action == 3:
-            mid = click.prompt("Medication ID", type=int)
-            m = Medication.get_by_id(session, mid)
-            if not m:
-                click.echo("Medication not found.")
-                return
-            m.delete(session)
-            click.echo("Deleted.")
-        elif action == 4:
-            pid = click.prompt("Patient ID", type=int)
-            meds = session.query(Medication).filter(Medication.patient_id == pid).all()
-            if not meds:
-                click.echo("No medications for patient.")
-                return
-            rows = [[m.id, m.name, m.dosage, (m.start_date.strftime("%Y-%m-%d") if m.start_date else "-")] for m in meds]
-            _print_table(rows, ["Med ID", "Name", "Dosage", "Start Date"])
-        else:
-            click.echo("Invalid choice.")
-    except Exception as e:
-        session.rollback()
-        click.echo(f"Error: {e}")
-    finally:
-        session.close()
-
-
-@cli.command()
-@click.option('--name', prompt='Patient name', help='Full name of the patient')
-@click.option('--dob', prompt='Date of birth (YYYY-MM-DD)', help='Date of birth in YYYY-MM-DD format')
-@click.option('--contact', prompt='Contact info', help='Phone or email')
-def add_patient(name, dob, contact):
-    """Add a new patient to the system."""
-    session = Session()
-    try:
-        dob_parsed = datetime.strptime(dob, "%Y-%m-%d").date()
-        new_patient = Patient(name=name, date_of_birth=dob_parsed, contact=contact)
-        session.add(new_patient)
-        session.commit()
-        click.echo(f"✅ Patient '{name}' added successfully.")
-      
-        if click.confirm("Log an initial glucose reading now?", default=False):
-            reading = click.prompt("Reading (mg/dL)", type=float)
-            if reading <= 0:
-                click.echo("Reading must be positive. Skipping initial log.")
-            else:
-                GlucoseLog.create(session, patient=new_patient, reading=reading)
-                click.echo("Initial glucose logged.")
-    except ValueError:
-        click.echo("❌ Invalid date format. Please use YYYY-MM-DD.")
-    except SQLAlchemyError as e:
-        session.rollback()
-        click.echo(f"❌ Database error: {e}")
-    finally:
-        session.close()
-
-
-@cli.command()
-@click.option('--patient-id', prompt='Patient ID', help='ID of the patient')
-@click.option('--reading', prompt='Glucose reading (mg/dL)', type=float, help='Blood sugar level')
-def log_glucose(patient_id, reading):
-    """Log a glucose reading for a patient."""
-    session = Session()
-    try:
-        patient = session.query(Patient).get(int(patient_id))
-        if not patient:
-            click.echo(f"❌ No patient found with ID {patient_id}")
-            return
-
-        new_log = GlucoseLog(reading=reading, patient=patient)
-        session.add(new_log)
-        session.commit()
-        click.echo(f"✅ Glucose reading of {reading} mg/dL logged for {patient.name}")
-    except SQLAlchemyError as e:
-        session.rollback()
-        click.echo(f"❌ Database error: {e}")
-    finally:
-        session.close()
-
-
-@cli.command()
-def view_patients():
-    """Display all registered patients in a table."""
-    session = Session()
-    try:
-        patients = session.query(Patient).all()
-        if not patients:
-            click.echo("⚠️ No patients found.")
-            return
-
-        table = [
-            [p.id, p.name, p.date_of_birth.strftime("%Y-%m-%d"), p.contact]
-            for p in patients
-        ]
-        headers = ["ID", "Name", "Date of Birth", "Contact"]
-        click.echo(tabulate(table, headers=headers, tablefmt="fancy_grid"))
-    except SQLAlchemyError as e:
-        click.echo(f"❌ Database error: {e}")
-    finally:
-        session.close()
\ No newline at end of file
+    if ctx.invoked_subcommand is None:
+        from cli.menus import run_menu
+        run_menu()
@@ -0,0 +1,178 @@
+#list-patients / list-glucose / list-medications / list-alerts / glucose-series
+#Keyset-paginated listings that stream rows as each page arrives
+
+from datetime import date
+
+import click
+from sqlalchemy.exc import SQLAlchemyError
+from db.setup import Session
+from models.patient import Patient
+from models.glucose_log import GlucoseLog, GlucoseStats, RESOLUTIONS, parse_resolution
+from models.glucose_series import GlucoseSeries
+from models.medication import Medication
+from models.alert import Alert
+from models.patient_summary import stats_by_patient
+from cli.render import RowWriter, FORMATS
+
+PATIENT_HEADERS = ["ID", "Name", "DOB", "Contact", "Age", "Avg Glucose", "Readings", "TIR %"]
+GLUCOSE_HEADERS = ["ID", "Patient ID", "Reading", "Timestamp"]
+MEDICATION_HEADERS = ["ID", "Patient ID", "Name", "Dosage", "Start Date", "End Date", "Status"]
+ALERT_HEADERS = ["ID", "Patient ID", "Kind", "Severity", "Reading", "Reading At", "Message"]
+SERIES_HEADERS = ["Patient ID", "Time", "Readings", "Avg", "Min", "Max"]
+
+
+def patient_rows(session, patients):
+    """Table rows for a page of patients; glucose stats come from the daily rollups (cached)."""
+    stats = stats_by_patient(session, [p.id for p in patients])
+    rows = []
+    for p in patients:
+        s = stats.get(p.id, GlucoseStats())
+        rows.append([p.id, p.name, p.date_of_birth.strftime("%Y-%m-%d"), p.contact, p.age, s.average, s.count, s.time_in_range])
+    return rows
+
+
+def glucose_rows(logs):
+    """Table rows for ``GlucoseLog`` objects or a ``GlucoseSeries`` page."""
+    return [[g.id, g.patient_id, g.reading, g.timestamp.strftime("%Y-%m-%d %H:%M")] for g in logs]
+
+
+def _day(value) -> str:
+    return value.strftime("%Y-%m-%d") if value else "-"
+
+
+def medication_rows(meds):
+    return [[m.id, m.patient_id, m.name, m.dosage, _day(m.start_date), _day(m.end_date), m.status] for m in meds]
+
+
+def alert_rows(alerts):
+    return [[a.id, a.patient_id, a.kind, a.severity, a.reading, a.reading_at.strftime("%Y-%m-%d %H:%M"), a.message]
+            for a in alerts]
+
+
+def series_rows(points):
+    return [[p.patient_id, p.start.strftime("%Y-%m-%d %H:%M"), p.count, p.average, p.minimum, p.maximum] for p in points]
+
+
+def _list_options(func):
+    func = click.option("--page-size", type=click.IntRange(min=1), default=500, show_default=True,
+                        help="Rows fetched per query")(func)
+    func = click.option("--format", "fmt", type=click.Choice(FORMATS), default="table", show_default=True)(func)
+    func = click.option("--after-id", type=int, default=None, help="Resume after this ID (keyset cursor)")(func)
+    func = click.option("--limit", type=click.IntRange(min=1), default=None, help="Maximum rows to print")(func)
+    return func
+
+
+def _stream(pages, headers, to_rows, fmt, empty_msg):
+    writer = RowWriter(headers, fmt)
+    for page in pages:
+        writer.write_page(to_rows(page))
+    if writer.count == 0:
+        click.echo(empty_msg, err=True)
+
+
+@click.command("list-patients")
+@_list_options
+def list_patients(limit, after_id, fmt, page_size):
+    """Stream all patients with their glucose stats."""
+    session = Session()
+    try:
+        pages = Patient.iter_all(session, after_id=after_id, limit=limit, page_size=page_size)
+        _stream(pages, PATIENT_HEADERS, lambda page: patient_rows(session, page), fmt, "⚠️ No patients found.")
+    except SQLAlchemyError as e:
+        click.echo(f"❌ Database error: {e}")
+    finally:
+        session.close()
+
+
+@click.command("list-glucose")
+@click.option("--patient-id", type=int, default=None, help="Only logs for this patient")
+@_list_options
+def list_glucose(patient_id, limit, after_id, fmt, page_size):
+    """Stream glucose logs in ID order."""
+    session = Session()
+    try:
+        pages = GlucoseSeries.iter_pages(session, patient_id=patient_id, after_id=after_id, limit=limit,
+                                         page_size=page_size)
+        _stream(pages, GLUCOSE_HEADERS, glucose_rows, fmt, "⚠️ No glucose logs found.")
+    except SQLAlchemyError as e:
+        click.echo(f"❌ Database error: {e}")
+    finally:
+        session.close()
+
+
+@click.command("list-medications")
+@click.option("--patient-id", type=int, default=None, help="Only medications for this patient")
+@click.option("--active", is_flag=True, help="Only medications being taken today")
+@click.option("--active-on", type=click.DateTime(formats=["%Y-%m-%d"]), default=None,
+              help="Only medications being taken on this day")
+@_list_options
+def list_medications(patient_id, active, active_on, limit, after_id, fmt, page_size):
+    """Stream medications in ID order."""
+    if active and active_on is None:
+        active_on = date.today()
+    session = Session()
+    try:
+        pages = Medication.iter_all(session, patient_id=patient_id, after_id=after_id, limit=limit, page_size=page_size,
+                                    active_on=active_on)
+        _stream(pages, MEDICATION_HEADERS, medication_rows, fmt, "⚠️ No medications found.")
+    except SQLAlchemyError as e:
+        click.echo(f"❌ Database error: {e}")
+    finally:
+        session.close()
+
+
+@click.command("list-alerts")
+@click.option("--patient-id", type=int, default=None, help="Only alerts for this patient")
+@click.option("--since", type=click.DateTime(formats=["%Y-%m-%d", "%Y-%m-%dT%H:%M"]), default=None,
+              help="Only alerts for readings at or after this time")
+@_list_options
+def list_alerts(patient_id, since, limit, after_id, fmt, page_size):
+    """Stream glucose alerts in ID order."""
+    session = Session()
+    try:
+        pages = Alert.iter_all(session, patient_id=patient_id, since=since, after_id=after_id, limit=limit,
+                               page_size=page_size)
+        _stream(pages, ALERT_HEADERS, alert_rows, fmt, "⚠️ No alerts found.")
+    except SQLAlchemyError as e:
+        click.echo(f"❌ Database error: {e}")
+    finally:
+        session.close()
+
+
+def _resolution(ctx, param, value):
+    if value is not None:
+        try:
+            parse_resolution(value)
+        except ValueError as e:
+            raise click.BadParameter(str(e))
+    return value
+
+
+@click.command("glucose-series")
+@click.option("--patient-id", type=int, default=None, help="Only this patient (required with --points)")
+@click.option("--since", type=click.DateTime(formats=["%Y-%m-%d", "%Y-%m-%dT%H:%M"]), default=None,
+              help="First reading time to include")
+@click.option("--until", type=click.DateTime(formats=["%Y-%m-%d", "%Y-%m-%dT%H:%M"]), default=None,
+              help="Include readings before this time")
+@click.option("--resolution", callback=_resolution, default=None,
+              help=f"Bucket width, e.g. {', '.join(RESOLUTIONS)} (default 1h)")
+@click.option("--points", type=click.IntRange(min=2), default=None,
+              help="Instead of buckets, keep this many readings picked by LTTB (for charts)")
+@click.option("--format", "fmt", type=click.Choice(FORMATS), default="table", show_default=True)
+def glucose_series(patient_id, since, until, resolution, points, fmt):
+    """Glucose readings as a time series: bucketed averages or LTTB-downsampled points."""
+    if points is not None and resolution is not None:
+        raise click.UsageError("Pass either --resolution or --points, not both.")
+    if points is not None and patient_id is None:
+        raise click.UsageError("--points needs --patient-id.")
+    session = Session()
+    try:
+        if points is not None:
+            series = GlucoseLog.downsample(session, patient_id, points, since, until)
+        else:
+            series = GlucoseLog.series(session, since, until, resolution or "1h", patient_id=patient_id)
+        _stream([series], SERIES_HEADERS, series_rows, fmt, "⚠️ No glucose logs found.")
+    except SQLAlchemyError as e:
+        click.echo(f"❌ Database error: {e}")
+    finally:
+        session.close()
@@ -0,0 +1,76 @@
+#rebuild-rollups / rebuild-search-index / cache-stats
+#Housekeeping commands for derived tables and caches
+
+import click
+from sqlalchemy.exc import SQLAlchemyError
+from db.setup import Session
+from models.glucose_rollup import GlucoseRollup
+from models.patient import Patient
+from models.medication import Medication
+from models.name_search import rebuild_name_index
+from models.patient_summary import summary_cache, invalidate
+from cli.client import request, DaemonError
+
+
+@click.command("rebuild-rollups")
+@click.option("--patient-id", type=int, default=None, help="Only rebuild this patient's buckets")
+def rebuild_rollups(patient_id):
+    """Recompute hourly/daily glucose rollups from raw readings."""
+    session = Session()
+    try:
+        written = GlucoseRollup.rebuild(session, patient_id=patient_id)
+        # Core rewrite of the buckets: cached stats built from them are stale.
+        if patient_id is None:
+            summary_cache.clear()
+        else:
+            invalidate([patient_id])
+        click.echo(f"✅ Rebuilt {written} rollup bucket(s).")
+    except SQLAlchemyError as e:
+        session.rollback()
+        click.echo(f"❌ Database error: {e}")
+    finally:
+        session.close()
+
+
+@click.command("rebuild-search-index")
+def rebuild_search_index():
+    """Create (if needed) and repopulate the patient/medication name search indexes."""
+    session = Session()
+    try:
+        for table in (Patient.__table__, Medication.__table__):
+            if rebuild_name_index(session, table):
+                click.echo(f"✅ Rebuilt search index for {table.name}.")
+            else:
+                click.echo(f"⚠️ FTS5 trigram search unavailable for {table.name}; using ILIKE search.")
+    except SQLAlchemyError as e:
+        session.rollback()
+        click.echo(f"❌ Database error: {e}")
+    finally:
+        session.close()
+
+
+@click.command("cache-stats")
+@click.option("--clear", is_flag=True, help="Drop every cached summary and reset the counters")
+def cache_stats(clear):
+    """Hit/miss counters for the patient summary cache (disk tier and running daemon)."""
+    from tabulate import tabulate
+
+    if clear:
+        summary_cache.clear()
+        click.echo("✅ Summary cache cleared.")
+    sections = []
+    if summary_cache.disk is not None:
+        sections.append(("Disk cache (all CLI processes)", summary_cache.report()))
+    try:
+        response = request("ping")
+    except DaemonError:
+        response = None
+    if response and response["ok"]:
+        sections.append(("Daemon (in memory)", response["result"]["cache"]))
+    if not sections:
+        click.echo("⚠️ No shared cache to report on: set SUMMARY_CACHE_PATH or run `serve`.")
+        click.echo("   Each CLI process otherwise starts with an empty in-memory cache.")
+        return
+    for title, report in sections:
+        click.echo(title)
+        click.echo(tabulate(report.items(), headers=["Counter", "Value"], tablefmt="fancy_grid"))
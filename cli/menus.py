@@ -0,0 +1,332 @@
+#Interactive Patients / Glucose Logs / Medications menus
+
+import click
+from db.setup import Session
+from db.instrumentation import query_scope
+from db.unit_of_work import uow
+from models.patient import Patient, RECENT_LOGS
+from models.glucose_log import GlucoseLog, RESOLUTIONS, parse_resolution
+from models.glucose_series import GlucoseSeries
+from models.medication import Medication, STOPPED
+from models.glucose_rollup import GlucoseRollup
+from models.patient_summary import patient_summary
+from tabulate import tabulate
+from cli.listing import (
+    patient_rows, glucose_rows, medication_rows, series_rows,
+    PATIENT_HEADERS, GLUCOSE_HEADERS, MEDICATION_HEADERS, SERIES_HEADERS,
+)
+from datetime import datetime, date, timedelta
+
+
+MENU_PAGE_SIZE = 50
+
+
+def _print_table(rows, headers):
+    click.echo(tabulate(rows, headers=headers, tablefmt="fancy_grid"))
+
+
+def _page_table(pages, headers, to_rows, empty_msg):
+    """Print one table per page, asking before fetching the next page."""
+    shown = False
+    for page in pages:
+        _print_table(to_rows(page), headers)
+        shown = True
+        if len(page) < MENU_PAGE_SIZE or not click.confirm("Show more?", default=True):
+            break
+    if not shown:
+        click.echo(empty_msg)
+
+
+def _prompt_resolution():
+    """``None`` for raw readings, else a validated bucket width such as ``1h``."""
+    while True:
+        value = click.prompt(f"Resolution (raw, {', '.join(RESOLUTIONS)})", default="raw").strip().lower()
+        if value == "raw":
+            return None
+        try:
+            parse_resolution(value)
+            return value
+        except ValueError as e:
+            click.echo(str(e))
+
+
+def _series_table(points, empty_msg):
+    pages = (points[i:i + MENU_PAGE_SIZE] for i in range(0, len(points), MENU_PAGE_SIZE))
+    _page_table(pages, SERIES_HEADERS, series_rows, empty_msg)
+
+
+def _menu_scope(menu: str, options, action: int):
+    """Query scope for one menu action, summarised on stderr under --trace."""
+    label = options[action - 1] if 1 <= action <= len(options) else "invalid choice"
+    return query_scope(f"{menu} > {label}", emit=lambda msg: click.echo(msg, err=True))
+
+
+def _parse_date(value: str) -> date:
+    return datetime.strptime(value, "%Y-%m-%d").date()
+
+
+def _fmt_date(value) -> str:
+    return value.strftime("%Y-%m-%d") if value else "-"
+
+
+def show_dashboard(session, patient_id: int, recent: int = RECENT_LOGS):
+    p = patient_summary(session, patient_id, recent=recent)
+    if p is None:
+        click.echo("Patient not found.")
+        return
+    stats = p.stats
+    click.echo(f"\nPatient: {p.name} (Age {p.age})  Avg Glucose: {stats.average}")
+    if stats.count:
+        click.echo(f"Readings: {stats.count}  Min {stats.minimum}  Max {stats.maximum}  SD {stats.stddev}  TIR {stats.time_in_range}%")
+    if p.recent_logs:
+        rows = [[g.id, g.reading, g.timestamp.strftime("%Y-%m-%d %H:%M")] for g in p.recent_logs]
+        click.echo(f"Latest {len(rows)} glucose log(s):")
+        _print_table(rows, ["Log ID", "Reading", "Timestamp"])
+    else:
+        click.echo("No glucose logs.")
+    current = [m for m in p.medications if m.status != STOPPED]
+    past = [m for m in p.medications if m.status == STOPPED]
+    if current:
+        rows = [[m.id, m.name, m.dosage, _fmt_date(m.start_date), m.status] for m in current]
+        click.echo("Current medications:")
+        _print_table(rows, ["Med ID", "Name", "Dosage", "Start Date", "Status"])
+    else:
+        click.echo("No current medications.")
+    if past:
+        rows = [[m.id, m.name, m.dosage, _fmt_date(m.start_date), _fmt_date(m.end_date)] for m in past]
+        click.echo(f"Past medications ({len(past)}):")
+        _print_table(rows, ["Med ID", "Name", "Dosage", "Start Date", "End Date"])
+
+
+def run_menu():
+    click.echo("Welcome to the Diabetes CLI System!")
+    while True:
+        click.echo("\nSelect an option:")
+        options = [
+            "Patients",
+            "Glucose Logs",
+            "Medications",
+            "Exit",
+        ]
+        for i, label in enumerate(options, start=1):
+            click.echo(f"{i}. {label}")
+        choice = click.prompt("Enter choice number", type=int)
+        if choice == 1:
+            _patients_menu()
+        elif choice == 2:
+            _glucose_menu()
+        elif choice == 3:
+            _medications_menu()
+        elif choice == 4:
+            click.echo("Thank you for using the Diabetes CLI System!")
+            break
+        else:
+            click.echo("Invalid choice. Choose amongst the options.")
+
+
+def _patients_menu():
+    session = Session()
+    try:
+        options = [
+            "List all",
+            "Create",
+            "Delete",
+            "Find by name",
+            "View related (logs + medications)",
+        ]
+        click.echo("\nPatients Menu:")
+        for i, label in enumerate(options, start=1):
+            click.echo(f"{i}. {label}")
+        action = click.prompt("Enter choice number", type=int)
+        with _menu_scope("Patients", options, action):
+            if action == 1:
+                pages = Patient.iter_all(session, page_size=MENU_PAGE_SIZE)
+                _page_table(pages, PATIENT_HEADERS, lambda page: patient_rows(session, page), "No patients found.")
+            elif action == 2:
+                name = click.prompt("Name")
+                dob_str = click.prompt("DOB (YYYY-MM-DD)")
+                contact = click.prompt("Contact", default="")
+                dob = _parse_date(dob_str)
+                # Optional initial glucose reading, asked before writing so the
+                # transaction is not held open while waiting for input.
+                reading = None
+                if click.confirm("Log an initial glucose reading now?", default=False):
+                    reading = click.prompt("Reading (mg/dL)", type=float)
+                    if reading <= 0:
+                        click.echo("Reading must be positive. Skipping initial log.")
+                        reading = None
+                with uow(session):
+                    p = Patient.create(session, name=name, date_of_birth=dob, contact=contact)
+                    if reading is not None:
+                        GlucoseLog.create(session, patient=p, reading=reading)
+                click.echo(f"Created patient {p.id}: {p.name}")
+                if reading is not None:
+                    click.echo("Initial glucose logged.")
+            elif action == 3:
+                pid = click.prompt("Patient ID", type=int)
+                p = Patient.get_by_id(session, pid)
+                if not p:
+                    click.echo("Patient not found.")
+                    return
+                p.delete(session)
+                click.echo("Deleted.")
+            elif action == 4:
+                term = click.prompt("Search term (name)")
+                matches = Patient.find_by_name(session, term)
+                if not matches:
+                    click.echo("No matches.")
+                    return
+                rows = [[p.id, p.name, p.date_of_birth.strftime("%Y-%m-%d"), p.contact] for p in matches]
+                _print_table(rows, ["ID", "Name", "DOB", "Contact"])
+            elif action == 5:
+                pid = click.prompt("Patient ID", type=int)
+                show_dashboard(session, pid)
+            else:
+                click.echo("Invalid choice.")
+    except Exception as e:
+        session.rollback()
+        click.echo(f"Error: {e}")
+    finally:
+        session.close()
+
+
+def _glucose_menu():
+    session = Session()
+    try:
+        options = [
+            "List all",
+            "Create",
+            "Delete",
+            "Find by date range",
+            "List by patient",
+        ]
+        click.echo("\nGlucose Logs Menu:")
+        for i, label in enumerate(options, start=1):
+            click.echo(f"{i}. {label}")
+        action = click.prompt("Enter choice number", type=int)
+        with _menu_scope("Glucose Logs", options, action):
+            if action == 1:
+                pages = GlucoseSeries.iter_pages(session, page_size=MENU_PAGE_SIZE)
+                _page_table(pages, GLUCOSE_HEADERS, glucose_rows, "No glucose logs found.")
+            elif action == 2:
+                pid = click.prompt("Patient ID", type=int)
+                patient = Patient.get_by_id(session, pid)
+                if not patient:
+                    click.echo("Patient not found.")
+                    return
+                reading = click.prompt("Reading (mg/dL)", type=float)
+                if reading <= 0:
+                    click.echo("Reading must be positive.")
+                    return
+                GlucoseLog.create(session, patient=patient, reading=reading)
+                click.echo("Logged.")
+            elif action == 3:
+                gid = click.prompt("Glucose Log ID", type=int)
+                g = GlucoseLog.get_by_id(session, gid)
+                if not g:
+                    click.echo("Log not found.")
+                    return
+                g.delete(session)
+                click.echo("Deleted.")
+            elif action == 4:
+                start = _parse_date(click.prompt("Start date (YYYY-MM-DD)"))
+                end = _parse_date(click.prompt("End date (YYYY-MM-DD)"))
+                range_start = datetime.combine(start, datetime.min.time())
+                range_end = datetime.combine(end + timedelta(days=1), datetime.min.time())
+                summary = GlucoseRollup.summarize(session, range_start, range_end)
+                if summary.count:
+                    click.echo(f"Summary: {summary.count} readings  Avg {summary.average}  Min {summary.minimum}  Max {summary.maximum}  SD {summary.stddev}  TIR {summary.time_in_range}%")
+                resolution = _prompt_resolution()
+                if resolution:
+                    _series_table(GlucoseLog.series(session, range_start, range_end, resolution), "No logs in range.")
+                    return
+                pages = GlucoseSeries.iter_pages(session, start=range_start, end=range_end, by_time=True, page_size=MENU_PAGE_SIZE)
+                _page_table(pages, GLUCOSE_HEADERS, glucose_rows, "No logs in range.")
+            elif action == 5:
+                pid = click.prompt("Patient ID", type=int)
+                resolution = _prompt_resolution()
+                if resolution:
+                    _series_table(GlucoseLog.series(session, resolution=resolution, patient_id=pid), "No logs for patient.")
+                    return
+                pages = GlucoseSeries.iter_pages(session, patient_id=pid, page_size=MENU_PAGE_SIZE)
+                _page_table(pages, GLUCOSE_HEADERS, glucose_rows, "No logs for patient.")
+            else:
+                click.echo("Invalid choice.")
+    except Exception as e:
+        session.rollback()
+        click.echo(f"Error: {e}")
+    finally:
+        session.close()
+
+
+def _medications_menu():
+    session = Session()
+    try:
+        options = [
+            "List all",
+            "Create",
+            "Delete",
+            "List by patient",
+            "Stop (set end date)",
+            "Patients on a drug",
+        ]
+        click.echo("\nMedications Menu:")
+        for i, label in enumerate(options, start=1):
+            click.echo(f"{i}. {label}")
+        action = click.prompt("Enter choice number", type=int)
+        with _menu_scope("Medications", options, action):
+            if action == 1:
+                pages = Medication.iter_all(session, page_size=MENU_PAGE_SIZE)
+                _page_table(pages, MEDICATION_HEADERS, medication_rows, "No medications found.")
+            elif action == 2:
+                pid = click.prompt("Patient ID", type=int)
+                patient = Patient.get_by_id(session, pid)
+                if not patient:
+                    click.echo("Patient not found.")
+                    return
+                name = click.prompt("Medication name")
+                dosage = click.prompt("Dosage", default="")
+                start = click.prompt("Start date (YYYY-MM-DD)", default="")
+                start_date = _parse_date(start) if start else None
+                end = click.prompt("End date (YYYY-MM-DD, blank if ongoing)", default="")
+                end_date = _parse_date(end) if end else None
+                Medication.create(session, patient=patient, name=name, dosage=dosage, start_date=start_date,
+                                  end_date=end_date)
+                click.echo("Created medication.")
+            elif action == 3:
+                mid = click.prompt("Medication ID", type=int)
+                m = Medication.get_by_id(session, mid)
+                if not m:
+                    click.echo("Medication not found.")
+                    return
+                m.delete(session)
+                click.echo("Deleted.")
+            elif action == 4:
+                pid = click.prompt("Patient ID", type=int)
+                active_on = date.today() if click.confirm("Current medications only?", default=True) else None
+                pages = Medication.iter_all(session, patient_id=pid, page_size=MENU_PAGE_SIZE, active_on=active_on)
+                _page_table(pages, MEDICATION_HEADERS, medication_rows, "No medications for patient.")
+            elif action == 5:
+                mid = click.prompt("Medication ID", type=int)
+                m = Medication.get_by_id(session, mid)
+                if not m:
+                    click.echo("Medication not found.")
+                    return
+                end = click.prompt("Last day taken (YYYY-MM-DD)", default=date.today().strftime("%Y-%m-%d"))
+                m.stop(session, _parse_date(end))
+                click.echo(f"Stopped {m.name} as of {m.end_date:%Y-%m-%d}.")
+            elif action == 6:
+                drug = click.prompt("Drug name")
+                at = click.prompt("On date (YYYY-MM-DD)", default=date.today().strftime("%Y-%m-%d"))
+                patients = Medication.patients_on(session, drug, _parse_date(at))
+                if not patients:
+                    click.echo("No patients on that drug.")
+                    return
+                _print_table(patient_rows(session, patients), PATIENT_HEADERS)
+            else:
+                click.echo("Invalid choice.")
+    except Exception as e:
+        session.rollback()
+        click.echo(f"Error: {e}")
+    finally:
+        session.close()
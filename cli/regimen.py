@@ -0,0 +1,110 @@
+#stop-medication / patients-on / glucose-regimen / regimen-outcomes
+#Medication timelines: who takes what when, and glucose lined up against it
+
+from datetime import date
+
+import click
+from sqlalchemy.exc import SQLAlchemyError
+from db.setup import Session
+from models.medication import Medication
+from cli.listing import patient_rows, PATIENT_HEADERS
+from cli.render import RowWriter, FORMATS
+
+DAY = click.DateTime(formats=["%Y-%m-%d"])
+MOMENT = click.DateTime(formats=["%Y-%m-%d", "%Y-%m-%dT%H:%M"])
+REGIMEN_HEADERS = ["ID", "Patient ID", "Reading", "Timestamp", "Regimen"]
+OUTCOME_HEADERS = ["Drug", "Patients", "On Readings", "On Avg", "On TIR %", "Off Readings", "Off Avg", "Off TIR %",
+                   "Avg Change"]
+
+
+@click.command("stop-medication")
+@click.option("--medication-id", prompt="Medication ID", type=int, help="Medication to stop")
+@click.option("--end-date", type=DAY, default=None, help="Last day taken (default today)")
+def stop_medication(medication_id, end_date):
+    """Record the last day a medication was taken."""
+    session = Session()
+    try:
+        med = Medication.get_by_id(session, medication_id)
+        if med is None:
+            click.echo("⚠️ Medication not found.")
+            return
+        med.stop(session, end_date)
+        click.echo(f"✅ Stopped {med.name} for patient {med.patient_id} as of {med.end_date:%Y-%m-%d}.")
+    except ValueError as e:
+        click.echo(f"❌ {e}")
+    except SQLAlchemyError as e:
+        session.rollback()
+        click.echo(f"❌ Database error: {e}")
+    finally:
+        session.close()
+
+
+@click.command("patients-on")
+@click.argument("drug")
+@click.option("--at", type=DAY, default=None, help="Day to check (default today)")
+@click.option("--format", "fmt", type=click.Choice(FORMATS), default="table", show_default=True)
+def patients_on(drug, at, fmt):
+    """List patients taking DRUG (exact name, any case) on a given day."""
+    session = Session()
+    try:
+        patients = Medication.patients_on(session, drug, at)
+        if not patients:
+            click.echo(f"⚠️ No patients on {drug} on {(at or date.today()):%Y-%m-%d}.")
+            return
+        RowWriter(PATIENT_HEADERS, fmt).write_page(patient_rows(session, patients))
+    except SQLAlchemyError as e:
+        click.echo(f"❌ Database error: {e}")
+    finally:
+        session.close()
+
+
+@click.command("glucose-regimen")
+@click.option("--patient-id", type=int, default=None, help="Only this patient")
+@click.option("--since", type=MOMENT, default=None, help="First reading time to include")
+@click.option("--until", type=MOMENT, default=None, help="Include readings before this time")
+@click.option("--format", "fmt", type=click.Choice(FORMATS), default="table", show_default=True)
+@click.option("--page-size", type=click.IntRange(min=1), default=500, show_default=True, help="Rows per output block")
+def glucose_regimen(patient_id, since, until, fmt, page_size):
+    """Stream glucose readings with the medications being taken that day."""
+    session = Session()
+    writer = RowWriter(REGIMEN_HEADERS, fmt)
+    try:
+        page = []
+        for r in Medication.readings_with_regimen(session, patient_id, since, until, batch_size=page_size):
+            page.append([r.id, r.patient_id, r.reading, r.timestamp.strftime("%Y-%m-%d %H:%M"),
+                         " + ".join(r.regimen) or "-"])
+            if len(page) >= page_size:
+                writer.write_page(page)
+                page = []
+        writer.write_page(page)
+        if writer.count == 0:
+            click.echo("⚠️ No glucose logs found.", err=True)
+    except SQLAlchemyError as e:
+        click.echo(f"❌ Database error: {e}")
+    finally:
+        session.close()
+
+
+@click.command("regimen-outcomes")
+@click.option("--drug", default=None, help="Only this drug (exact name, any case)")
+@click.option("--since", type=MOMENT, default=None, help="First reading time to include")
+@click.option("--until", type=MOMENT, default=None, help="Include readings before this time")
+@click.option("--format", "fmt", type=click.Choice(FORMATS), default="table", show_default=True)
+def regimen_outcomes(drug, since, until, fmt):
+    """Cohort glucose stats on vs. off each drug, for the patients prescribed it."""
+    session = Session()
+    try:
+        outcomes = Medication.outcomes_by_drug(session, drug, since, until)
+        if not outcomes:
+            click.echo("⚠️ No prescriptions with glucose readings found.")
+            return
+        rows = []
+        for o in outcomes:
+            change = round(o.on.average - o.off.average, 2) if o.on.count and o.off.count else "-"
+            rows.append([o.drug, o.patients, o.on.count, o.on.average, o.on.time_in_range,
+                         o.off.count, o.off.average, o.off.time_in_range, change])
+        RowWriter(OUTCOME_HEADERS, fmt).write_page(rows)
+    except SQLAlchemyError as e:
+        click.echo(f"❌ Database error: {e}")
+    finally:
+        session.close()
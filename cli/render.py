@@ -0,0 +1,61 @@
+import csv
+import json
+import re
+from datetime import date, datetime
+
+import click
+
+FORMATS = ("table", "plain", "csv", "ndjson")
+
+
+def _json_key(header: str) -> str:
+    return re.sub(r"[^a-z0-9]+", "_", header.lower().replace("%", "pct")).strip("_")
+
+
+def _json_value(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+
+class RowWriter:
+    """Writes rows page by page so output starts before the query finishes.
+
+    ``table`` renders each page as its own fancy_grid block; ``plain``, ``csv``
+    and ``ndjson`` emit the header once and then one line per row.
+    """
+
+    def __init__(self, headers, fmt: str = "table"):
+        self.headers = list(headers)
+        self.fmt = fmt
+        self.count = 0
+        self._keys = [_json_key(h) for h in self.headers]
+        self._started = False
+
+    def write_page(self, rows):
+        rows = list(rows)
+        if not rows:
+            return
+        if self.fmt == "table":
+            from tabulate import tabulate  # only tables need it; cli.client imports FORMATS from here
+
+            click.echo(tabulate(rows, headers=self.headers, tablefmt="fancy_grid"))
+        elif self.fmt == "plain":
+            if not self._started:
+                click.echo("\t".join(self.headers))
+            click.echo("\n".join("\t".join(str(v) for v in row) for row in rows))
+        elif self.fmt == "csv":
+            out = click.get_text_stream("stdout")
+            writer = csv.writer(out)
+            if not self._started:
+                writer.writerow(self.headers)
+            writer.writerows(rows)
+            out.flush()
+        elif self.fmt == "ndjson":
+            click.echo("\n".join(
+                json.dumps({k: _json_value(v) for k, v in zip(self._keys, row)}) for row in rows
+            ))
+        else:
+            raise ValueError(f"Unknown output format: {self.fmt}")
+        self._started = True
+        self.count += len(rows)
@@ -0,0 +1,92 @@
+#patient-report / cohort-report / cohort-merge
+#Glycemic metrics (GMI/eA1c, TIR/TAR/TBR, CV, MAGE, trend) computed with NumPy
+
+import json
+import time
+
+import click
+from sqlalchemy import select
+from sqlalchemy.exc import SQLAlchemyError
+from db.setup import Session, DATABASE_URL
+from models.patient import Patient
+from analytics.glycemic import patient_reports, report_row, REPORT_HEADERS
+from analytics.cohort import run_cohort, iter_chunks, merge_report_files
+from cli.render import RowWriter, FORMATS
+
+
+def _warn_missing(patient_ids):
+    # stderr, so --format csv/ndjson output stays clean.
+    for pid in patient_ids:
+        click.echo(f"⚠️ Patient {pid} not found.", err=True)
+
+
+@click.command("patient-report")
+@click.option("--patient-id", "patient_ids", type=int, multiple=True, help="Patient to report on (repeatable)")
+@click.option("--all", "all_patients", is_flag=True, help="Report on every patient")
+@click.option("--chunk-size", type=click.IntRange(min=1), default=200, show_default=True,
+              help="Patients whose readings are fetched per query in --all mode")
+@click.option("--format", "fmt", type=click.Choice(FORMATS), default="table", show_default=True)
+def patient_report(patient_ids, all_patients, chunk_size, fmt):
+    """Clinical glycemic report for one or more patients."""
+    if not patient_ids and not all_patients:
+        raise click.UsageError("Pass --patient-id or --all.")
+    session = Session()
+    try:
+        connection = session.connection()
+        writer = RowWriter(REPORT_HEADERS, fmt)
+        missing = []
+        if all_patients:
+            for page in Patient.iter_all(session, page_size=chunk_size):
+                writer.write_page(report_row(r) for r in patient_reports(connection, [p.id for p in page]))
+        else:
+            ids = list(dict.fromkeys(patient_ids))
+            known = set(session.scalars(select(Patient.id).where(Patient.id.in_(ids))))
+            missing = [pid for pid in ids if pid not in known]
+            found = [pid for pid in ids if pid in known]
+            if found:
+                writer.write_page(report_row(r) for r in patient_reports(connection, found))
+        _warn_missing(missing)
+        if writer.count == 0 and not missing:
+            click.echo("⚠️ No patients found.")
+    except SQLAlchemyError as e:
+        click.echo(f"❌ Database error: {e}")
+    finally:
+        session.close()
+
+
+@click.command("cohort-report")
+@click.option("--workers", type=click.IntRange(min=1), default=None, help="Worker processes (default: CPU count)")
+@click.option("--chunk-size", type=click.IntRange(min=1), default=100, show_default=True,
+              help="Patients per worker task")
+@click.option("--output", "-o", type=click.File("w"), default="-", show_default=True,
+              help="NDJSON output file, ordered by patient ID")
+def cohort_report(workers, chunk_size, output):
+    """Glycemic report for every patient, computed in parallel processes."""
+    session = Session()
+    started = time.perf_counter()
+    count = 0
+    try:
+        pages = ([p.id for p in page] for page in Patient.iter_all(session))
+        chunks = list(iter_chunks(pages, chunk_size))
+    except SQLAlchemyError as e:
+        click.echo(f"❌ Database error: {e}")
+        return
+    finally:
+        session.close()
+    try:
+        for report in run_cohort(DATABASE_URL, chunks, workers=workers):
+            output.write(json.dumps(report) + "\n")
+            count += 1
+    except SQLAlchemyError as e:
+        click.echo(f"❌ Database error: {e}", err=True)
+        return
+    elapsed = time.perf_counter() - started
+    click.echo(f"✅ Reported on {count} patient(s) in {len(chunks)} chunk(s), {elapsed:.2f}s.", err=True)
+
+
+@click.command("cohort-merge")
+@click.argument("inputs", nargs=-1, required=True, type=click.File("r"))
+@click.option("--output", "-o", type=click.File("w"), default="-", show_default=True)
+def cohort_merge(inputs, output):
+    """Merge cohort-report NDJSON files into one file ordered by patient ID."""
+    merge_report_files(inputs, output)
@@ -0,0 +1,84 @@
+#shards / shard-search / shard-stats
+#Queries fanned out over every clinic database in SHARD_URLS
+
+import time
+
+import click
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import SQLAlchemyError
+from db.shards import ShardRouter, ShardError
+from models.sharded import cohort_stats, find_patients
+from cli.render import RowWriter, FORMATS
+
+MOMENT = click.DateTime(formats=["%Y-%m-%d", "%Y-%m-%dT%H:%M"])
+SHARD_STATS_HEADERS = ["Shard", "Patients", "Readings", "Avg Glucose", "SD", "TIR %"]
+
+
+def _router():
+    try:
+        router = ShardRouter()
+    except ValueError as e:
+        raise click.UsageError(str(e))
+    if not router.names:
+        raise click.UsageError("No shards configured: set SHARD_URLS (name=url;name=url).")
+    return router
+
+
+def _shard_option(func):
+    return click.option("--shard", "shards", multiple=True,
+                        help="Limit to these shards (repeatable; default all)")(func)
+
+
+@click.command("shards")
+def list_shards():
+    """List the configured shards."""
+    router = _router()
+    for name, url in router.urls.items():
+        click.echo(f"{name}\t{make_url(url).render_as_string(hide_password=True)}")
+
+
+@click.command("shard-search")
+@click.argument("term")
+@_shard_option
+@click.option("--limit", type=click.IntRange(min=1), default=50, show_default=True)
+@click.option("--format", "fmt", type=click.Choice(FORMATS), default="table", show_default=True)
+def shard_search(term, shards, limit, fmt):
+    """Ranked patient name search across every shard at once."""
+    router = _router()
+    try:
+        matches = find_patients(router, term, limit, shards or None)
+    except (ShardError, SQLAlchemyError, KeyError) as e:
+        click.echo(f"❌ Database error: {e}")
+        return
+    finally:
+        router.dispose()
+    if not matches:
+        click.echo("⚠️ No matches.")
+        return
+    RowWriter(["Shard", "ID", "Name", "DOB", "Contact"], fmt).write_page(
+        [m.shard, m.id, m.name, m.date_of_birth.strftime("%Y-%m-%d"), m.contact] for m in matches
+    )
+
+
+@click.command("shard-stats")
+@_shard_option
+@click.option("--since", type=MOMENT, default=None, help="First reading time to include")
+@click.option("--until", type=MOMENT, default=None, help="Include readings before this time")
+@click.option("--format", "fmt", type=click.Choice(FORMATS), default="table", show_default=True)
+def shard_stats(shards, since, until, fmt):
+    """Cohort glucose stats per shard and combined, queried concurrently."""
+    router = _router()
+    started = time.perf_counter()
+    try:
+        total, summaries = cohort_stats(router, since, until, shards or None)
+    except (ShardError, SQLAlchemyError, KeyError) as e:
+        click.echo(f"❌ Database error: {e}")
+        return
+    finally:
+        router.dispose()
+    rows = [[s.shard, s.patients, s.stats.count, s.stats.average, s.stats.stddev, s.stats.time_in_range]
+            for s in summaries]
+    rows.append(["(all)", sum(s.patients for s in summaries), total.count, total.average, total.stddev,
+                 total.time_in_range])
+    RowWriter(SHARD_STATS_HEADERS, fmt).write_page(rows)
+    click.echo(f"Queried {len(summaries)} shard(s) in {time.perf_counter() - started:.2f}s.", err=True)
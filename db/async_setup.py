@@ -0,0 +1,75 @@
+"""Async engine and session factory for ``models.async_repository``.
+
+``DATABASE_URL`` is reused as-is: ``sqlite://`` URLs are driven by
+``aiosqlite`` and ``postgresql://`` URLs by ``asyncpg``. The engine gets
+the same ``DB_*`` tuning as the synchronous one (SQLite PRAGMAs on
+connect, pool sizing for servers, the slow-query log). Nothing is
+created until first use, so importing this module does not require the
+async drivers.
+"""
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import StaticPool
+
+from db.setup import DATABASE_URL, EngineProfile, _sqlite_pragmas, _apply_on_connect, _instrumented
+
+ASYNC_DRIVERS = {"sqlite": "aiosqlite", "postgresql": "asyncpg"}
+
+_factories = {}
+
+
+def async_url(url: str = DATABASE_URL):
+    """``url`` with its driver swapped for the asyncio one (``sqlite+aiosqlite://``...)."""
+    parsed = make_url(url)
+    backend = parsed.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise ValueError(f"No async driver configured for {backend!r} URLs")
+    return parsed.set(drivername=f"{backend}+{ASYNC_DRIVERS[backend]}")
+
+
+def make_async_engine(url: str = DATABASE_URL, profile: EngineProfile = None):
+    """Create an ``AsyncEngine`` tuned by ``profile`` (defaults to ``EngineProfile.from_env()``)."""
+    from sqlalchemy.ext.asyncio import create_async_engine
+
+    profile = profile or EngineProfile.from_env()
+    parsed = async_url(url)
+    if parsed.get_backend_name() != "sqlite":
+        new_engine = create_async_engine(
+            parsed,
+            pool_size=profile.pool_size,
+            max_overflow=profile.max_overflow,
+            pool_pre_ping=profile.pool_pre_ping,
+            pool_recycle=profile.pool_recycle,
+        )
+        _instrumented(new_engine.sync_engine, profile)
+        return new_engine
+
+    in_memory = parsed.database in (None, "", ":memory:")
+    kwargs = {"connect_args": {"timeout": profile.busy_timeout / 1000.0}}
+    if in_memory or profile.static_pool:
+        kwargs["poolclass"] = StaticPool
+        kwargs["connect_args"]["check_same_thread"] = False
+    new_engine = create_async_engine(parsed, **kwargs)
+    # Connection events fire on the sync facade; aiosqlite's adapter runs the PRAGMAs.
+    _apply_on_connect(new_engine.sync_engine, _sqlite_pragmas(profile, in_memory))
+    _instrumented(new_engine.sync_engine, profile)
+    return new_engine
+
+
+def async_session_factory(url: str = DATABASE_URL):
+    """An ``async_sessionmaker`` for ``url``, created (with its engine) on first call.
+
+    Sessions do not expire objects on commit, so attributes stay readable
+    afterwards without an implicit (and, under asyncio, forbidden) reload.
+    """
+    if url not in _factories:
+        from sqlalchemy.ext.asyncio import async_sessionmaker
+
+        _factories[url] = async_sessionmaker(make_async_engine(url), expire_on_commit=False)
+    return _factories[url]
+
+
+async def dispose_async_engines():
+    """Close every pooled async connection (call before the event loop shuts down)."""
+    for factory in list(_factories.values()):
+        await factory.kw["bind"].dispose()
+    _factories.clear()
@@ -0,0 +1,212 @@
+"""In-process LRU + TTL cache with an optional shared on-disk SQLite tier.
+
+The memory tier serves repeat lookups inside one process (menus, the
+``serve`` daemon); the disk tier (``SUMMARY_CACHE_PATH``) lets short-lived
+CLI invocations reuse each other's work. Invalidations delete from both
+tiers, so a write made through the app is seen by every process at once;
+writes from elsewhere are bounded by the TTL.
+"""
+import atexit
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from collections import OrderedDict, Counter
+
+COUNTERS = ("hits", "disk_hits", "misses", "expired", "evictions", "invalidations")
+
+
+class DiskCache:
+    """Pickled values in a small SQLite file, shared between processes."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, timeout=5, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute("CREATE TABLE IF NOT EXISTS entries (key TEXT PRIMARY KEY, expires REAL, value BLOB)")
+        self._db.execute("CREATE TABLE IF NOT EXISTS counters (name TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+
+    def get_many(self, keys, now: float):
+        if not keys:
+            return {}
+        marks = ",".join("?" * len(keys))
+        with self._lock:
+            rows = self._db.execute(
+                f"SELECT key, value FROM entries WHERE expires > ? AND key IN ({marks})", (now, *keys)
+            ).fetchall()
+        return {key: pickle.loads(value) for key, value in rows}
+
+    def put_many(self, items, expires: float):
+        with self._lock:
+            self._db.executemany(
+                "INSERT OR REPLACE INTO entries (key, expires, value) VALUES (?, ?, ?)",
+                [(key, expires, pickle.dumps(value, pickle.HIGHEST_PROTOCOL)) for key, value in items],
+            )
+
+    def delete(self, keys):
+        with self._lock:
+            self._db.executemany("DELETE FROM entries WHERE key = ?", [(key,) for key in keys])
+
+    def clear(self):
+        with self._lock:
+            self._db.execute("DELETE FROM entries")
+            self._db.execute("DELETE FROM counters")
+
+    def add_counters(self, deltas):
+        with self._lock:
+            self._db.executemany(
+                "INSERT INTO counters (name, value) VALUES (?, ?) "
+                "ON CONFLICT(name) DO UPDATE SET value = value + excluded.value",
+                [(name, n) for name, n in deltas.items() if n],
+            )
+
+    def counters(self):
+        with self._lock:
+            return dict(self._db.execute("SELECT name, value FROM counters"))
+
+    def size(self, now: float) -> int:
+        with self._lock:
+            self._db.execute("DELETE FROM entries WHERE expires <= ?", (now,))
+            return self._db.execute("SELECT count(*) FROM entries").fetchone()[0]
+
+
+class TTLCache:
+    """Thread-safe LRU cache whose entries also expire ``ttl`` seconds after being stored.
+
+    Keys are strings; ``disk`` (a ``DiskCache``) is consulted on memory
+    misses and written through on ``put_many``.
+    """
+
+    def __init__(self, maxsize: int = 1000, ttl: float = 300.0, disk: DiskCache = None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.disk = disk
+        self.stats = Counter()
+        self._entries = OrderedDict()  # key -> (expires, value), least recently used first
+        self._lock = threading.Lock()
+        self._unsaved = Counter()  # counter deltas not yet added to the disk tier
+        self._seq = 0
+        self._stamps = {}  # key -> _seq at its last invalidation
+
+    def _count(self, name: str, n: int = 1):
+        self.stats[name] += n
+        self._unsaved[name] += n
+
+    def get_many(self, keys):
+        """Return ``{key: value}`` for the cached keys; absent keys are misses."""
+        now = time.time()
+        found = {}
+        with self._lock:
+            for key in keys:
+                entry = self._entries.get(key)
+                if entry is None:
+                    continue
+                if entry[0] <= now:
+                    del self._entries[key]
+                    self._count("expired")
+                    continue
+                self._entries.move_to_end(key)
+                found[key] = entry[1]
+            self._count("hits", len(found))
+        missing = [key for key in keys if key not in found]
+        if self.disk is not None and missing:
+            from_disk = self.disk.get_many(missing, now)
+            if from_disk:
+                self._remember(from_disk.items(), now + self.ttl)
+                found.update(from_disk)
+                self._count("disk_hits", len(from_disk))
+        self._count("misses", len(keys) - len(found))
+        return found
+
+    def get(self, key):
+        return self.get_many([key]).get(key)
+
+    def token(self) -> int:
+        """Take before reading the source; pass to ``put_many`` to drop values a concurrent write made stale."""
+        return self._seq
+
+    def put_many(self, items, token: int = None):
+        items = list(items)
+        if token is not None:
+            with self._lock:
+                items = [(key, value) for key, value in items if self._stamps.get(key, -1) <= token]
+        expires = time.time() + self.ttl
+        self._remember(items, expires)
+        if self.disk is not None and items:
+            self.disk.put_many(items, expires)
+
+    def put(self, key, value, token: int = None):
+        self.put_many([(key, value)], token)
+
+    def _remember(self, items, expires: float):
+        with self._lock:
+            for key, value in items:
+                self._entries[key] = (expires, value)
+                self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self._count("evictions")
+
+    def invalidate(self, keys):
+        keys = list(keys)
+        with self._lock:
+            self._seq += 1
+            for key in keys:
+                self._entries.pop(key, None)
+                self._stamps[key] = self._seq
+            self._count("invalidations", len(keys))
+        if self.disk is not None and keys:
+            self.disk.delete(keys)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._stamps.clear()
+            self.stats.clear()
+            self._unsaved.clear()
+        if self.disk is not None:
+            self.disk.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def save_counters(self):
+        """Add this process's counter deltas to the disk tier's running totals."""
+        if self.disk is None:
+            return
+        with self._lock:
+            deltas, self._unsaved = self._unsaved, Counter()
+        self.disk.add_counters(deltas)
+
+    def report(self):
+        """Counters, sizes and hit ratio for ``cache-stats``."""
+        totals = dict(self.stats)
+        if self.disk is not None:
+            self.save_counters()
+            totals = self.disk.counters()
+        lookups = totals.get("hits", 0) + totals.get("disk_hits", 0) + totals.get("misses", 0)
+        report = {name: totals.get(name, 0) for name in COUNTERS}
+        report["hit_ratio"] = round((lookups - report["misses"]) / lookups, 3) if lookups else None
+        report["memory_entries"] = len(self)
+        report["maxsize"] = self.maxsize
+        report["ttl_s"] = self.ttl
+        if self.disk is not None:
+            report["disk_path"] = self.disk.path
+            report["disk_entries"] = self.disk.size(time.time())
+        return report
+
+    @classmethod
+    def from_env(cls, prefix: str = "SUMMARY_CACHE") -> "TTLCache":
+        """``<prefix>_SIZE`` (entries), ``<prefix>_TTL`` (seconds) and optional ``<prefix>_PATH``."""
+        path = os.getenv(f"{prefix}_PATH")
+        cache = cls(
+            maxsize=int(os.getenv(f"{prefix}_SIZE") or 1000),
+            ttl=float(os.getenv(f"{prefix}_TTL") or 300),
+            disk=DiskCache(path) if path else None,
+        )
+        if cache.disk is not None:
+            atexit.register(cache.save_counters)
+        return cache
@@ -0,0 +1,33 @@
+from sqlalchemy import Date, Integer, cast, func, extract
+
+
+def epoch_seconds(dialect_name: str, column):
+    """SQL expression for a DateTime column as float seconds since the Unix epoch.
+
+    Lets numeric code pull timestamps without building a Python ``datetime``
+    per row.
+    """
+    if dialect_name == "sqlite":
+        return (func.julianday(column) - 2440587.5) * 86400.0
+    return extract("epoch", column)
+
+
+def epoch_bucket(dialect_name: str, column, seconds: int):
+    """SQL expression for the start of ``column``'s ``seconds``-wide bucket, as integer epoch seconds.
+
+    Buckets are aligned to the epoch, so 1h and 1d buckets start on the
+    hour and at midnight. SQLite uses the exact integer ``strftime('%s')``
+    rather than ``julianday`` so readings on a boundary never slip into the
+    previous bucket.
+    """
+    if dialect_name == "sqlite":
+        epoch = cast(func.strftime("%s", column), Integer)
+        return epoch - epoch % seconds
+    return cast(func.floor(extract("epoch", column) / seconds) * seconds, Integer)
+
+
+def day_of(dialect_name: str, column):
+    """SQL expression for the calendar day of a DateTime column, comparable with Date columns."""
+    if dialect_name == "sqlite":
+        return func.date(column)
+    return cast(column, Date)
@@ -0,0 +1,216 @@
+"""Query instrumentation: per-scope statement stats, N+1 detection, slow-query log.
+
+``install(engine)`` hooks ``before_cursor_execute``/``after_cursor_execute``.
+Every statement is timed and charged to the innermost active
+``query_scope`` (a CLI command or menu action, tracked per thread), and
+statements slower than the engine profile's ``slow_query_ms`` are appended
+to the slow-query log as NDJSON. ``enable_tracing()`` (the ``--trace``
+option) also counts ORM objects loaded so lazy-load storms show up, and
+rows fetched by each SELECT (``cursor.rowcount`` is -1 for reads on
+sqlite3, so they are counted as the result consumes them).
+"""
+import json
+import re
+import sys
+import threading
+import time
+import weakref
+from contextlib import contextmanager
+from datetime import datetime
+
+from sqlalchemy import event
+from sqlalchemy.orm import Mapper
+
+# A SELECT repeated this many times inside one scope is reported as a likely N+1.
+N_PLUS_ONE_THRESHOLD = 10
+TOP_STATEMENTS = 5
+
+_local = threading.local()
+_log_lock = threading.Lock()
+_installed = weakref.WeakSet()
+tracing = False
+
+
+class StatementStats:
+    __slots__ = ("count", "seconds", "max_seconds", "rows", "rows_read")
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+        self.max_seconds = 0.0
+        self.rows = 0  # written (rowcount / executemany size)
+        self.rows_read = 0  # fetched; counted only while tracing
+
+
+class _CountingCursor:
+    """DBAPI cursor proxy adding the rows a result fetches to ``stats.rows_read``."""
+
+    def __init__(self, cursor, stats: StatementStats):
+        self._cursor = cursor
+        self._stats = stats
+
+    def fetchone(self):
+        row = self._cursor.fetchone()
+        if row is not None:
+            self._stats.rows_read += 1
+        return row
+
+    def fetchmany(self, *args):
+        rows = self._cursor.fetchmany(*args)
+        self._stats.rows_read += len(rows)
+        return rows
+
+    def fetchall(self):
+        rows = self._cursor.fetchall()
+        self._stats.rows_read += len(rows)
+        return rows
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+
+class ScopeStats:
+    """Statements executed inside one scope, keyed by SQL text."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.statements = {}
+        self.objects_loaded = 0
+        self.started = time.perf_counter()
+        self.elapsed = None
+
+    def record(self, statement: str, seconds: float, rows: int) -> StatementStats:
+        stats = self.statements.get(statement)
+        if stats is None:
+            stats = self.statements[statement] = StatementStats()
+        stats.count += 1
+        stats.seconds += seconds
+        stats.max_seconds = max(stats.max_seconds, seconds)
+        if rows > 0:
+            stats.rows += rows
+        return stats
+
+    @property
+    def count(self) -> int:
+        return sum(s.count for s in self.statements.values())
+
+    @property
+    def seconds(self) -> float:
+        return sum(s.seconds for s in self.statements.values())
+
+    def suspected_n_plus_one(self, threshold: int = N_PLUS_ONE_THRESHOLD):
+        """``(statement, stats)`` for SELECTs repeated at least ``threshold`` times."""
+        return sorted(
+            ((sql, s) for sql, s in self.statements.items()
+             if s.count >= threshold and sql.lstrip().upper().startswith("SELECT")),
+            key=lambda item: -item[1].count,
+        )
+
+
+def _stack():
+    if not hasattr(_local, "stack"):
+        _local.stack = []
+    return _local.stack
+
+
+def current_scope():
+    stack = _stack()
+    return stack[-1] if stack else None
+
+
+def _short(sql: str, width: int = 90) -> str:
+    sql = re.sub(r"\s+", " ", sql).strip()
+    return sql if len(sql) <= width else sql[:width - 3] + "..."
+
+
+def format_summary(scope: ScopeStats) -> str:
+    wall = f", {scope.elapsed * 1000:.1f} ms wall" if scope.elapsed is not None else ""
+    loaded = f", {scope.objects_loaded} ORM object(s) loaded" if tracing else ""
+    lines = [f"[trace] {scope.name}: {scope.count} statement(s), {scope.seconds * 1000:.1f} ms in SQL{loaded}{wall}"]
+    top = sorted(scope.statements.items(), key=lambda item: -item[1].seconds)[:TOP_STATEMENTS]
+    if top:
+        lines.append(f"  {'count':>6} {'total ms':>9} {'max ms':>8} {'read':>7} {'written':>7}  statement")
+        for sql, s in top:
+            lines.append(f"  {s.count:>6} {s.seconds * 1000:>9.1f} {s.max_seconds * 1000:>8.1f} {s.rows_read:>7} "
+                         f"{s.rows:>7}  {_short(sql)}")
+    for sql, s in scope.suspected_n_plus_one():
+        lines.append(f"  ⚠️ possible N+1: {s.count}x {_short(sql)}")
+    return "\n".join(lines)
+
+
+@contextmanager
+def query_scope(name: str, emit=None):
+    """Charge statements run inside the block to ``name``.
+
+    With tracing on, ``emit`` (e.g. ``click.echo``) receives the formatted
+    summary when the block exits.
+    """
+    scope = ScopeStats(name)
+    stack = _stack()
+    stack.append(scope)
+    try:
+        yield scope
+    finally:
+        stack.remove(scope)
+        scope.elapsed = time.perf_counter() - scope.started
+        if tracing and emit is not None:
+            emit(format_summary(scope))
+
+
+def _count_load(target, context):
+    scope = current_scope()
+    if scope is not None:
+        scope.objects_loaded += 1
+
+
+def enable_tracing(engine):
+    """Turn on ``--trace``: instrument ``engine`` and count ORM loads."""
+    global tracing
+    tracing = True
+    install(engine)
+    if not event.contains(Mapper, "load", _count_load):
+        event.listen(Mapper, "load", _count_load)
+
+
+def _open_log(path: str):
+    if not path or path == "-":
+        return sys.stderr
+    return open(path, "a", buffering=1)
+
+
+def install(engine, slow_query_ms: float = 0, slow_query_log: str = ""):
+    """Attach the cursor listeners to ``engine`` (once); ``slow_query_ms`` > 0 enables the log."""
+    if engine in _installed:
+        return
+    _installed.add(engine)
+    threshold = slow_query_ms / 1000.0
+    log = _open_log(slow_query_log) if slow_query_ms else None
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        seconds = time.perf_counter() - conn.info["query_started"].pop()
+        reads = not executemany and cursor.description is not None
+        # sqlite3 reports rowcount -1 for SELECTs: their rows are unknown until fetched.
+        rows = len(parameters) if executemany else -1 if reads else cursor.rowcount
+        scope = current_scope()
+        if scope is not None:
+            stats = scope.record(statement, seconds, rows)
+            if tracing and reads:
+                # The result is built from context.cursor after this hook returns.
+                context.cursor = _CountingCursor(cursor, stats)
+        if log is not None and seconds >= threshold:
+            entry = {
+                "at": datetime.now().isoformat(timespec="milliseconds"),
+                "ms": round(seconds * 1000, 2),
+                "scope": scope.name if scope else None,
+                "rows": rows if rows >= 0 else None,
+                "statement": _short(statement, 2000),
+                "parameters": _short(repr(parameters), 300),
+            }
+            with _log_lock:
+                log.write(json.dumps(entry) + "\n")
+                log.flush()
@@ -0,0 +1,55 @@
+from sqlalchemy import tuple_
+
+PAGE_SIZE = 500
+
+
+def page_statement(stmt, columns, after, size: int):
+    """``stmt`` restricted to the ``size`` rows following key ``after`` (``None`` = from the start)."""
+    page_stmt = stmt.order_by(*columns).limit(size)
+    if after is None:
+        return page_stmt
+    if len(columns) == 1:
+        return page_stmt.where(columns[0] > after[0])
+    return page_stmt.where(tuple_(*columns) > tuple_(*after))
+
+
+def iter_pages(session, stmt, order_by, after=None, limit=None, page_size: int = PAGE_SIZE):
+    """Yield lists of rows from ``stmt`` one keyset-paginated page at a time.
+
+    ``order_by`` is the unique sort key (e.g. ``[Model.id]`` or
+    ``[Model.timestamp, Model.id]``); each page is fetched with
+    ``WHERE key > last_key ORDER BY key LIMIT page_size``, so every query
+    is an index range scan and memory is bounded by one page no matter how
+    large the table is. ``after`` resumes after a given key tuple and
+    ``limit`` caps the total number of rows.
+    """
+    columns = list(order_by)
+    remaining = limit
+    while remaining is None or remaining > 0:
+        size = page_size if remaining is None else min(page_size, remaining)
+        page = session.scalars(page_statement(stmt, columns, after, size)).all()
+        if not page:
+            return
+        yield page
+        if len(page) < size:
+            return
+        if remaining is not None:
+            remaining -= len(page)
+        after = tuple(getattr(page[-1], column.key) for column in columns)
+
+
+async def aiter_pages(session, stmt, order_by, after=None, limit=None, page_size: int = PAGE_SIZE):
+    """``iter_pages`` for an ``AsyncSession``: an async generator of keyset pages."""
+    columns = list(order_by)
+    remaining = limit
+    while remaining is None or remaining > 0:
+        size = page_size if remaining is None else min(page_size, remaining)
+        page = (await session.scalars(page_statement(stmt, columns, after, size))).all()
+        if not page:
+            return
+        yield page
+        if len(page) < size:
+            return
+        if remaining is not None:
+            remaining -= len(page)
+        after = tuple(getattr(page[-1], column.key) for column in columns)
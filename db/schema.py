@@ -0,0 +1,59 @@
+from sqlalchemy import inspect
+
+from db.setup import Base, engine as default_engine
+
+# Bump whenever the models gain tables, columns or indexes that must be added.
+# SQLite databases record it in PRAGMA user_version once the schema is current.
+SCHEMA_VERSION = 6
+
+
+def _add_missing_columns(connection):
+    """Bring existing SQLite tables up to the models: add new nullable columns and indexes.
+
+    ``create_all`` only creates whole tables; this covers additive changes
+    to tables that already exist (Alembic does the same for other databases).
+    """
+    inspector = inspect(connection)
+    for table in Base.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+        existing = {column["name"] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name not in existing and column.nullable and column.server_default is None:
+                column_type = column.type.compile(connection.dialect)
+                connection.exec_driver_sql(f'ALTER TABLE "{table.name}" ADD COLUMN "{column.name}" {column_type}')
+        # sqlite_master rather than the inspector, which skips expression indexes.
+        indexes = {name for name, in connection.exec_driver_sql(
+            "SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = ?", (table.name,))}
+        for index in table.indexes:
+            if index.name not in indexes:
+                index.create(connection)
+
+
+def ensure_schema(engine=None) -> bool:
+    """Create missing tables unless the database already carries ``SCHEMA_VERSION``.
+
+    Returns True if ``create_all`` ran. The marker check is a single PRAGMA,
+    so warm starts skip importing every model and inspecting the schema.
+    Non-SQLite databases are managed with Alembic and always run create_all.
+    """
+    engine = engine or default_engine
+    is_sqlite = engine.dialect.name == "sqlite"
+    if is_sqlite:
+        with engine.connect() as connection:
+            if connection.exec_driver_sql("PRAGMA user_version").scalar() >= SCHEMA_VERSION:
+                return False
+    import models  # noqa: F401  (registers every table on Base.metadata)
+    if is_sqlite:
+        # Before create_all: its DDL hooks (e.g. models.change_log) expect current columns.
+        with engine.begin() as connection:
+            _add_missing_columns(connection)
+    Base.metadata.create_all(engine)
+    if is_sqlite:
+        from models.name_search import create_missing_name_indexes
+
+        with engine.begin() as connection:
+            # Tables that predate the search indexes: after_create never fired for them.
+            create_missing_name_indexes(connection)
+            connection.exec_driver_sql(f"PRAGMA user_version = {SCHEMA_VERSION}")
+    return True
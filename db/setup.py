@@ -1,12 +1,120 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
 from sqlalchemy.orm import sessionmaker, declarative_base
+from sqlalchemy.pool import StaticPool
+from typing import NamedTuple
 import os
 from dotenv import load_dotenv
+from db.instrumentation import install
 
 load_dotenv()
 
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///diabetes.db")
 
-engine = create_engine(DATABASE_URL)
+
+def _env_int(name: str, default: int) -> int:
+    value = os.getenv(name)
+    return int(value) if value not in (None, "") else default
+
+
+def _env_bool(name: str, default: bool) -> bool:
+    value = os.getenv(name)
+    if value in (None, ""):
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+class EngineProfile(NamedTuple):
+    """Engine tuning, read from ``DB_*`` environment variables (or ``.env``)."""
+    # SQLite
+    journal_mode: str = "WAL"
+    synchronous: str = "NORMAL"
+    mmap_size: int = 256 * 1024 * 1024
+    cache_size: int = -64000  # negative = KiB, i.e. 64 MB
+    busy_timeout: int = 5000  # ms
+    static_pool: bool = False
+    # Server databases
+    pool_size: int = 5
+    max_overflow: int = 10
+    pool_pre_ping: bool = True
+    pool_recycle: int = 1800  # s
+    # Instrumentation (db/instrumentation.py); 0 disables the slow-query log
+    slow_query_ms: float = 0
+    slow_query_log: str = "slow_queries.log"  # "-" for stderr
+
+    @classmethod
+    def from_env(cls) -> "EngineProfile":
+        d = cls()
+        return cls(
+            journal_mode=os.getenv("DB_JOURNAL_MODE", d.journal_mode).upper(),
+            synchronous=os.getenv("DB_SYNCHRONOUS", d.synchronous).upper(),
+            mmap_size=_env_int("DB_MMAP_SIZE", d.mmap_size),
+            cache_size=_env_int("DB_CACHE_SIZE", d.cache_size),
+            busy_timeout=_env_int("DB_BUSY_TIMEOUT", d.busy_timeout),
+            static_pool=_env_bool("DB_STATIC_POOL", d.static_pool),
+            pool_size=_env_int("DB_POOL_SIZE", d.pool_size),
+            max_overflow=_env_int("DB_MAX_OVERFLOW", d.max_overflow),
+            pool_pre_ping=_env_bool("DB_POOL_PRE_PING", d.pool_pre_ping),
+            pool_recycle=_env_int("DB_POOL_RECYCLE", d.pool_recycle),
+            slow_query_ms=float(os.getenv("DB_SLOW_QUERY_MS") or d.slow_query_ms),
+            slow_query_log=os.getenv("DB_SLOW_QUERY_LOG") or d.slow_query_log,
+        )
+
+
+def _sqlite_pragmas(profile: EngineProfile, in_memory: bool):
+    pragmas = [
+        f"PRAGMA synchronous={profile.synchronous}",
+        f"PRAGMA cache_size={profile.cache_size}",
+        f"PRAGMA busy_timeout={profile.busy_timeout}",
+    ]
+    if not in_memory:
+        # WAL lets readers run alongside the single writer; mmap only helps file-backed DBs.
+        pragmas.insert(0, f"PRAGMA journal_mode={profile.journal_mode}")
+        pragmas.append(f"PRAGMA mmap_size={profile.mmap_size}")
+    return pragmas
+
+
+def _apply_on_connect(new_engine, pragmas):
+    @event.listens_for(new_engine, "connect")
+    def _apply_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for pragma in pragmas:
+                cursor.execute(pragma)
+        finally:
+            cursor.close()
+
+
+def _instrumented(new_engine, profile: EngineProfile):
+    if profile.slow_query_ms > 0:
+        install(new_engine, profile.slow_query_ms, profile.slow_query_log)
+    return new_engine
+
+
+def make_engine(url: str = DATABASE_URL, profile: EngineProfile = None):
+    """Create an engine tuned by ``profile`` (defaults to ``EngineProfile.from_env()``)."""
+    profile = profile or EngineProfile.from_env()
+    parsed = make_url(url)
+    if parsed.get_backend_name() != "sqlite":
+        return _instrumented(create_engine(
+            url,
+            pool_size=profile.pool_size,
+            max_overflow=profile.max_overflow,
+            pool_pre_ping=profile.pool_pre_ping,
+            pool_recycle=profile.pool_recycle,
+        ), profile)
+
+    in_memory = parsed.database in (None, "", ":memory:")
+    kwargs = {"connect_args": {"timeout": profile.busy_timeout / 1000.0}}
+    if in_memory or profile.static_pool:
+        # One shared connection, so every session sees the same in-memory database.
+        kwargs["poolclass"] = StaticPool
+        kwargs["connect_args"]["check_same_thread"] = False
+    new_engine = create_engine(url, **kwargs)
+    _apply_on_connect(new_engine, _sqlite_pragmas(profile, in_memory))
+    return _instrumented(new_engine, profile)
+
+
+engine = make_engine(DATABASE_URL)
 Session = sessionmaker(bind=engine)
 Base = declarative_base()
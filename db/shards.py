@@ -0,0 +1,152 @@
+"""Shard router: one database per clinic, queried alone or all at once.
+
+Shards are named in ``SHARD_URLS`` (environment or ``.env``)::
+
+    SHARD_URLS="north=sqlite:///clinics/north.db;south=sqlite:///clinics/south.db"
+
+Each shard keeps its own engine (tuned by the usual ``DB_*`` profile), so
+writers on different clinics never wait on the same SQLite lock. Model
+helpers target one shard through ``router.session(name)``; ``fan_out``
+runs a function against every shard concurrently on a thread pool (one
+worker and one session per shard) and returns the per-shard results for
+merging. The CLI's ``--shard NAME`` option instead points the whole
+process at one shard (see ``select_shard``).
+
+Nothing here imports ``db.setup`` at module level: ``select_shard`` must
+run before the engine for ``DATABASE_URL`` is created.
+"""
+import os
+import re
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+from dotenv import load_dotenv
+
+# Settings naming a per-database file or directory; a selected shard gets its own.
+PER_SHARD_PATHS = ("SUMMARY_CACHE_PATH", "GLUCOSE_ARCHIVE_DIR", "DB_SLOW_QUERY_LOG")
+
+
+class ShardError(Exception):
+    """One or more shards failed during a fan-out; ``failures`` maps shard name to exception."""
+
+    def __init__(self, failures: dict):
+        self.failures = failures
+        detail = "; ".join(f"{name}: {exc}" for name, exc in failures.items())
+        super().__init__(f"{len(failures)} shard(s) failed: {detail}")
+
+
+def shard_urls(spec: str = None) -> dict:
+    """``{name: url}`` parsed from ``spec`` or ``SHARD_URLS`` (``name=url`` pairs, ``;``/newline separated)."""
+    if spec is None:
+        load_dotenv()
+        spec = os.getenv("SHARD_URLS", "")
+    urls = {}
+    for entry in re.split(r"[;\n]+", spec):
+        entry = entry.strip()
+        if not entry:
+            continue
+        name, sep, url = entry.partition("=")
+        if not sep or not name.strip() or not url.strip():
+            raise ValueError(f"Bad SHARD_URLS entry {entry!r}; expected name=url")
+        urls[name.strip()] = url.strip()
+    return urls
+
+
+def select_shard(name: str, urls: dict = None):
+    """Point this process at shard ``name`` by rewriting ``DATABASE_URL`` and per-database paths.
+
+    Must run before ``db.setup`` is imported. The daemon socket also becomes
+    per-shard (unless ``DIABETES_DAEMON`` is set), so ``serve`` and the
+    forwarding commands for the same shard find each other.
+    """
+    urls = shard_urls() if urls is None else urls
+    if name not in urls:
+        known = ", ".join(sorted(urls)) or "none configured"
+        raise KeyError(f"Unknown shard {name!r} (SHARD_URLS: {known})")
+    os.environ["DATABASE_URL"] = urls[name]
+    for key in PER_SHARD_PATHS:
+        value = os.getenv(key)
+        if value and value != "-":
+            root, ext = os.path.splitext(value)
+            os.environ[key] = f"{root}-{name}{ext}"
+    os.environ.setdefault(
+        "DIABETES_DAEMON", f"unix:{os.path.join(tempfile.gettempdir(), f'diabetes-cli-{name}.sock')}"
+    )
+
+
+class ShardRouter:
+    """Engines and sessions for each configured shard, created on first use."""
+
+    def __init__(self, urls: dict = None, max_workers: int = None):
+        self.urls = dict(shard_urls() if urls is None else urls)
+        self.max_workers = max_workers
+        self._engines = {}
+        self._sessionmakers = {}
+        self._lock = threading.Lock()
+
+    @property
+    def names(self):
+        return list(self.urls)
+
+    def engine(self, name: str):
+        """The shard's engine; its schema is checked (and created) the first time."""
+        with self._lock:
+            if name not in self._engines:
+                if name not in self.urls:
+                    raise KeyError(f"Unknown shard {name!r}")
+                from sqlalchemy.orm import sessionmaker
+                from db.setup import make_engine
+                from db.schema import ensure_schema
+
+                engine = make_engine(self.urls[name])
+                ensure_schema(engine)
+                self._engines[name] = engine
+                self._sessionmakers[name] = sessionmaker(bind=engine)
+            return self._engines[name]
+
+    def session(self, name: str):
+        """A new session bound to shard ``name``, for the usual model helpers."""
+        self.engine(name)
+        return self._sessionmakers[name]()
+
+    @contextmanager
+    def session_scope(self, name: str):
+        session = self.session(name)
+        try:
+            yield session
+        finally:
+            session.close()
+
+    def fan_out(self, fn, shards=None) -> dict:
+        """Run ``fn(session)`` on every shard (or ``shards``) concurrently; returns ``{name: result}``.
+
+        Results are in shard order. If any shard raises, the others still
+        finish and a ``ShardError`` reports every failure.
+        """
+        names = list(shards) if shards is not None else self.names
+
+        def run(name):
+            with self.session_scope(name) as session:
+                return fn(session)
+
+        workers = self.max_workers or max(len(names), 1)
+        results, failures = {}, {}
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="shard") as pool:
+            futures = {name: pool.submit(run, name) for name in names}
+            for name, future in futures.items():
+                try:
+                    results[name] = future.result()
+                except Exception as e:  # collected and re-raised together below
+                    failures[name] = e
+        if failures:
+            raise ShardError(failures)
+        return results
+
+    def dispose(self):
+        with self._lock:
+            for engine in self._engines.values():
+                engine.dispose()
+            self._engines.clear()
+            self._sessionmakers.clear()
@@ -0,0 +1,79 @@
+"""Unit of work: many model helper calls, one transaction.
+
+On their own, the write helpers (``Patient.create``, ``GlucoseLog.create``,
+``Medication.create``, ``bulk_create``, ``delete``) commit immediately
+and refresh what they created. Inside ``uow`` they only flush (or, with
+``flush=False``, only add), and the block commits once on success or
+rolls back on any exception::
+
+    with uow(session):
+        patient = Patient.create(session, name="Amina", date_of_birth=dob)
+        GlucoseLog.create(session, patient=patient, reading=112)
+
+No refresh is issued: every column default is computed in Python, so a
+flushed object already holds its final values. Nested blocks join the
+outermost one.
+"""
+from contextlib import contextmanager
+
+_DEPTH = "uow_depth"  # session.info keys
+_FLUSH = "uow_flush"
+
+
+def in_uow(session) -> bool:
+    return bool(session.info.get(_DEPTH))
+
+
+@contextmanager
+def uow(session, flush: bool = True):
+    """Group writes on ``session`` into one commit.
+
+    ``flush=True`` flushes after each helper so new rows get their IDs
+    straight away; ``flush=False`` leaves that to autoflush or the final
+    commit, which batches inserts into fewer statements (bulk scripts).
+    """
+    depth = session.info.get(_DEPTH, 0)
+    outer_flush = session.info.get(_FLUSH, True)
+    session.info[_DEPTH] = depth + 1
+    session.info[_FLUSH] = flush
+    try:
+        yield session
+        if depth == 0:
+            session.commit()
+    except BaseException:
+        if depth == 0:
+            session.rollback()
+        raise
+    finally:
+        if depth == 0:
+            session.info.pop(_DEPTH, None)
+            session.info.pop(_FLUSH, None)
+        else:
+            session.info[_DEPTH] = depth
+            session.info[_FLUSH] = outer_flush
+
+
+def finish_write(session, instance=None):
+    """End a helper's write: commit and refresh ``instance`` alone, flush inside ``uow``."""
+    if in_uow(session):
+        if session.info.get(_FLUSH, True):
+            session.flush()
+        return
+    session.commit()
+    if instance is not None:
+        session.refresh(instance)
+
+
+def begin_explicit(session):
+    """Open the session's transaction now, with ``BEGIN IMMEDIATE`` on SQLite.
+
+    pysqlite only issues ``BEGIN`` before the first INSERT/UPDATE/DELETE,
+    so a ``session.begin_nested()`` SAVEPOINT issued before any write opens
+    SQLite's transaction itself and its RELEASE commits everything so far.
+    Call this first wherever savepoints must nest inside one transaction;
+    it also takes the write lock up front, so the transaction cannot fail
+    later upgrading from a read lock.
+    """
+    connection = session.connection()
+    if connection.dialect.name == "sqlite" and not connection.connection.dbapi_connection.in_transaction:
+        connection.exec_driver_sql("BEGIN IMMEDIATE")
@@ -1,5 +1,11 @@
+import sys
+from datetime import datetime, timedelta
+
 from db.setup import engine
-from sqlalchemy import inspect
+from sqlalchemy import inspect, select
+from models.patient import Patient
+from models.glucose_log import GlucoseLog
+from models.medication import Medication
 
 def inspect_database():
     inspector = inspect(engine)
@@ -9,8 +15,48 @@ def inspect_database():
         print("📋 Tables found in the database:")
         for table in tables:
             print(f" - {table}")
+            for index in inspector.get_indexes(table):
+                print(f"     index {index['name']} ({', '.join(index['column_names'])})")
     else:
         print("⚠️ No tables found. You may need to run Base.metadata.create_all(engine).")
 
+
+def _hot_queries():
+    end = datetime.now()
+    start = end - timedelta(days=30)
+    return [
+        ("Glucose: find by date range", select(GlucoseLog).where(GlucoseLog.timestamp.between(start, end))),
+        ("Glucose: list by patient", select(GlucoseLog).where(GlucoseLog.patient_id == 1)),
+        ("Patient.glucose_logs load", select(GlucoseLog).where(GlucoseLog.patient_id == 1).order_by(GlucoseLog.timestamp)),
+        ("Patient.medications load", select(Medication).where(Medication.patient_id == 1)),
+    ]
+
+
+def _bind_value(value):
+    return value.isoformat(sep=" ") if isinstance(value, datetime) else value
+
+
+def explain_queries() -> bool:
+    """Run EXPLAIN QUERY PLAN on the hot queries; True if all of them use an index."""
+    if engine.dialect.name != "sqlite":
+        print("⚠️ EXPLAIN check only supports SQLite.")
+        return False
+    ok = True
+    with engine.connect() as conn:
+        for label, stmt in _hot_queries():
+            compiled = stmt.compile(dialect=engine.dialect)
+            params = compiled.construct_params()
+            args = tuple(_bind_value(params[name]) for name in compiled.positiontup)
+            plan = [row[-1] for row in conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {compiled}", args)]
+            uses_index = any("USING INDEX" in step or "USING COVERING INDEX" in step for step in plan)
+            ok = ok and uses_index
+            print(f"{'✅' if uses_index else '❌'} {label}")
+            for step in plan:
+                print(f"     {step}")
+    return ok
+
+
 if __name__ == "__main__":
+    if "--explain" in sys.argv[1:]:
+        sys.exit(0 if explain_queries() else 1)
     inspect_database()
@@ -1,6 +1,8 @@
+import time
+
+_started = time.perf_counter()
+
 from cli.interface import cli
-from db.setup import Base, engine
 
 if __name__ == "__main__":
-    Base.metadata.create_all(engine)
-    cli()
+    cli(obj={"started": _started})
@@ -28,10 +28,11 @@ target_metadata = Base.metadata
 
 
 
-# If sqlalchemy.url is not set directly, pull from env
-if not config.get_main_option("sqlalchemy.url") or config.get_main_option("sqlalchemy.url") == "%(DATABASE_URL)s":
-    database_url = os.getenv("DATABASE_URL", "sqlite:///diabetes.db")
-    config.set_main_option("sqlalchemy.url", database_url)
+# DATABASE_URL from the environment wins; otherwise fall back to alembic.ini
+if os.getenv("DATABASE_URL"):
+    config.set_main_option("sqlalchemy.url", os.environ["DATABASE_URL"])
+elif not config.get_main_option("sqlalchemy.url") or config.get_main_option("sqlalchemy.url") == "%(DATABASE_URL)s":
+    config.set_main_option("sqlalchemy.url", "sqlite:///diabetes.db")
 
 
 def run_migrations_offline() -> None:
@@ -0,0 +1,31 @@
+"""add glucose_logs and medications indexes
+
+Revision ID: a1c3e5f7b901
+Revises:
+Create Date: 2026-10-18 09:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a1c3e5f7b901'
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # if_not_exists: databases created by Base.metadata.create_all already have them
+    op.create_index('ix_glucose_logs_patient_id_timestamp', 'glucose_logs', ['patient_id', 'timestamp'], if_not_exists=True)
+    op.create_index('ix_glucose_logs_timestamp', 'glucose_logs', ['timestamp'], if_not_exists=True)
+    op.create_index('ix_medications_patient_id', 'medications', ['patient_id'], if_not_exists=True)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_medications_patient_id', table_name='medications', if_exists=True)
+    op.drop_index('ix_glucose_logs_timestamp', table_name='glucose_logs', if_exists=True)
+    op.drop_index('ix_glucose_logs_patient_id_timestamp', table_name='glucose_logs', if_exists=True)
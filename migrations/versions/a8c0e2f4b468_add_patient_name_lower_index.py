@@ -0,0 +1,26 @@
+"""add lower(name) index on patients
+
+Revision ID: a8c0e2f4b468
+Revises: f7b9d1e3a357
+Create Date: 2026-10-18 16:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a8c0e2f4b468'
+down_revision: Union[str, None] = 'f7b9d1e3a357'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_patients_name_lower', 'patients', [sa.text('lower(name)')])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_patients_name_lower', table_name='patients')
@@ -0,0 +1,55 @@
+"""add glucose_rollups
+
+Revision ID: b4d6f8a0c213
+Revises: a1c3e5f7b901
+Create Date: 2026-10-18 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b4d6f8a0c213'
+down_revision: Union[str, None] = 'a1c3e5f7b901'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'glucose_rollups',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('patient_id', sa.Integer(), nullable=False),
+        sa.Column('granularity', sa.String(), nullable=False),
+        sa.Column('bucket_start', sa.DateTime(), nullable=False),
+        sa.Column('reading_count', sa.Integer(), nullable=False),
+        sa.Column('reading_sum', sa.Float(), nullable=False),
+        sa.Column('reading_sum_sq', sa.Float(), nullable=False),
+        sa.Column('reading_min', sa.Float(), nullable=True),
+        sa.Column('reading_max', sa.Float(), nullable=True),
+        sa.Column('in_range_count', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['patient_id'], ['patients.id']),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('patient_id', 'granularity', 'bucket_start', name='uq_glucose_rollups_bucket'),
+    )
+    op.create_index('ix_glucose_rollups_granularity_bucket_start', 'glucose_rollups', ['granularity', 'bucket_start'])
+
+    # Backfill from existing readings (same layout GlucoseRollup.rebuild writes).
+    if op.get_bind().dialect.name == 'sqlite':
+        for granularity, fmt in (('hour', '%Y-%m-%d %H:00:00.000000'), ('day', '%Y-%m-%d 00:00:00.000000')):
+            op.execute(
+                "INSERT INTO glucose_rollups (patient_id, granularity, bucket_start, reading_count, reading_sum, "
+                "reading_sum_sq, reading_min, reading_max, in_range_count) "
+                f"SELECT patient_id, '{granularity}', strftime('{fmt}', timestamp), count(id), sum(reading), "
+                "sum(reading * reading), min(reading), max(reading), "
+                "sum(CASE WHEN reading BETWEEN 70.0 AND 180.0 THEN 1 ELSE 0 END) "
+                f"FROM glucose_logs WHERE timestamp IS NOT NULL GROUP BY patient_id, strftime('{fmt}', timestamp)"
+            )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_glucose_rollups_granularity_bucket_start', table_name='glucose_rollups')
+    op.drop_table('glucose_rollups')
@@ -0,0 +1,41 @@
+"""add alerts table
+
+Revision ID: d2f4b6c8e035
+Revises: c7e9a1b3d524
+Create Date: 2026-10-18 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd2f4b6c8e035'
+down_revision: Union[str, None] = 'c7e9a1b3d524'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'alerts',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('patient_id', sa.Integer(), nullable=False),
+        sa.Column('kind', sa.String(), nullable=False),
+        sa.Column('severity', sa.String(), nullable=False),
+        sa.Column('reading', sa.Float(), nullable=False),
+        sa.Column('reading_at', sa.DateTime(), nullable=False),
+        sa.Column('value', sa.Float(), nullable=True),
+        sa.Column('message', sa.String(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['patient_id'], ['patients.id']),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_alerts_patient_id_reading_at', 'alerts', ['patient_id', 'reading_at'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_alerts_patient_id_reading_at', table_name='alerts')
+    op.drop_table('alerts')
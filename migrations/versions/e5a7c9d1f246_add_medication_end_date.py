@@ -0,0 +1,30 @@
+"""add medication end date and name index
+
+Revision ID: e5a7c9d1f246
+Revises: d2f4b6c8e035
+Create Date: 2026-10-18 13:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e5a7c9d1f246'
+down_revision: Union[str, None] = 'd2f4b6c8e035'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('medications', sa.Column('end_date', sa.Date(), nullable=True))
+    op.create_index('ix_medications_name_lower', 'medications', [sa.text('lower(name)')])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_medications_name_lower', table_name='medications')
+    # Plain DROP COLUMN (SQLite 3.35+) keeps the FTS triggers on medications,
+    # which a batch-mode table rebuild would drop.
+    op.drop_column('medications', 'end_date')
@@ -0,0 +1,64 @@
+"""add change_log table and capture triggers
+
+Revision ID: f7b9d1e3a357
+Revises: e5a7c9d1f246
+Create Date: 2026-10-18 14:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f7b9d1e3a357'
+down_revision: Union[str, None] = 'e5a7c9d1f246'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Columns copied into change_log.data, parents first (snapshot order).
+TABLES = {
+    'patients': ('id', 'name', 'date_of_birth', 'contact'),
+    'medications': ('id', 'name', 'dosage', 'start_date', 'end_date', 'patient_id'),
+    'glucose_logs': ('id', 'reading', 'timestamp', 'patient_id'),
+}
+TRIGGERS = (('ai', 'INSERT', 'insert', 'new'), ('au', 'UPDATE', 'update', 'new'), ('ad', 'DELETE', 'delete', 'old'))
+NOW = "strftime('%Y-%m-%dT%H:%M:%fZ', 'now')"
+
+
+def _row_json(columns, ref):
+    return 'json_object(' + ', '.join(f"'{c}', {ref}.{c}" for c in columns) + ')'
+
+
+def upgrade() -> None:
+    op.create_table(
+        'change_log',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('table_name', sa.String(), nullable=False),
+        sa.Column('row_id', sa.Integer(), nullable=False),
+        sa.Column('op', sa.String(), nullable=False),
+        sa.Column('changed_at', sa.String(), nullable=False),
+        sa.Column('data', sa.Text(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+        sqlite_autoincrement=True,
+    )
+    op.create_index('ix_change_log_table_name_id', 'change_log', ['table_name', 'id'])
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+    for table, columns in TABLES.items():
+        op.execute(f"INSERT INTO change_log (table_name, row_id, op, changed_at, data) "
+                   f"SELECT '{table}', id, 'insert', {NOW}, {_row_json(columns, table)} FROM {table} ORDER BY id")
+        for suffix, event, kind, ref in TRIGGERS:
+            op.execute(f"CREATE TRIGGER IF NOT EXISTS {table}_changes_{suffix} AFTER {event} ON {table} BEGIN "
+                       f"INSERT INTO change_log (table_name, row_id, op, changed_at, data) "
+                       f"VALUES ('{table}', {ref}.id, '{kind}', {NOW}, {_row_json(columns, ref)}); END")
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name == 'sqlite':
+        for table in TABLES:
+            for suffix, *_ in TRIGGERS:
+                op.execute(f"DROP TRIGGER IF EXISTS {table}_changes_{suffix}")
+    op.drop_index('ix_change_log_table_name_id', table_name='change_log')
+    op.drop_table('change_log')
@@ -0,0 +1,9 @@
+# Import every model so relationships resolve and flush listeners are
+# registered no matter which model a caller imports first.
+from models.glucose_log import GlucoseLog
+from models.glucose_rollup import GlucoseRollup
+from models.patient import Patient
+from models.medication import Medication
+from models.alert import Alert
+from models.patient_summary import PatientSummary
+from models.change_log import ChangeLog
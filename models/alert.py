@@ -0,0 +1,299 @@
+"""Glucose alerts raised on the write path.
+
+Every new reading (ORM flush, ``GlucoseLog.create``, ``GlucoseLog.bulk_create``)
+is fed through a per-patient ``AlertWindow`` that keeps just enough state to
+evaluate each rule in O(1) amortised time:
+
+- ``hypo`` / ``severe_hypo``: reading below 70 / 54 mg/dL, once per episode
+- ``rapid_rise`` / ``rapid_fall``: change of at least 3 mg/dL/min against the
+  oldest reading in the last 15 minutes (a deque with time-based eviction)
+- ``sustained_hyper``: every reading above 180 mg/dL for 2 hours (run start)
+
+State lives in memory (warm in the ``serve`` daemon). The first time a
+process sees a patient it replays that patient's last two hours of readings
+(one indexed query) so episodes continue across separate CLI invocations.
+Alerts are inserted into ``alerts`` in the same transaction as the readings
+and sent to the configured output (``ALERT_OUTPUT``) once the outermost
+transaction commits. A rolled-back transaction or savepoint drops its alerts
+and the window state of the patients it touched, which is replayed from the
+database on their next reading.
+"""
+import json
+import os
+import sys
+from collections import deque, OrderedDict
+from datetime import datetime, timedelta
+
+import click
+from sqlalchemy import Column, Integer, Float, String, DateTime, ForeignKey, Index, and_, or_, event, insert, select
+from sqlalchemy.orm import relationship, Session as OrmSession
+from db.setup import Base
+from db.pagination import iter_pages, PAGE_SIZE
+from models.glucose_log import GlucoseLog, TARGET_LOW, TARGET_HIGH
+
+SEVERE_LOW = 54.0
+RATE_LIMIT = 3.0  # mg/dL per minute
+RATE_WINDOW = timedelta(minutes=15)
+RATE_MIN_SPAN = timedelta(minutes=5)  # ignore rates over shorter spans (sensor noise)
+SUSTAINED_HYPER = timedelta(hours=2)
+MAX_GAP = timedelta(minutes=30)  # a longer gap between readings ends every episode
+LOOKBACK = max(RATE_WINDOW, SUSTAINED_HYPER)
+MAX_TRACKED_PATIENTS = 10000
+SEED_CHUNK = 200
+MAX_TEXT_LINES = 20  # per transaction, for ALERT_OUTPUT=text
+
+_PENDING = "alerts_pending"  # session.info key: alerts to emit once the transaction commits
+_CHECKED = "alerts_checked"  # session.info key: patient IDs whose windows this transaction advanced
+_MARKS = "alerts_marks"  # session.info key: (pending, checked) lengths at each open savepoint
+
+
+class Alert(Base):
+    __tablename__ = 'alerts'
+
+    id = Column(Integer, primary_key=True)
+    patient_id = Column(Integer, ForeignKey('patients.id'), nullable=False)
+    kind = Column(String, nullable=False)
+    severity = Column(String, nullable=False)
+    reading = Column(Float, nullable=False)
+    reading_at = Column(DateTime, nullable=False)
+    value = Column(Float)  # rate (mg/dL/min) or duration (min), depending on kind
+    message = Column(String, nullable=False)
+    created_at = Column(DateTime, default=datetime.now, nullable=False)
+
+    patient = relationship("Patient", back_populates="alerts")
+
+    __table_args__ = (
+        Index("ix_alerts_patient_id_reading_at", "patient_id", "reading_at"),
+    )
+
+    def __repr__(self):
+        return f"<Alert(kind={self.kind}, patient_id={self.patient_id}, at={self.reading_at})>"
+
+    @classmethod
+    def iter_all(cls, session: OrmSession, patient_id: int = None, since: datetime = None, after_id: int = None,
+                 limit: int = None, page_size: int = PAGE_SIZE):
+        """Yield pages of alerts in ID order, optionally for one patient / since a time."""
+        stmt = select(cls)
+        if patient_id is not None:
+            stmt = stmt.where(cls.patient_id == patient_id)
+        if since is not None:
+            stmt = stmt.where(cls.reading_at >= since)
+        after = (after_id,) if after_id is not None else None
+        return iter_pages(session, stmt, [cls.id], after=after, limit=limit, page_size=page_size)
+
+
+class AlertWindow:
+    """Sliding-window state for one patient; ``push`` is O(1) amortised."""
+
+    __slots__ = ("recent", "last_at", "hypo_level", "hyper_since", "hyper_alerted", "rate_alerted")
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.recent = deque()  # (timestamp, reading) within RATE_WINDOW
+        self.last_at = None
+        self.hypo_level = 0  # 0 none, 1 below TARGET_LOW, 2 below SEVERE_LOW
+        self.hyper_since = None
+        self.hyper_alerted = False
+        self.rate_alerted = False
+
+    def push(self, ts: datetime, reading: float):
+        """Advance the window by one reading; returns ``[(kind, severity, value, message)]``."""
+        if self.last_at is not None and ts < self.last_at:
+            return []  # out of order (backfill): windows only move forward
+        if self.last_at is not None and ts - self.last_at > MAX_GAP:
+            self.reset()
+        self.last_at = ts
+        raised = []
+
+        level = 2 if reading < SEVERE_LOW else 1 if reading < TARGET_LOW else 0
+        if level > self.hypo_level:
+            if level == 2:
+                raised.append(("severe_hypo", "urgent", None, f"Severe hypoglycemia: {reading:g} mg/dL"))
+            else:
+                raised.append(("hypo", "warning", None, f"Hypoglycemia: {reading:g} mg/dL"))
+        self.hypo_level = level
+
+        if reading > TARGET_HIGH:
+            if self.hyper_since is None:
+                self.hyper_since = ts
+            elif not self.hyper_alerted and ts - self.hyper_since >= SUSTAINED_HYPER:
+                minutes = (ts - self.hyper_since).total_seconds() / 60
+                raised.append(("sustained_hyper", "warning", round(minutes),
+                               f"Above {TARGET_HIGH:g} mg/dL for {minutes:.0f} min (now {reading:g})"))
+                self.hyper_alerted = True
+        else:
+            self.hyper_since = None
+            self.hyper_alerted = False
+
+        recent = self.recent
+        while recent and ts - recent[0][0] > RATE_WINDOW:
+            recent.popleft()
+        rate = None
+        if recent and ts - recent[0][0] >= RATE_MIN_SPAN:
+            rate = (reading - recent[0][1]) / ((ts - recent[0][0]).total_seconds() / 60)
+        recent.append((ts, reading))
+        if rate is not None and abs(rate) >= RATE_LIMIT:
+            if not self.rate_alerted:
+                kind = "rapid_rise" if rate > 0 else "rapid_fall"
+                raised.append((kind, "warning", round(rate, 2), f"{'Rising' if rate > 0 else 'Falling'} "
+                               f"{abs(rate):.1f} mg/dL/min (now {reading:g})"))
+            self.rate_alerted = True
+        elif rate is not None:
+            self.rate_alerted = False
+        return raised
+
+
+class AlertMonitor:
+    """Per-patient windows, least recently used dropped beyond ``MAX_TRACKED_PATIENTS``."""
+
+    def __init__(self, max_patients: int = MAX_TRACKED_PATIENTS):
+        self.max_patients = max_patients
+        self.windows = OrderedDict()
+
+    def _seed(self, connection, firsts):
+        """Replay the lookback window before each patient's first new reading.
+
+        One query per ``SEED_CHUNK`` patients, each bounded to its own window
+        on the (patient_id, timestamp) index.
+        """
+        pids = list(firsts)
+        for pid in pids:
+            self.windows[pid] = AlertWindow()
+        for i in range(0, len(pids), SEED_CHUNK):
+            windows = [
+                and_(GlucoseLog.patient_id == pid, GlucoseLog.timestamp >= firsts[pid] - LOOKBACK,
+                     GlucoseLog.timestamp < firsts[pid])
+                for pid in pids[i:i + SEED_CHUNK]
+            ]
+            rows = connection.execute(
+                select(GlucoseLog.patient_id, GlucoseLog.timestamp, GlucoseLog.reading)
+                .where(or_(*windows))
+                .order_by(GlucoseLog.patient_id, GlucoseLog.timestamp)
+            )
+            for pid, ts, reading in rows:
+                self.windows[pid].push(ts, reading)
+
+    def check(self, connection, readings):
+        """Evaluate ``(patient_id, timestamp, reading)`` tuples; returns alert row dicts."""
+        readings = sorted((r for r in readings if r[1] is not None), key=lambda r: (r[0], r[1]))
+        firsts = {}
+        for pid, ts, _ in readings:
+            if pid not in self.windows and pid not in firsts:
+                firsts[pid] = ts
+        if firsts:
+            self._seed(connection, firsts)
+        alerts = []
+        for pid, ts, reading in readings:
+            window = self.windows[pid]
+            self.windows.move_to_end(pid)
+            for kind, severity, value, message in window.push(ts, reading):
+                alerts.append({"patient_id": pid, "kind": kind, "severity": severity, "reading": reading,
+                               "reading_at": ts, "value": value, "message": message, "created_at": datetime.now()})
+        while len(self.windows) > self.max_patients:
+            self.windows.popitem(last=False)
+        return alerts
+
+    def forget(self, patient_ids):
+        """Drop windows advanced by rolled-back readings; the next reading reseeds them."""
+        for pid in patient_ids:
+            self.windows.pop(pid, None)
+
+
+monitor = AlertMonitor()
+
+
+def _text_sink(alerts):
+    # stderr, so alerts never interleave with NDJSON/CSV/JSON a command writes to stdout.
+    for alert in alerts[:MAX_TEXT_LINES]:
+        icon = "🚨" if alert["severity"] == "urgent" else "⚠️"
+        click.echo(f"{icon} Patient {alert['patient_id']} at {alert['reading_at']:%Y-%m-%d %H:%M}: "
+                   f"{alert['message']}", err=True)
+    if len(alerts) > MAX_TEXT_LINES:
+        click.echo(f"⚠️ ... and {len(alerts) - MAX_TEXT_LINES} more alert(s); see `list-alerts`.", err=True)
+
+
+def _ndjson_sink(stream):
+    def emit(alerts):
+        for alert in alerts:
+            stream.write(json.dumps(alert, default=str) + "\n")
+        stream.flush()
+    return emit
+
+
+def _configured_sinks():
+    """``ALERT_OUTPUT``: ``text`` (default, stderr), ``ndjson`` (stdout), ``off`` or a file path for NDJSON."""
+    output = os.getenv("ALERT_OUTPUT", "text")
+    if output == "off":
+        return []
+    if output == "text":
+        return [_text_sink]
+    if output == "ndjson":
+        return [_ndjson_sink(sys.stdout)]
+    return [_ndjson_sink(open(output, "a", buffering=1))]
+
+
+# Callables receiving a list of committed alert dicts; append to add outputs.
+alert_sinks = _configured_sinks()
+
+
+def record_alerts(session, readings):
+    """Check new readings and insert any alerts in the session's transaction."""
+    alerts = monitor.check(session.connection(), readings)
+    session.info.setdefault(_CHECKED, []).extend({r[0] for r in readings})
+    if alerts:
+        session.connection().execute(insert(Alert), alerts)
+        session.info.setdefault(_PENDING, []).extend(alerts)
+
+
+@event.listens_for(OrmSession, "after_flush")
+def _alert_on_flush(session, flush_context):
+    inserted = [o for o in session.new if isinstance(o, GlucoseLog)]
+    if inserted:
+        record_alerts(session, [(o.patient_id, o.timestamp, o.reading) for o in inserted])
+
+
+def _alert_on_bulk(session, rows):
+    record_alerts(session, [(r["patient_id"], r["timestamp"], r["reading"]) for r in rows])
+
+
+GlucoseLog.bulk_insert_hooks.append(_alert_on_bulk)
+
+
+@event.listens_for(OrmSession, "after_transaction_create")
+def _mark_savepoint(session, transaction):
+    if transaction.nested:
+        session.info.setdefault(_MARKS, []).append(
+            (len(session.info.get(_PENDING, ())), len(session.info.get(_CHECKED, ()))))
+
+
+@event.listens_for(OrmSession, "after_commit")
+def _emit_committed(session):
+    # Also fired when a savepoint is released; its alerts wait for the outermost commit.
+    if session.in_nested_transaction():
+        return
+    session.info.pop(_CHECKED, None)
+    alerts = session.info.pop(_PENDING, None)
+    if alerts:
+        for sink in alert_sinks:
+            sink(alerts)
+
+
+@event.listens_for(OrmSession, "after_rollback")
+def _drop_rolled_back(session):
+    pending, checked = session.info.get(_PENDING, []), session.info.get(_CHECKED, [])
+    marks = session.info.get(_MARKS)
+    # A savepoint rollback only undoes what came after the savepoint began.
+    n_pending, n_checked = marks[-1] if session.in_nested_transaction() and marks else (0, 0)
+    monitor.forget(set(checked[n_checked:]))
+    del pending[n_pending:], checked[n_checked:]
+
+
+@event.listens_for(OrmSession, "after_transaction_end")
+def _end_savepoint(session, transaction):
+    if transaction.nested and session.info.get(_MARKS):
+        session.info[_MARKS].pop()
+    elif transaction.parent is None:
+        for key in (_PENDING, _CHECKED, _MARKS):
+            session.info.pop(key, None)
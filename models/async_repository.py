@@ -0,0 +1,161 @@
+"""Async data access for patients, glucose logs and medications.
+
+The repositories mirror the model classmethods (``create``, ``get_by_id``,
+``get_all``, ``iter_all``, ``find_by_*``) on an ``AsyncSession``, with two
+differences:
+
+- nothing commits: writes are added and flushed (so IDs are assigned and the
+  rollup, alert and summary-cache listeners run) and the caller owns the
+  transaction, e.g. ``async with session.begin(): ...``;
+- each has an awaitable ``bulk_create`` taking a list of row dicts and
+  returning the new instances; ``GlucoseLogRepository.bulk_insert`` is the
+  faster multi-row insert that returns only a count.
+
+Returned objects have no relationships loaded and lazy loading does not
+work under asyncio; ask for what you need (``summary``, ``for_patient``)
+instead of touching ``patient.glucose_logs``. Code that only exists in
+synchronous form (ranked name search, rollup stats, the glycemic report)
+runs on the same connection via ``AsyncSession.run_sync``.
+"""
+from datetime import date, datetime
+from typing import Optional
+
+from sqlalchemy import select
+
+from db.pagination import aiter_pages, PAGE_SIZE
+from models.name_search import find_ranked
+from models.glucose_log import GlucoseLog
+from models.patient import Patient, SEARCH_LIMIT
+from models.medication import Medication
+from models.patient_summary import PatientSummary, patient_summary, stats_by_patient
+
+
+class AsyncRepository:
+    """Operations shared by every model; subclasses set ``model``."""
+
+    model = None
+
+    def __init__(self, session):
+        self.session = session
+
+    async def add(self, instance):
+        self.session.add(instance)
+        await self.session.flush()
+        return instance
+
+    async def get_by_id(self, id_: int):
+        return await self.session.get(self.model, id_)
+
+    async def get_many(self, ids) -> dict:
+        """``{id: instance}`` for the IDs that exist, in one query."""
+        rows = await self.session.scalars(select(self.model).where(self.model.id.in_(list(ids))))
+        return {row.id: row for row in rows}
+
+    async def get_all(self):
+        return (await self.session.scalars(select(self.model).order_by(self.model.id))).all()
+
+    def iter_all(self, after_id: int = None, limit: int = None, page_size: int = PAGE_SIZE):
+        """Async generator of pages in ID order (``async for page in repo.iter_all()``)."""
+        return self._pages(select(self.model), after_id, limit, page_size)
+
+    def _pages(self, stmt, after_id, limit, page_size):
+        after = (after_id,) if after_id is not None else None
+        return aiter_pages(self.session, stmt, [self.model.id], after=after, limit=limit, page_size=page_size)
+
+    async def bulk_create(self, rows) -> list:
+        """Insert ``rows`` (dicts of column values) in one flush; returns the new instances."""
+        instances = [self.model(**row) for row in rows]
+        self.session.add_all(instances)
+        await self.session.flush()
+        return instances
+
+    async def delete(self, instance):
+        await self.session.delete(instance)
+        await self.session.flush()
+
+
+class PatientRepository(AsyncRepository):
+    model = Patient
+
+    async def create(self, name: str, date_of_birth: date, contact: str = "") -> Patient:
+        return await self.add(Patient(name=name, date_of_birth=date_of_birth, contact=contact))
+
+    async def find_by_name(self, name: str, limit: int = SEARCH_LIMIT):
+        """Ranked name search (see ``models.name_search``)."""
+        return await self.session.run_sync(find_ranked, Patient, name, limit)
+
+    async def summary(self, patient_id: int) -> Optional[PatientSummary]:
+        """The cached dashboard summary (``models.patient_summary``), or ``None``."""
+        return await self.session.run_sync(patient_summary, patient_id)
+
+    async def stats_by_patient(self, patient_ids) -> dict:
+        """``{patient_id: GlucoseStats}`` from the rollups, through the summary cache."""
+        return await self.session.run_sync(stats_by_patient, patient_ids)
+
+    async def delete(self, instance):
+        # The cascade needs the children in the session; load them here, not lazily.
+        await self.session.refresh(instance, ["glucose_logs", "medications", "alerts"])
+        await super().delete(instance)
+
+
+class GlucoseLogRepository(AsyncRepository):
+    model = GlucoseLog
+
+    async def create(self, patient_id: int, reading: float, timestamp: datetime = None) -> GlucoseLog:
+        return await self.add(GlucoseLog(patient_id=patient_id, reading=reading, timestamp=timestamp or datetime.now()))
+
+    async def bulk_insert(self, rows) -> int:
+        """``GlucoseLog.bulk_insert``: one multi-row insert plus the bulk hooks, without the commit.
+
+        ``rows`` are dicts with ``patient_id``, ``reading`` and ``timestamp``;
+        returns the number inserted (IDs are not fetched back).
+        """
+        return await self.session.run_sync(GlucoseLog.bulk_insert, rows)
+
+    def iter_all(self, patient_id: int = None, after_id: int = None, limit: int = None, page_size: int = PAGE_SIZE):
+        stmt = select(GlucoseLog)
+        if patient_id is not None:
+            stmt = stmt.where(GlucoseLog.patient_id == patient_id)
+        return self._pages(stmt, after_id, limit, page_size)
+
+    async def for_patient(self, patient_id: int, start: datetime = None, end: datetime = None):
+        """One patient's logs in time order, optionally within ``[start, end]``."""
+        stmt = select(GlucoseLog).where(GlucoseLog.patient_id == patient_id)
+        if start is not None:
+            stmt = stmt.where(GlucoseLog.timestamp >= start)
+        if end is not None:
+            stmt = stmt.where(GlucoseLog.timestamp <= end)
+        stmt = stmt.order_by(GlucoseLog.timestamp, GlucoseLog.id)
+        return (await self.session.scalars(stmt)).all()
+
+    async def find_by_date_range(self, start: datetime, end: datetime):
+        stmt = select(GlucoseLog).where(GlucoseLog.timestamp.between(start, end)).order_by(GlucoseLog.timestamp)
+        return (await self.session.scalars(stmt)).all()
+
+
+class MedicationRepository(AsyncRepository):
+    model = Medication
+
+    async def create(self, patient_id: int, name: str, dosage: str = "", start_date: date = None,
+                     end_date: date = None) -> Medication:
+        Medication._check_dates(start_date, end_date)
+        return await self.add(Medication(patient_id=patient_id, name=name, dosage=dosage, start_date=start_date,
+                                         end_date=end_date))
+
+    async def active_for_patient(self, patient_id: int, at=None):
+        """Medications the patient was taking at ``at`` (default today)."""
+        return await self.session.run_sync(Medication.active_for_patient, patient_id, at)
+
+    def iter_all(self, patient_id: int = None, after_id: int = None, limit: int = None, page_size: int = PAGE_SIZE):
+        stmt = select(Medication)
+        if patient_id is not None:
+            stmt = stmt.where(Medication.patient_id == patient_id)
+        return self._pages(stmt, after_id, limit, page_size)
+
+    async def for_patient(self, patient_id: int):
+        stmt = select(Medication).where(Medication.patient_id == patient_id).order_by(Medication.start_date, Medication.id)
+        return (await self.session.scalars(stmt)).all()
+
+    async def find_by_name(self, name: str, limit: int = SEARCH_LIMIT):
+        """Ranked name search (see ``models.name_search``)."""
+        return await self.session.run_sync(find_ranked, Medication, name, limit)
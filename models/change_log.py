@@ -0,0 +1,124 @@
+"""Change feed: every insert, update and delete on patients, medications and glucose logs.
+
+On SQLite each captured table has ``AFTER INSERT/UPDATE/DELETE`` triggers
+that append a row to ``change_log`` with the table, row ID, operation and
+the row's columns as JSON (the new values, or the old ones for deletes).
+Triggers see every write path: ORM flushes, ``GlucoseLog.bulk_create``,
+cascades, archiving and raw SQL. ``change_log.id`` (AUTOINCREMENT, so never
+reused) is the cursor: reading ``WHERE id > cursor`` resumes exactly where
+the last reader stopped.
+
+When the log is created it is seeded with an ``insert`` for every existing
+row, so reading from cursor 0 is a full snapshot followed by the changes.
+Other databases, and SQLite builds without JSON functions, get the table
+but no triggers (``capture_enabled`` is False).
+"""
+import json
+
+from sqlalchemy import Column, Integer, String, Text, Index, event, select, delete, text
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session as OrmSession
+from db.setup import Base
+from db.pagination import iter_pages, PAGE_SIZE
+from models.patient import Patient
+from models.medication import Medication
+from models.glucose_log import GlucoseLog
+
+# Parents first, so a snapshot never lists a reading before its patient.
+CAPTURED_TABLES = (Patient.__table__, Medication.__table__, GlucoseLog.__table__)
+CAPTURED_NAMES = tuple(table.name for table in CAPTURED_TABLES)
+_NOW = "strftime('%Y-%m-%dT%H:%M:%fZ', 'now')"
+_TRIGGERS = (("ai", "INSERT", "insert", "new"), ("au", "UPDATE", "update", "new"), ("ad", "DELETE", "delete", "old"))
+
+
+class ChangeLog(Base):
+    __tablename__ = 'change_log'
+
+    id = Column(Integer, primary_key=True)  # the cursor
+    table_name = Column(String, nullable=False)
+    row_id = Column(Integer, nullable=False)
+    op = Column(String, nullable=False)  # insert / update / delete
+    changed_at = Column(String, nullable=False)  # ISO 8601 UTC, set by the trigger
+    data = Column(Text)  # JSON of the row's columns
+
+    __table_args__ = (
+        Index("ix_change_log_table_name_id", "table_name", "id"),
+        {"sqlite_autoincrement": True},
+    )
+
+    def __repr__(self):
+        return f"<ChangeLog({self.id}: {self.op} {self.table_name}#{self.row_id})>"
+
+    def to_dict(self) -> dict:
+        return {"cursor": self.id, "table": self.table_name, "op": self.op, "id": self.row_id,
+                "at": self.changed_at, "row": json.loads(self.data) if self.data else None}
+
+    @classmethod
+    def iter_since(cls, session: OrmSession, cursor: int = 0, tables=None, limit: int = None,
+                   page_size: int = PAGE_SIZE):
+        """Yield pages of changes after ``cursor`` in commit order, optionally for some tables."""
+        stmt = select(cls)
+        if tables:
+            stmt = stmt.where(cls.table_name.in_(list(tables)))
+        return iter_pages(session, stmt, [cls.id], after=(cursor,), limit=limit, page_size=page_size)
+
+    @classmethod
+    def prune(cls, session: OrmSession, through: int) -> int:
+        """Delete changes up to and including ``through``; returns the number removed."""
+        deleted = session.execute(delete(cls).where(cls.id <= through)).rowcount
+        session.commit()
+        return deleted
+
+
+def _row_json(table, ref: str) -> str:
+    return "json_object(" + ", ".join(f"'{c.name}', {ref}.{c.name}" for c in table.columns) + ")"
+
+
+def capture_ddl(table):
+    """Triggers copying each write on ``table`` into ``change_log``."""
+    return [
+        f"CREATE TRIGGER IF NOT EXISTS {table.name}_changes_{suffix} AFTER {event_name} ON {table.name} BEGIN "
+        f"INSERT INTO change_log (table_name, row_id, op, changed_at, data) "
+        f"VALUES ('{table.name}', {ref}.id, '{op}', {_NOW}, {_row_json(table, ref)}); END"
+        for suffix, event_name, op, ref in _TRIGGERS
+    ]
+
+
+def snapshot_ddl(table) -> str:
+    """Statement logging every existing row of ``table`` as an insert."""
+    return (f"INSERT INTO change_log (table_name, row_id, op, changed_at, data) "
+            f"SELECT '{table.name}', id, 'insert', {_NOW}, {_row_json(table, table.name)} "
+            f"FROM {table.name} ORDER BY id")
+
+
+def capture_enabled(connection) -> bool:
+    if connection.dialect.name != "sqlite":
+        return False
+    names = [f"{name}_changes_{suffix}" for name in CAPTURED_NAMES for suffix, *_ in _TRIGGERS]
+    found = connection.execute(
+        text("SELECT count(*) FROM sqlite_master WHERE type = 'trigger' AND name IN ("
+             + ", ".join(f":n{i}" for i in range(len(names))) + ")"),
+        {f"n{i}": name for i, name in enumerate(names)},
+    ).scalar()
+    return found == len(names)
+
+
+def _has_json(connection) -> bool:
+    try:
+        connection.exec_driver_sql("SELECT json_object('ok', 1)")
+    except OperationalError:
+        return False
+    return True
+
+
+@event.listens_for(Base.metadata, "after_create")
+def _create_capture(target, connection, tables=(), **kw):
+    # Metadata-level, so the captured tables exist whatever order create_all used.
+    if connection.dialect.name != "sqlite" or not _has_json(connection):
+        return
+    if ChangeLog.__table__ in tables:
+        for table in CAPTURED_TABLES:
+            connection.exec_driver_sql(snapshot_ddl(table))
+    for table in CAPTURED_TABLES:
+        for stmt in capture_ddl(table):
+            connection.exec_driver_sql(stmt)
@@ -1,7 +1,79 @@
-from sqlalchemy import Column, Integer, Float, DateTime, ForeignKey, CheckConstraint
+from sqlalchemy import Column, Integer, Float, DateTime, ForeignKey, CheckConstraint, Index, insert, select, func, case
 from sqlalchemy.orm import relationship, Session as OrmSession
 from db.setup import Base
-from datetime import datetime
+from db.pagination import iter_pages, PAGE_SIZE
+from db.unit_of_work import finish_write, in_uow
+from db.expressions import epoch_bucket
+from datetime import datetime, timedelta
+from math import sqrt
+from typing import NamedTuple
+import re
+
+# Consensus target range (mg/dL) used for time-in-range.
+TARGET_LOW = 70.0
+TARGET_HIGH = 180.0
+
+RESOLUTIONS = ("5m", "15m", "1h", "1d")  # offered by the CLI; any <n>m/<n>h/<n>d parses
+_UNIT_SECONDS = {"m": 60, "h": 3600, "d": 86400}
+_EPOCH = datetime(1970, 1, 1)
+
+
+def parse_resolution(value: str) -> int:
+    """Bucket width in seconds for ``5m``/``1h``/``1d``-style strings."""
+    match = re.fullmatch(r"\s*(\d+)\s*([mhd])\s*", value or "")
+    if not match or int(match.group(1)) == 0:
+        raise ValueError(f"Invalid resolution {value!r}; use e.g. 5m, 1h or 1d")
+    return int(match.group(1)) * _UNIT_SECONDS[match.group(2)]
+
+
+def parse_timestamp(value: str) -> datetime:
+    """ISO 8601 reading time as stored: naive local time.
+
+    ``glucose_logs.timestamp`` holds naive local times (SQLite would drop an
+    offset silently), so a value with a UTC offset is converted to local time
+    first. Every reading parser goes through here; an aware datetime would
+    also break comparisons with stored readings in alerts and rollups.
+    """
+    ts = datetime.fromisoformat(str(value).strip())
+    if ts.tzinfo is not None:
+        ts = ts.astimezone().replace(tzinfo=None)
+    return ts
+
+
+class GlucoseStats(NamedTuple):
+    count: int = 0
+    average: float = 0.0
+    minimum: float = 0.0
+    maximum: float = 0.0
+    stddev: float = 0.0
+    time_in_range: float = 0.0  # percent of readings within TARGET_LOW..TARGET_HIGH
+
+    @classmethod
+    def from_sums(cls, count, total, total_sq, minimum, maximum, in_range) -> "GlucoseStats":
+        """Build stats from additive aggregates (count, sum, sum of squares, ...)."""
+        if not count:
+            return cls()
+        average = total / count
+        variance = max(total_sq / count - average * average, 0.0)
+        return cls(
+            count=count,
+            average=round(average, 2),
+            minimum=minimum,
+            maximum=maximum,
+            stddev=round(sqrt(variance), 2),
+            time_in_range=round(100.0 * in_range / count, 1),
+        )
+
+
+class SeriesPoint(NamedTuple):
+    """One time bucket of a patient's readings (or, from ``downsample``, a single reading)."""
+    patient_id: int
+    start: datetime
+    count: int
+    average: float
+    minimum: float
+    maximum: float
+
 
 class GlucoseLog(Base):
     __tablename__ = 'glucose_logs'
@@ -13,8 +85,16 @@ class GlucoseLog(Base):
 
     patient = relationship("Patient", back_populates="glucose_logs")
 
+    # Callables run as hook(session, rows) inside the bulk_create transaction;
+    # Core bulk inserts bypass the ORM flush events other modules listen to.
+    bulk_insert_hooks = []
+
     __table_args__ = (
         CheckConstraint("reading > 0", name="ck_glucose_reading_positive"),
+        # Per-patient history (list by patient, relationship loads, stats) and
+        # cohort-wide date-range scans.
+        Index("ix_glucose_logs_patient_id_timestamp", "patient_id", "timestamp"),
+        Index("ix_glucose_logs_timestamp", "timestamp"),
     )
 
     def __repr__(self):
@@ -25,10 +105,32 @@ class GlucoseLog(Base):
     def create(cls, session: OrmSession, patient, reading: float, timestamp: datetime = None):
         instance = cls(reading=reading, timestamp=timestamp or datetime.now(), patient=patient)
         session.add(instance)
-        session.commit()
-        session.refresh(instance)
+        finish_write(session, instance)
         return instance
 
+    @classmethod
+    def bulk_create(cls, session: OrmSession, rows):
+        """Insert many readings as one multi-row statement and commit once.
+
+        ``rows`` is a list of dicts with ``patient_id``, ``reading`` and
+        ``timestamp`` keys. Returns the number of rows inserted. Inside
+        ``uow`` the commit is left to the enclosing block.
+        """
+        inserted = cls.bulk_insert(session, rows)
+        if inserted and not in_uow(session):
+            session.commit()
+        return inserted
+
+    @classmethod
+    def bulk_insert(cls, session: OrmSession, rows) -> int:
+        """``bulk_create`` without the commit: insert and run the hooks in the caller's transaction."""
+        if not rows:
+            return 0
+        session.execute(insert(cls), rows)
+        for hook in cls.bulk_insert_hooks:
+            hook(session, rows)
+        return len(rows)
+
     @classmethod
     def get_by_id(cls, session: OrmSession, id_: int):
         return session.get(cls, id_)
@@ -37,10 +139,98 @@ class GlucoseLog(Base):
     def get_all(cls, session: OrmSession):
         return session.query(cls).all()
 
+    @classmethod
+    def iter_all(cls, session: OrmSession, patient_id: int = None, after_id: int = None, limit: int = None,
+                 page_size: int = PAGE_SIZE):
+        """Yield pages of logs in ID order, optionally for a single patient."""
+        stmt = select(cls)
+        if patient_id is not None:
+            stmt = stmt.where(cls.patient_id == patient_id)
+        after = (after_id,) if after_id is not None else None
+        return iter_pages(session, stmt, [cls.id], after=after, limit=limit, page_size=page_size)
+
     @classmethod
     def find_by_date_range(cls, session: OrmSession, start: datetime, end: datetime):
         return session.query(cls).filter(cls.timestamp.between(start, end)).all()
 
+    @classmethod
+    def iter_by_date_range(cls, session: OrmSession, start: datetime, end: datetime, patient_id: int = None,
+                           page_size: int = PAGE_SIZE):
+        """Yield pages of logs in time order; walks the timestamp indexes."""
+        stmt = select(cls).where(cls.timestamp.between(start, end))
+        if patient_id is not None:
+            stmt = stmt.where(cls.patient_id == patient_id)
+        return iter_pages(session, stmt, [cls.timestamp, cls.id], page_size=page_size)
+
+    @classmethod
+    def series(cls, session: OrmSession, start: datetime = None, end: datetime = None, resolution: str = "1h",
+               patient_id: int = None):
+        """Readings in ``[start, end)`` bucketed to ``resolution``, grouped in SQL.
+
+        Returns ``[SeriesPoint]`` ordered by patient then bucket, one per
+        non-empty bucket, so the result size depends on the resolution and
+        the window, not on how many raw readings there are.
+        """
+        seconds = parse_resolution(resolution)
+        bucket = epoch_bucket(session.get_bind().dialect.name, cls.timestamp, seconds).label("bucket")
+        stmt = (
+            select(cls.patient_id, bucket, func.count(cls.id), func.avg(cls.reading),
+                   func.min(cls.reading), func.max(cls.reading))
+            .where(cls.timestamp.is_not(None))
+            .group_by(cls.patient_id, bucket)
+            .order_by(cls.patient_id, bucket)
+        )
+        if patient_id is not None:
+            stmt = stmt.where(cls.patient_id == patient_id)
+        if start is not None:
+            stmt = stmt.where(cls.timestamp >= start)
+        if end is not None:
+            stmt = stmt.where(cls.timestamp < end)
+        return [
+            SeriesPoint(pid, _EPOCH + timedelta(seconds=int(b)), n, round(avg, 2), low, high)
+            for pid, b, n, avg, low, high in session.execute(stmt)
+        ]
+
+    @classmethod
+    def downsample(cls, session: OrmSession, patient_id: int, points: int, start: datetime = None,
+                   end: datetime = None):
+        """At most ``points`` of one patient's readings in ``[start, end)``, picked by LTTB.
+
+        Largest-Triangle-Three-Buckets keeps the readings that shape the
+        curve (peaks, troughs), so a chart drawn from the result looks like
+        one drawn from every reading. Returns ``[SeriesPoint]`` in time order.
+        """
+        from analytics.downsample import downsample_readings  # NumPy stays out of the model import path
+
+        return downsample_readings(session.connection(), patient_id, points, start, end)
+
+    @classmethod
+    def stats_by_patient(cls, session: OrmSession, patient_ids=None) -> dict:
+        """Return ``{patient_id: GlucoseStats}`` from one grouped SQL query.
+
+        Patients without readings are absent from the result; callers should
+        fall back to ``GlucoseStats()``. Standard deviation is the population
+        SD derived from the sum of squares, so no reading leaves the database.
+        This scans raw readings; ``GlucoseRollup.stats_by_patient`` answers the
+        same question from the daily rollups.
+        """
+        in_range = case((cls.reading.between(TARGET_LOW, TARGET_HIGH), 1), else_=0)
+        stmt = (
+            select(
+                cls.patient_id,
+                func.count(cls.id),
+                func.sum(cls.reading),
+                func.sum(cls.reading * cls.reading),
+                func.min(cls.reading),
+                func.max(cls.reading),
+                func.sum(in_range),
+            )
+            .group_by(cls.patient_id)
+        )
+        if patient_ids is not None:
+            stmt = stmt.where(cls.patient_id.in_(list(patient_ids)))
+        return {pid: GlucoseStats.from_sums(*sums) for pid, *sums in session.execute(stmt)}
+
     def delete(self, session: OrmSession):
         session.delete(self)
-        session.commit()
+        finish_write(session)
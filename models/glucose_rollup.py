@@ -0,0 +1,355 @@
+from sqlalchemy import (
+    Column, Integer, Float, String, DateTime, ForeignKey, UniqueConstraint, Index,
+    select, delete, func, case, event, literal,
+)
+from sqlalchemy.orm import Session as OrmSession, attributes
+from db.setup import Base
+from models.glucose_log import GlucoseLog, GlucoseStats, TARGET_LOW, TARGET_HIGH
+from datetime import datetime, timedelta
+
+HOUR = "hour"
+DAY = "day"
+GRANULARITIES = (HOUR, DAY)
+_STEP = {HOUR: timedelta(hours=1), DAY: timedelta(days=1)}
+# SQLite stores DateTime as text in this exact layout; bucket keys written from
+# SQL (rebuild) and from Python (incremental updates) must compare equal.
+_SQLITE_BUCKET_FORMAT = {HOUR: "%Y-%m-%d %H:00:00.000000", DAY: "%Y-%m-%d 00:00:00.000000"}
+_PG_TRUNC = {HOUR: "hour", DAY: "day"}
+# Dialects with a SQL bucket expression and an upsert. Others get the same
+# rollups through the portable paths: bucket recompute and Python grouping.
+NATIVE_DIALECTS = ("sqlite", "postgresql")
+
+
+def bucket_start(ts: datetime, granularity: str) -> datetime:
+    if granularity == HOUR:
+        return ts.replace(minute=0, second=0, microsecond=0)
+    return ts.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def bucket_expr(dialect_name: str, granularity: str, column):
+    """SQL expression truncating ``column`` to the start of its bucket."""
+    if dialect_name == "sqlite":
+        return func.strftime(_SQLITE_BUCKET_FORMAT[granularity], column)
+    if dialect_name == "postgresql":
+        return func.date_trunc(_PG_TRUNC[granularity], column)
+    raise NotImplementedError(f"No bucket expression for dialect {dialect_name}")
+
+
+class GlucoseRollup(Base):
+    """Per-patient hourly/daily aggregates of ``glucose_logs``.
+
+    Buckets hold additive sums so they can be combined into any coarser
+    window; they are kept current by the flush listener below and by the
+    ``GlucoseLog.bulk_create`` hook, and can be rebuilt from raw readings.
+    """
+    __tablename__ = 'glucose_rollups'
+
+    id = Column(Integer, primary_key=True)
+    patient_id = Column(Integer, ForeignKey('patients.id'), nullable=False)
+    granularity = Column(String, nullable=False)
+    bucket_start = Column(DateTime, nullable=False)
+    reading_count = Column(Integer, nullable=False, default=0)
+    reading_sum = Column(Float, nullable=False, default=0.0)
+    reading_sum_sq = Column(Float, nullable=False, default=0.0)
+    reading_min = Column(Float)
+    reading_max = Column(Float)
+    in_range_count = Column(Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        UniqueConstraint("patient_id", "granularity", "bucket_start", name="uq_glucose_rollups_bucket"),
+        Index("ix_glucose_rollups_granularity_bucket_start", "granularity", "bucket_start"),
+    )
+
+    def __repr__(self):
+        return f"<GlucoseRollup(patient_id={self.patient_id}, {self.granularity}={self.bucket_start}, n={self.reading_count})>"
+
+    @property
+    def stats(self) -> GlucoseStats:
+        return GlucoseStats.from_sums(self.reading_count, self.reading_sum, self.reading_sum_sq,
+                                      self.reading_min, self.reading_max, self.in_range_count)
+
+    # ----- Incremental maintenance -----
+    @classmethod
+    def apply_readings(cls, connection, readings):
+        """Add ``(patient_id, timestamp, reading)`` triples to their buckets."""
+        rows = cls._bucket_rows(readings)
+        if not rows:
+            return
+        if connection.dialect.name in NATIVE_DIALECTS:
+            cls._upsert(connection, rows)
+        else:
+            # No portable upsert: recompute the touched buckets from the (already inserted) readings.
+            cls.refresh_buckets(connection, sorted({(r["patient_id"], r["granularity"], r["bucket_start"])
+                                                    for r in rows}))
+
+    @staticmethod
+    def _bucket_rows(readings):
+        """Rollup rows summing ``(patient_id, timestamp, reading)`` triples per bucket."""
+        deltas = {}
+        for patient_id, ts, reading in readings:
+            if ts is None:
+                continue
+            in_range = 1 if TARGET_LOW <= reading <= TARGET_HIGH else 0
+            for granularity in GRANULARITIES:
+                key = (patient_id, granularity, bucket_start(ts, granularity))
+                d = deltas.get(key)
+                if d is None:
+                    deltas[key] = [1, reading, reading * reading, reading, reading, in_range]
+                else:
+                    d[0] += 1
+                    d[1] += reading
+                    d[2] += reading * reading
+                    d[3] = min(d[3], reading)
+                    d[4] = max(d[4], reading)
+                    d[5] += in_range
+        return [
+            dict(patient_id=pid, granularity=gran, bucket_start=start, reading_count=n, reading_sum=total,
+                 reading_sum_sq=total_sq, reading_min=low, reading_max=high, in_range_count=in_range)
+            for (pid, gran, start), (n, total, total_sq, low, high, in_range) in deltas.items()
+        ]
+
+    @classmethod
+    def _upsert(cls, connection, rows):
+        table = cls.__table__
+        dialect = connection.dialect.name
+        if dialect == "sqlite":
+            from sqlalchemy.dialects.sqlite import insert as dialect_insert
+            least, greatest = func.min, func.max
+        elif dialect == "postgresql":
+            from sqlalchemy.dialects.postgresql import insert as dialect_insert
+            least, greatest = func.least, func.greatest
+        else:
+            raise NotImplementedError(f"Rollup upsert not supported for dialect {dialect}; use apply_readings")
+        stmt = dialect_insert(table)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[table.c.patient_id, table.c.granularity, table.c.bucket_start],
+            set_={
+                "reading_count": table.c.reading_count + stmt.excluded.reading_count,
+                "reading_sum": table.c.reading_sum + stmt.excluded.reading_sum,
+                "reading_sum_sq": table.c.reading_sum_sq + stmt.excluded.reading_sum_sq,
+                "reading_min": least(table.c.reading_min, stmt.excluded.reading_min),
+                "reading_max": greatest(table.c.reading_max, stmt.excluded.reading_max),
+                "in_range_count": table.c.in_range_count + stmt.excluded.in_range_count,
+            },
+        )
+        connection.execute(stmt, rows)
+
+    @classmethod
+    def refresh_buckets(cls, connection, keys):
+        """Recompute ``(patient_id, granularity, bucket_start)`` buckets from raw readings.
+
+        Used after deletes and updates, where min/max cannot be maintained
+        incrementally. Each bucket is one bounded index range scan.
+        """
+        table = cls.__table__
+        logs = GlucoseLog.__table__
+        for patient_id, granularity, start in keys:
+            connection.execute(delete(table).where(
+                table.c.patient_id == patient_id,
+                table.c.granularity == granularity,
+                table.c.bucket_start == start,
+            ))
+            connection.execute(
+                table.insert().from_select(
+                    ["patient_id", "granularity", "bucket_start", "reading_count", "reading_sum",
+                     "reading_sum_sq", "reading_min", "reading_max", "in_range_count"],
+                    cls._aggregate(logs, literal(patient_id), literal(granularity), literal(start, DateTime))
+                    .where(logs.c.patient_id == patient_id,
+                           logs.c.timestamp >= start,
+                           logs.c.timestamp < start + _STEP[granularity])
+                    .having(func.count(logs.c.id) > 0),
+                )
+            )
+
+    @staticmethod
+    def _aggregate(logs, *key_columns):
+        in_range = case((logs.c.reading.between(TARGET_LOW, TARGET_HIGH), 1), else_=0)
+        return select(
+            *key_columns,
+            func.count(logs.c.id),
+            func.sum(logs.c.reading),
+            func.sum(logs.c.reading * logs.c.reading),
+            func.min(logs.c.reading),
+            func.max(logs.c.reading),
+            func.sum(in_range),
+        )
+
+    @classmethod
+    def rebuild(cls, session: OrmSession, patient_id: int = None) -> int:
+        """Drop and recompute all buckets (optionally for one patient). Returns bucket count."""
+        written = cls._rebuild_on(session.connection(), patient_id)
+        session.commit()
+        return written
+
+    @classmethod
+    def _rebuild_on(cls, connection, patient_id: int = None) -> int:
+        table = cls.__table__
+        logs = GlucoseLog.__table__
+        dialect = connection.dialect.name
+        clear = delete(table)
+        if patient_id is not None:
+            clear = clear.where(table.c.patient_id == patient_id)
+        connection.execute(clear)
+        if dialect not in NATIVE_DIALECTS:
+            # No bucket expression: group the streamed readings in Python (one pass, one row per bucket).
+            readings = select(logs.c.patient_id, logs.c.timestamp, logs.c.reading).where(logs.c.timestamp.is_not(None))
+            if patient_id is not None:
+                readings = readings.where(logs.c.patient_id == patient_id)
+            rows = cls._bucket_rows(connection.execute(readings))
+            if rows:
+                connection.execute(table.insert(), rows)
+            return len(rows)
+        written = 0
+        for granularity in GRANULARITIES:
+            bucket = bucket_expr(dialect, granularity, logs.c.timestamp)
+            agg = cls._aggregate(logs, logs.c.patient_id, literal(granularity), bucket).where(logs.c.timestamp.is_not(None))
+            if patient_id is not None:
+                agg = agg.where(logs.c.patient_id == patient_id)
+            agg = agg.group_by(logs.c.patient_id, bucket)
+            result = connection.execute(table.insert().from_select(
+                ["patient_id", "granularity", "bucket_start", "reading_count", "reading_sum",
+                 "reading_sum_sq", "reading_min", "reading_max", "in_range_count"],
+                agg,
+            ))
+            written += result.rowcount
+        return written
+
+    # ----- Lookups -----
+    @classmethod
+    def sum_columns(cls):
+        return (
+            func.sum(cls.reading_count),
+            func.sum(cls.reading_sum),
+            func.sum(cls.reading_sum_sq),
+            func.min(cls.reading_min),
+            func.max(cls.reading_max),
+            func.sum(cls.in_range_count),
+        )
+
+    @classmethod
+    def stats_by_patient(cls, session: OrmSession, patient_ids=None) -> dict:
+        """Same result as ``GlucoseLog.stats_by_patient`` but read from daily buckets."""
+        stmt = select(cls.patient_id, *cls.sum_columns()).where(cls.granularity == DAY).group_by(cls.patient_id)
+        if patient_ids is not None:
+            stmt = stmt.where(cls.patient_id.in_(list(patient_ids)))
+        return {pid: GlucoseStats.from_sums(*sums) for pid, *sums in session.execute(stmt)}
+
+    @classmethod
+    def trend(cls, session: OrmSession, patient_id: int, start: datetime, end: datetime, granularity: str = DAY):
+        """``[(bucket_start, GlucoseStats)]`` for buckets in ``[start, end)``."""
+        rows = session.scalars(
+            select(cls)
+            .where(cls.patient_id == patient_id, cls.granularity == granularity,
+                   cls.bucket_start >= start, cls.bucket_start < end)
+            .order_by(cls.bucket_start)
+        )
+        return [(r.bucket_start, r.stats) for r in rows]
+
+    @classmethod
+    def summarize(cls, session: OrmSession, start: datetime, end: datetime, patient_id: int = None) -> GlucoseStats:
+        """Stats for readings in ``[start, end)``.
+
+        Whole days come from daily buckets, whole hours at the edges from
+        hourly buckets, and only the sub-hour remainders touch raw readings.
+        """
+        return GlucoseStats.from_sums(*cls.window_sums(session, start, end, patient_id))
+
+    @classmethod
+    def window_sums(cls, session: OrmSession, start: datetime, end: datetime, patient_id: int = None):
+        """The additive sums behind ``summarize``: ``[count, sum, sum_sq, min, max, in_range]``."""
+        segments = []
+        h0 = bucket_start(start, HOUR)
+        if h0 < start:
+            h0 += _STEP[HOUR]
+        h1 = bucket_start(end, HOUR)
+        if h0 >= h1:
+            segments.append((None, start, end))
+        else:
+            d0 = bucket_start(h0, DAY)
+            if d0 < h0:
+                d0 += _STEP[DAY]
+            d1 = bucket_start(h1, DAY)
+            if d0 >= d1:
+                segments.append((HOUR, h0, h1))
+            else:
+                segments += [(HOUR, h0, d0), (DAY, d0, d1), (HOUR, d1, h1)]
+            segments += [(None, start, h0), (None, h1, end)]
+
+        totals = [0, 0.0, 0.0, None, None, 0]
+        for granularity, lo, hi in segments:
+            if lo >= hi:
+                continue
+            if granularity is None:
+                logs = GlucoseLog.__table__
+                stmt = cls._aggregate(logs).where(logs.c.timestamp >= lo, logs.c.timestamp < hi)
+                if patient_id is not None:
+                    stmt = stmt.where(logs.c.patient_id == patient_id)
+            else:
+                stmt = select(*cls.sum_columns()).where(cls.granularity == granularity,
+                                                  cls.bucket_start >= lo, cls.bucket_start < hi)
+                if patient_id is not None:
+                    stmt = stmt.where(cls.patient_id == patient_id)
+            n, total, total_sq, low, high, in_range = session.execute(stmt).one()
+            if not n:
+                continue
+            totals[0] += n
+            totals[1] += total
+            totals[2] += total_sq
+            totals[3] = low if totals[3] is None else min(totals[3], low)
+            totals[4] = high if totals[4] is None else max(totals[4], high)
+            totals[5] += in_range
+        return totals
+
+
+def _log_values(log, use_history: bool):
+    """(patient_id, timestamp, reading) for a log, pre-change values if ``use_history``."""
+    values = []
+    for name in ("patient_id", "timestamp", "reading"):
+        hist = attributes.get_history(log, name)
+        if use_history and hist.deleted:
+            values.append(hist.deleted[0])
+        else:
+            values.append(getattr(log, name))
+    return tuple(values)
+
+
+def _bucket_keys(patient_id, ts):
+    if ts is None:
+        return set()
+    return {(patient_id, granularity, bucket_start(ts, granularity)) for granularity in GRANULARITIES}
+
+
+@event.listens_for(GlucoseRollup.__table__, "after_create")
+def _backfill_new_table(target, connection, **kw):
+    # create_all on a database that already has readings must not leave an
+    # empty (and therefore wrong) rollup table behind.
+    GlucoseRollup._rebuild_on(connection)
+
+
+@event.listens_for(OrmSession, "after_flush")
+def _maintain_rollups(session, flush_context):
+    inserted = [o for o in session.new if isinstance(o, GlucoseLog)]
+    removed = [o for o in session.deleted if isinstance(o, GlucoseLog)]
+    changed = [o for o in session.dirty if isinstance(o, GlucoseLog) and session.is_modified(o)]
+    if not (inserted or removed or changed):
+        return
+    connection = session.connection()
+    if inserted:
+        GlucoseRollup.apply_readings(connection, [(o.patient_id, o.timestamp, o.reading) for o in inserted])
+    stale = set()
+    for log in removed:
+        stale |= _bucket_keys(*_log_values(log, use_history=True)[:2])
+    for log in changed:
+        stale |= _bucket_keys(*_log_values(log, use_history=True)[:2])
+        stale |= _bucket_keys(log.patient_id, log.timestamp)
+    if stale:
+        GlucoseRollup.refresh_buckets(connection, sorted(stale))
+
+
+def _maintain_rollups_bulk(session, rows):
+    GlucoseRollup.apply_readings(
+        session.connection(), [(r["patient_id"], r["timestamp"], r["reading"]) for r in rows]
+    )
+
+
+GlucoseLog.bulk_insert_hooks.append(_maintain_rollups_bulk)
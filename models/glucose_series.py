@@ -0,0 +1,155 @@
+"""Read-only, array-backed glucose readings for reports and listings.
+
+A ``GlucoseSeries`` keeps readings in four parallel ``array`` columns (log
+ID, patient ID, epoch seconds, mg/dL): 32 bytes per reading, against well
+over a kilobyte for a ``GlucoseLog`` with its identity-map entry and
+instrumentation state. Rows come from a Core ``select`` straight into the
+arrays; no ORM entity or per-row ``datetime`` is built until a caller asks
+for one. ``to_numpy`` exposes the times and readings as zero-copy NumPy
+views for vectorised analytics.
+
+Timestamps are naive, like ``glucose_logs.timestamp``, and kept to the
+millisecond.
+"""
+from array import array
+from datetime import datetime, timedelta
+from math import isnan
+from typing import NamedTuple
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session as OrmSession
+
+from db.expressions import epoch_seconds
+from db.pagination import page_statement, PAGE_SIZE
+from models.glucose_log import GlucoseLog, GlucoseStats, TARGET_LOW, TARGET_HIGH
+
+_EPOCH = datetime(1970, 1, 1)
+_NAN = float("nan")
+
+
+class GlucoseReading(NamedTuple):
+    """One reading, built on demand; has the attributes listings read from ``GlucoseLog``."""
+    id: int
+    patient_id: int
+    reading: float
+    timestamp: datetime
+
+
+def _to_datetime(seconds: float):
+    return None if isnan(seconds) else _EPOCH + timedelta(seconds=round(seconds, 3))
+
+
+class GlucoseSeries:
+    """Readings in query order; iterate for ``GlucoseReading`` rows, or use the arrays directly."""
+
+    __slots__ = ("ids", "patient_ids", "times", "readings")
+
+    def __init__(self):
+        self.ids = array("q")
+        self.patient_ids = array("q")
+        self.times = array("d")  # epoch seconds; NaN where the timestamp is missing
+        self.readings = array("d")
+
+    @classmethod
+    def from_rows(cls, rows) -> "GlucoseSeries":
+        """Build from ``(id, patient_id, epoch_seconds, reading)`` rows."""
+        series = cls()
+        ids, pids, times, readings = (series.ids.append, series.patient_ids.append, series.times.append,
+                                      series.readings.append)
+        for id_, pid, ts, reading in rows:
+            ids(id_)
+            pids(pid)
+            times(_NAN if ts is None else ts)
+            readings(reading)
+        return series
+
+    @staticmethod
+    def select(dialect_name: str, patient_id: int = None, start: datetime = None, end: datetime = None):
+        """The Core statement behind ``load``: readings in ``[start, end)``, optionally for one patient."""
+        stmt = select(GlucoseLog.id, GlucoseLog.patient_id, epoch_seconds(dialect_name, GlucoseLog.timestamp),
+                      GlucoseLog.reading)
+        if patient_id is not None:
+            stmt = stmt.where(GlucoseLog.patient_id == patient_id)
+        if start is not None:
+            stmt = stmt.where(GlucoseLog.timestamp >= start)
+        if end is not None:
+            stmt = stmt.where(GlucoseLog.timestamp < end)
+        return stmt
+
+    @classmethod
+    def load(cls, session: OrmSession, patient_id: int = None, start: datetime = None,
+             end: datetime = None) -> "GlucoseSeries":
+        """All matching readings in time order, in one query."""
+        # On the connection: ORM ``session.execute`` buffers every row first (8x the memory).
+        connection = session.connection()
+        stmt = cls.select(connection.dialect.name, patient_id, start, end)
+        return cls.from_rows(connection.execute(stmt.order_by(GlucoseLog.timestamp, GlucoseLog.id)))
+
+    @classmethod
+    def iter_pages(cls, session: OrmSession, patient_id: int = None, start: datetime = None, end: datetime = None,
+                   by_time: bool = False, after_id: int = None, limit: int = None, page_size: int = PAGE_SIZE):
+        """Yield keyset-paginated ``GlucoseSeries`` pages, in ID order or (``by_time``) time order.
+
+        The drop-in for ``GlucoseLog.iter_all``/``iter_by_date_range`` in
+        listings: same index range scans, no ORM objects. ``after_id``
+        resumes ID-ordered listings.
+        """
+        connection = session.connection()
+        stmt = cls.select(connection.dialect.name, patient_id, start, end)
+        columns = [GlucoseLog.timestamp, GlucoseLog.id] if by_time else [GlucoseLog.id]
+        after = (after_id,) if after_id is not None and not by_time else None
+        remaining = limit
+        while remaining is None or remaining > 0:
+            size = page_size if remaining is None else min(page_size, remaining)
+            page = cls.from_rows(connection.execute(page_statement(stmt, columns, after, size)))
+            if not page:
+                return
+            yield page
+            if len(page) < size:
+                return
+            if remaining is not None:
+                remaining -= len(page)
+            last = page.ids[-1]
+            if by_time:
+                # The exact stored timestamp, not the float copy, so the key compares equal.
+                after = (connection.scalar(select(GlucoseLog.timestamp).where(GlucoseLog.id == last)), last)
+            else:
+                after = (last,)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __getitem__(self, i: int) -> GlucoseReading:
+        return GlucoseReading(self.ids[i], self.patient_ids[i], self.readings[i], _to_datetime(self.times[i]))
+
+    def __iter__(self):
+        for id_, pid, ts, reading in zip(self.ids, self.patient_ids, self.times, self.readings):
+            yield GlucoseReading(id_, pid, reading, _to_datetime(ts))
+
+    @property
+    def nbytes(self) -> int:
+        return sum(col.itemsize * len(col) for col in (self.ids, self.patient_ids, self.times, self.readings))
+
+    @property
+    def average(self) -> float:
+        return round(sum(self.readings) / len(self.readings), 2) if self.readings else 0.0
+
+    def stats(self) -> GlucoseStats:
+        """Count/avg/min/max/SD/TIR in one pass over the readings array."""
+        if not self.readings:
+            return GlucoseStats()
+        total = total_sq = 0.0
+        in_range = 0
+        for r in self.readings:
+            total += r
+            total_sq += r * r
+            if TARGET_LOW <= r <= TARGET_HIGH:
+                in_range += 1
+        return GlucoseStats.from_sums(len(self.readings), total, total_sq, min(self.readings), max(self.readings),
+                                      in_range)
+
+    def to_numpy(self):
+        """``(epoch_seconds, readings)`` as float64 NumPy views sharing this series' memory."""
+        import numpy as np  # NumPy stays out of the model import path
+
+        return np.frombuffer(self.times, dtype=np.float64), np.frombuffer(self.readings, dtype=np.float64)
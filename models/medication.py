@@ -1,6 +1,64 @@
-from sqlalchemy import Column, Integer, String, Date, ForeignKey, CheckConstraint
-from sqlalchemy.orm import relationship, Session as OrmSession
+from sqlalchemy import Column, Integer, String, Date, ForeignKey, CheckConstraint, Index, select, func, case, and_, or_, exists
+from sqlalchemy.orm import relationship, aliased, Session as OrmSession
 from db.setup import Base
+from db.pagination import iter_pages, PAGE_SIZE
+from db.unit_of_work import finish_write
+from db.expressions import day_of
+from models.name_search import find_ranked, register_name_index
+from models.glucose_log import GlucoseLog, GlucoseStats, TARGET_LOW, TARGET_HIGH
+from datetime import date, datetime
+from typing import NamedTuple, Optional
+
+SEARCH_LIMIT = 50
+
+ACTIVE = "active"
+PLANNED = "planned"
+STOPPED = "stopped"
+
+
+def _day(value) -> date:
+    """``value`` as a calendar day (datetimes are truncated; ``None`` means today)."""
+    if value is None:
+        return date.today()
+    return value.date() if isinstance(value, datetime) else value
+
+
+def status_on(start_date: Optional[date], end_date: Optional[date], day: date = None) -> str:
+    """``planned``, ``active`` or ``stopped`` on ``day`` (default today); both ends are inclusive."""
+    day = _day(day)
+    if start_date is not None and start_date > day:
+        return PLANNED
+    if end_date is not None and end_date < day:
+        return STOPPED
+    return ACTIVE
+
+
+def active_clause(med, day):
+    """SQL: ``med`` (the class or an alias) was being taken on ``day`` (a date or SQL day expression).
+
+    A missing start date means "since before records began", a missing end
+    date "still taking it".
+    """
+    return and_(
+        or_(med.start_date.is_(None), med.start_date <= day),
+        or_(med.end_date.is_(None), med.end_date >= day),
+    )
+
+
+class RegimenReading(NamedTuple):
+    id: int
+    patient_id: int
+    timestamp: datetime
+    reading: float
+    regimen: tuple  # "Name dosage" of each medication active that day, by name
+
+
+class DrugOutcome(NamedTuple):
+    drug: str  # lower-cased medication name
+    patients: int  # patients ever prescribed it who have readings
+    on: GlucoseStats  # their readings on days they were taking it
+    off: GlucoseStats  # their readings on other days
+
 
 class Medication(Base):
     __tablename__ = 'medications'
@@ -9,26 +67,49 @@ class Medication(Base):
     name = Column(String, nullable=False)
     dosage = Column(String)
     start_date = Column(Date)
+    end_date = Column(Date)  # last day taken; NULL while ongoing
     patient_id = Column(Integer, ForeignKey('patients.id'), nullable=False)
 
     patient = relationship("Patient", back_populates="medications")
 
     __table_args__ = (
         CheckConstraint("length(name) > 0", name="ck_med_name_nonempty"),
+        Index("ix_medications_patient_id", "patient_id"),
+        # "Who is on drug Y": case-insensitive name lookups.
+        Index("ix_medications_name_lower", func.lower(name)),
     )
 
     def __repr__(self):
         return f"<Medication(name={self.name}, dosage={self.dosage})>"
 
-   
+    @property
+    def status(self) -> str:
+        return status_on(self.start_date, self.end_date)
+
+    def is_active_on(self, day=None) -> bool:
+        return status_on(self.start_date, self.end_date, day) == ACTIVE
+
+    @staticmethod
+    def _check_dates(start_date, end_date):
+        if start_date is not None and end_date is not None and end_date < start_date:
+            raise ValueError("End date cannot be before the start date.")
+
     @classmethod
-    def create(cls, session: OrmSession, patient, name: str, dosage: str = "", start_date=None):
-        instance = cls(name=name, dosage=dosage, start_date=start_date, patient=patient)
+    def create(cls, session: OrmSession, patient, name: str, dosage: str = "", start_date=None, end_date=None):
+        cls._check_dates(start_date, end_date)
+        instance = cls(name=name, dosage=dosage, start_date=start_date, end_date=end_date, patient=patient)
         session.add(instance)
-        session.commit()
-        session.refresh(instance)
+        finish_write(session, instance)
         return instance
 
+    def stop(self, session: OrmSession, end_date: date = None):
+        """Record ``end_date`` (default today) as the last day this medication was taken."""
+        end_date = _day(end_date)
+        self._check_dates(self.start_date, end_date)
+        self.end_date = end_date
+        finish_write(session, self)
+        return self
+
     @classmethod
     def get_by_id(cls, session: OrmSession, id_: int):
         return session.get(cls, id_)
@@ -38,9 +119,120 @@ class Medication(Base):
         return session.query(cls).all()
 
     @classmethod
-    def find_by_name(cls, session: OrmSession, name: str):
-        return session.query(cls).filter(cls.name.ilike(f"%{name}%")).all()
+    def iter_all(cls, session: OrmSession, patient_id: int = None, after_id: int = None, limit: int = None,
+                 page_size: int = PAGE_SIZE, active_on: date = None):
+        """Yield pages of medications in ID order, optionally for one patient / active on a day."""
+        stmt = select(cls)
+        if patient_id is not None:
+            stmt = stmt.where(cls.patient_id == patient_id)
+        if active_on is not None:
+            stmt = stmt.where(active_clause(cls, _day(active_on)))
+        after = (after_id,) if after_id is not None else None
+        return iter_pages(session, stmt, [cls.id], after=after, limit=limit, page_size=page_size)
+
+    @classmethod
+    def find_by_name(cls, session: OrmSession, name: str, limit: int = SEARCH_LIMIT):
+        """Ranked prefix/substring/fuzzy name search (see ``models.name_search``)."""
+        return find_ranked(session, cls, name, limit)
+
+    # ----- Interval queries -----
+    @classmethod
+    def active_for_patient(cls, session: OrmSession, patient_id: int, at=None):
+        """Medications patient ``patient_id`` was taking at ``at`` (a date or datetime; default today)."""
+        return session.scalars(
+            select(cls)
+            .where(cls.patient_id == patient_id, active_clause(cls, _day(at)))
+            .order_by(cls.start_date, cls.id)
+        ).all()
+
+    @classmethod
+    def patients_on(cls, session: OrmSession, drug: str, at=None):
+        """Patients taking ``drug`` (case-insensitive exact name) at ``at``, by ID."""
+        from models.patient import Patient
+
+        on_drug = select(cls.patient_id).where(func.lower(cls.name) == drug.strip().lower(), active_clause(cls, _day(at)))
+        return session.scalars(select(Patient).where(Patient.id.in_(on_drug)).order_by(Patient.id)).all()
+
+    @classmethod
+    def readings_with_regimen(cls, session: OrmSession, patient_id: int = None, start: datetime = None,
+                              end: datetime = None, batch_size: int = PAGE_SIZE):
+        """Yield ``RegimenReading``s: each glucose reading with the medications active that day.
+
+        One streamed outer join in SQL (reading day within each prescription's
+        interval); rows for the same reading are folded together here.
+        """
+        day = day_of(session.get_bind().dialect.name, GlucoseLog.timestamp)
+        stmt = (
+            select(GlucoseLog.id, GlucoseLog.patient_id, GlucoseLog.timestamp, GlucoseLog.reading,
+                   cls.name, cls.dosage)
+            .outerjoin(cls, and_(cls.patient_id == GlucoseLog.patient_id, active_clause(cls, day)))
+            .where(GlucoseLog.timestamp.is_not(None))
+            .order_by(GlucoseLog.patient_id, GlucoseLog.timestamp, GlucoseLog.id, cls.name)
+            .execution_options(yield_per=batch_size)
+        )
+        if patient_id is not None:
+            stmt = stmt.where(GlucoseLog.patient_id == patient_id)
+        if start is not None:
+            stmt = stmt.where(GlucoseLog.timestamp >= start)
+        if end is not None:
+            stmt = stmt.where(GlucoseLog.timestamp < end)
+        current, regimen = None, []
+        for log_id, pid, ts, reading, name, dosage in session.execute(stmt):
+            if current is not None and current[0] != log_id:
+                yield RegimenReading(*current, tuple(regimen))
+                regimen = []
+            current = (log_id, pid, ts, reading)
+            if name is not None:
+                regimen.append(f"{name} {dosage}".strip() if dosage else name)
+        if current is not None:
+            yield RegimenReading(*current, tuple(regimen))
+
+    @classmethod
+    def outcomes_by_drug(cls, session: OrmSession, drug: str = None, start: datetime = None, end: datetime = None):
+        """``[DrugOutcome]``: glucose stats on vs. off each drug, aggregated in one SQL query.
+
+        For every drug, only patients who were ever prescribed it count; each
+        of their readings is "on" if some prescription of that drug covers
+        its day. Readings never leave the database.
+        """
+        prescribed = select(cls.patient_id, func.lower(cls.name).label("drug")).distinct()
+        if drug is not None:
+            prescribed = prescribed.where(func.lower(cls.name) == drug.strip().lower())
+        prescribed = prescribed.subquery()
+        other = aliased(cls)
+        day = day_of(session.get_bind().dialect.name, GlucoseLog.timestamp)
+        on = case((exists().where(other.patient_id == GlucoseLog.patient_id,
+                                  func.lower(other.name) == prescribed.c.drug,
+                                  active_clause(other, day)), 1), else_=0).label("on_drug")
+        in_range = case((GlucoseLog.reading.between(TARGET_LOW, TARGET_HIGH), 1), else_=0)
+        stmt = (
+            select(prescribed.c.drug, on, func.count(GlucoseLog.id), func.sum(GlucoseLog.reading),
+                   func.sum(GlucoseLog.reading * GlucoseLog.reading), func.min(GlucoseLog.reading),
+                   func.max(GlucoseLog.reading), func.sum(in_range))
+            .join(prescribed, prescribed.c.patient_id == GlucoseLog.patient_id)
+            .group_by(prescribed.c.drug, on)
+            .order_by(prescribed.c.drug)
+        )
+        window = []
+        if start is not None:
+            window.append(GlucoseLog.timestamp >= start)
+        if end is not None:
+            window.append(GlucoseLog.timestamp < end)
+        groups = {}
+        for name, on_drug, *sums in session.execute(stmt.where(*window)):
+            groups.setdefault(name, {})[bool(on_drug)] = GlucoseStats.from_sums(*sums)
+        has_readings = exists().where(GlucoseLog.patient_id == prescribed.c.patient_id, *window)
+        patients = dict(session.execute(
+            select(prescribed.c.drug, func.count(prescribed.c.patient_id)).where(has_readings).group_by(prescribed.c.drug)
+        ).all())
+        return [
+            DrugOutcome(name, patients.get(name, 0), split.get(True, GlucoseStats()), split.get(False, GlucoseStats()))
+            for name, split in groups.items()
+        ]
 
     def delete(self, session: OrmSession):
         session.delete(self)
-        session.commit()
+        finish_write(session)
+
+
+register_name_index(Medication.__table__)
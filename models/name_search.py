@@ -0,0 +1,206 @@
+"""Ranked, typo-tolerant name search backed by SQLite FTS5 trigram indexes.
+
+Each registered table ``t`` gets an external-content FTS5 table ``t_fts``
+over its ``name`` column, kept in sync by SQLite triggers so every write
+path (ORM, Core bulk inserts, raw SQL) updates the index. On other
+databases, or SQLite builds without FTS5/trigram, searches fall back to
+``ILIKE '%term%'``.
+"""
+import re
+
+from sqlalchemy import event, select, text
+from sqlalchemy.exc import OperationalError
+
+# Minimum share of the query's trigrams a fuzzy candidate must contain.
+FUZZY_THRESHOLD = 0.4
+FUZZY_CANDIDATES = 200
+NAME_INDEXED = []  # tables passed to register_name_index
+SHORT_CANDIDATES = 200  # prefix matches read for one- and two-letter terms
+
+
+def _fts(table_name: str) -> str:
+    return f"{table_name}_fts"
+
+
+def fts_ddl(table_name: str, column: str = "name"):
+    """Statements creating, wiring and populating the FTS index for a table."""
+    fts = _fts(table_name)
+    return [
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5({column}, content='{table_name}', "
+        f"content_rowid='id', tokenize='trigram')",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON {table_name} BEGIN "
+        f"INSERT INTO {fts}(rowid, {column}) VALUES (new.id, new.{column}); END",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON {table_name} BEGIN "
+        f"INSERT INTO {fts}({fts}, rowid, {column}) VALUES ('delete', old.id, old.{column}); END",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_au AFTER UPDATE OF {column} ON {table_name} BEGIN "
+        f"INSERT INTO {fts}({fts}, rowid, {column}) VALUES ('delete', old.id, old.{column}); "
+        f"INSERT INTO {fts}(rowid, {column}) VALUES (new.id, new.{column}); END",
+        f"INSERT INTO {fts}({fts}) VALUES ('rebuild')",
+    ]
+
+
+def register_name_index(table, column: str = "name"):
+    """Create/drop ``table``'s FTS index alongside the table itself."""
+    NAME_INDEXED.append((table, column))
+
+    @event.listens_for(table, "after_create")
+    def _create(target, connection, **kw):
+        if connection.dialect.name != "sqlite":
+            return
+        try:
+            for stmt in fts_ddl(target.name, column):
+                connection.exec_driver_sql(stmt)
+        except OperationalError:
+            # SQLite built without FTS5 or the trigram tokenizer (< 3.34): keep ILIKE search.
+            pass
+
+    @event.listens_for(table, "before_drop")
+    def _drop(target, connection, **kw):
+        if connection.dialect.name == "sqlite":
+            connection.exec_driver_sql(f"DROP TABLE IF EXISTS {_fts(target.name)}")
+
+
+def create_missing_name_indexes(connection) -> list:
+    """Build the FTS index of every registered table that exists without one.
+
+    ``after_create`` only fires for new tables; ``ensure_schema`` calls this
+    when it upgrades an existing SQLite database. Returns the tables indexed.
+    """
+    if connection.dialect.name != "sqlite":
+        return []
+    built = []
+    for table, column in NAME_INDEXED:
+        if not _has_table(connection, table.name) or _has_index(connection, table.name):
+            continue
+        try:
+            for stmt in fts_ddl(table.name, column):
+                connection.exec_driver_sql(stmt)
+        except OperationalError:
+            return built  # no FTS5/trigram in this SQLite build: searches keep using ILIKE
+        built.append(table.name)
+    return built
+
+
+def rebuild_name_index(session, table) -> bool:
+    """(Re)create and repopulate the index for ``table``; False if unsupported."""
+    connection = session.connection()
+    if connection.dialect.name != "sqlite":
+        return False
+    try:
+        for stmt in fts_ddl(table.name):
+            connection.exec_driver_sql(stmt)
+    except OperationalError:
+        session.rollback()
+        return False
+    session.commit()
+    return True
+
+
+def _has_table(connection, name: str) -> bool:
+    return connection.execute(
+        text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"), {"name": name}
+    ).first() is not None
+
+
+def _has_index(connection, table_name: str) -> bool:
+    if connection.dialect.name != "sqlite":
+        return False
+    return _has_table(connection, _fts(table_name))
+
+
+def _trigrams(value: str):
+    value = value.lower()
+    return {value[i:i + 3] for i in range(len(value) - 2)}
+
+
+def _phrase(value: str) -> str:
+    return '"' + value.replace('"', '""') + '"'
+
+
+FUZZY_TIER = 4
+
+
+def match_tier(name: str, term: str) -> int:
+    """Ranking tier of ``name`` for ``term``: 0 equal, 1 prefix, 2 word prefix, 3 substring, 4 other."""
+    lowered, needle = (name or "").lower(), term.strip().lower()
+    if lowered == needle:
+        return 0
+    if lowered.startswith(needle):
+        return 1
+    if any(word.startswith(needle) for word in lowered.split()):
+        return 2
+    if needle in lowered:
+        return 3
+    return FUZZY_TIER
+
+
+def search_ids(connection, table_name: str, term: str, limit: int):
+    """Row IDs whose name matches ``term``, best first, or None without an index.
+
+    Ranking tiers: whole name equal, name starts with the term, a word
+    starts with the term, term appears anywhere, then fuzzy matches (names
+    sharing at least ``FUZZY_THRESHOLD`` of the term's trigrams) by
+    similarity. Within a tier shorter names (higher bm25) come first.
+    """
+    if not _has_index(connection, table_name):
+        return None
+    term = re.sub(r"[%_]", "", term.strip())
+    if not term:
+        return []
+    fts = _fts(table_name)
+    needle = term.lower()
+    scored = {}
+
+    def consider(rows, fuzzy=False):
+        for order, (rowid, name) in enumerate(rows):
+            lowered = (name or "").lower()
+            if fuzzy:
+                grams = _trigrams(needle)
+                similarity = len(grams & _trigrams(lowered)) / len(grams)
+                if similarity < FUZZY_THRESHOLD:
+                    continue
+                key = (FUZZY_TIER, -similarity, order)
+            else:
+                tier = match_tier(lowered, needle)
+                if tier == FUZZY_TIER:
+                    continue
+                key = (tier, 0, order)
+            if rowid not in scored or key < scored[rowid]:
+                scored[rowid] = key
+
+    if len(needle) < 3:
+        # Trigram indexes need three characters. Short terms range-scan the
+        # lower(name) index instead (ix_<table>_name_lower): the first
+        # SHORT_CANDIDATES names with the prefix in index order, shortest first.
+        rows = connection.execute(
+            text(f"SELECT id, name FROM {table_name} WHERE lower(name) >= :low AND lower(name) < :high "
+                 f"ORDER BY lower(name) LIMIT :limit"),
+            {"low": needle, "high": needle[:-1] + chr(ord(needle[-1]) + 1),
+             "limit": max(limit, SHORT_CANDIDATES)},
+        ).all()
+        consider(sorted(rows, key=lambda row: len(row[1])))
+    else:
+        consider(connection.execute(
+            text(f"SELECT rowid, name FROM {fts} WHERE name LIKE :prefix LIMIT :limit"),
+            {"prefix": f"{term}%", "limit": limit},
+        ))
+        consider(connection.execute(
+            text(f"SELECT rowid, name FROM {fts} WHERE {fts} MATCH :q ORDER BY rank LIMIT :limit"),
+            {"q": _phrase(term), "limit": limit * 4},
+        ))
+        if len(scored) < limit:
+            grams = " OR ".join(_phrase(g) for g in sorted(_trigrams(needle)))
+            consider(connection.execute(
+                text(f"SELECT rowid, name FROM {fts} WHERE {fts} MATCH :q ORDER BY rank LIMIT :limit"),
+                {"q": grams, "limit": FUZZY_CANDIDATES},
+            ), fuzzy=True)
+    return [rowid for rowid, _ in sorted(scored.items(), key=lambda item: item[1])][:limit]
+
+
+def find_ranked(session, model, term: str, limit: int):
+    """Model instances matching ``term`` in ranked order (ILIKE fallback without FTS)."""
+    ids = search_ids(session.connection(), model.__tablename__, term, limit)
+    if ids is None:
+        return session.scalars(select(model).where(model.name.ilike(f"%{term}%")).limit(limit)).all()
+    by_id = {obj.id: obj for obj in session.scalars(select(model).where(model.id.in_(ids)))}
+    return [by_id[i] for i in ids if i in by_id]
@@ -1,7 +1,38 @@
 from db.setup import Base
-from sqlalchemy import Column, Integer, String, Date, CheckConstraint
-from sqlalchemy.orm import relationship, Session as OrmSession
-from datetime import date
+from db.pagination import iter_pages, PAGE_SIZE
+from db.unit_of_work import finish_write
+from models.name_search import find_ranked, register_name_index
+from sqlalchemy import Column, Integer, String, Date, CheckConstraint, Index, select, func, union_all
+from sqlalchemy.ext.hybrid import hybrid_property
+from sqlalchemy.orm import relationship, object_session, joinedload, selectinload, Session as OrmSession
+from models.glucose_log import GlucoseLog, GlucoseStats
+from models.glucose_rollup import GlucoseRollup, DAY
+from models.glucose_series import GlucoseSeries
+from datetime import date, datetime
+from typing import NamedTuple
+
+RECENT_LOGS = 10
+SEARCH_LIMIT = 50
+UNION_CHUNK = 500  # SQLite caps a compound SELECT at 500 terms
+
+
+def age_from(date_of_birth: date) -> int:
+    """Whole years since ``date_of_birth`` (0 if unknown)."""
+    if not date_of_birth:
+        return 0
+    today = date.today()
+    years = today.year - date_of_birth.year
+    if (today.month, today.day) < (date_of_birth.month, date_of_birth.day):
+        years -= 1
+    return years
+
+
+class PatientDashboard(NamedTuple):
+    patient: "Patient"
+    stats: GlucoseStats
+    recent_logs: list  # newest first
+    medications: list
+
 
 class Patient(Base):
     __tablename__ = 'patients'
@@ -13,36 +44,51 @@ class Patient(Base):
 
     glucose_logs = relationship("GlucoseLog", back_populates="patient", cascade="all, delete-orphan")
     medications = relationship("Medication", back_populates="patient", cascade="all, delete-orphan")
+    alerts = relationship("Alert", back_populates="patient", cascade="all, delete-orphan")
 
     __table_args__ = (
         CheckConstraint("length(name) > 0", name="ck_patient_name_nonempty"),
+        # One- and two-letter name searches: prefix range scans (models.name_search).
+        Index("ix_patients_name_lower", func.lower(name)),
     )
 
     # ----- Computed properties -----
     @property
     def age(self) -> int:
-        if not self.date_of_birth:
-            return 0
-        today = date.today()
-        years = today.year - self.date_of_birth.year
-        if (today.month, today.day) < (self.date_of_birth.month, self.date_of_birth.day):
-            years -= 1
-        return years
+        return age_from(self.date_of_birth)
 
-    @property
+    @hybrid_property
     def average_glucose(self) -> float:
-        if not self.glucose_logs:
-            return 0.0
-        total = sum(log.reading for log in self.glucose_logs)
-        return round(total / len(self.glucose_logs), 2)
+        session = object_session(self)
+        if session is None or self.id is None or "glucose_logs" in self.__dict__:
+            # Logs already in memory (or no database to ask): average them here.
+            if not self.glucose_logs:
+                return 0.0
+            total = sum(log.reading for log in self.glucose_logs)
+            return round(total / len(self.glucose_logs), 2)
+        return self.glucose_stats(session).average
+
+    @average_glucose.expression
+    def average_glucose(cls):
+        return (
+            select(func.coalesce(func.round(func.avg(GlucoseLog.reading), 2), 0.0))
+            .where(GlucoseLog.patient_id == cls.id)
+            .scalar_subquery()
+        )
+
+    def glucose_stats(self, session: OrmSession) -> GlucoseStats:
+        return GlucoseRollup.stats_by_patient(session, [self.id]).get(self.id, GlucoseStats())
+
+    def glucose_series(self, session: OrmSession, start: datetime = None, end: datetime = None) -> GlucoseSeries:
+        """The patient's readings as a compact array-backed series, without loading ``glucose_logs``."""
+        return GlucoseSeries.load(session, self.id, start, end)
 
     # ----- ORM helper methods -----
     @classmethod
     def create(cls, session: OrmSession, name: str, date_of_birth: date, contact: str = ""):
         instance = cls(name=name, date_of_birth=date_of_birth, contact=contact)
         session.add(instance)
-        session.commit()
-        session.refresh(instance)
+        finish_write(session, instance)
         return instance
 
     @classmethod
@@ -54,9 +100,101 @@ class Patient(Base):
         return session.query(cls).all()
 
     @classmethod
-    def find_by_name(cls, session: OrmSession, name: str):
-        return session.query(cls).filter(cls.name.ilike(f"%{name}%")).all()
+    def iter_all(cls, session: OrmSession, after_id: int = None, limit: int = None, page_size: int = PAGE_SIZE):
+        """Yield pages of patients in ID order without loading the whole table."""
+        after = (after_id,) if after_id is not None else None
+        return iter_pages(session, select(cls), [cls.id], after=after, limit=limit, page_size=page_size)
+
+    @classmethod
+    def dashboard(cls, session: OrmSession, id_: int, recent: int = RECENT_LOGS):
+        """Everything the patient detail view shows, without loading full history.
+
+        One statement fetches the patient, their medications (joined) and
+        glucose stats (aggregated from daily rollups); a second fetches the
+        ``recent`` newest logs via the (patient_id, timestamp) index.
+        Returns ``None`` if the patient does not exist.
+        """
+        sums = (
+            select(GlucoseRollup.patient_id, *GlucoseRollup.sum_columns())
+            .where(GlucoseRollup.patient_id == id_, GlucoseRollup.granularity == DAY)
+            .group_by(GlucoseRollup.patient_id)
+            .subquery()
+        )
+        stmt = (
+            select(cls, *list(sums.c)[1:])
+            .outerjoin(sums, sums.c.patient_id == cls.id)
+            .options(joinedload(cls.medications))
+            .where(cls.id == id_)
+        )
+        row = session.execute(stmt).unique().one_or_none()
+        if row is None:
+            return None
+        patient, *totals = row
+        recent_logs = session.scalars(
+            select(GlucoseLog)
+            .where(GlucoseLog.patient_id == id_)
+            .order_by(GlucoseLog.timestamp.desc(), GlucoseLog.id.desc())
+            .limit(recent)
+        ).all()
+        medications = sorted(patient.medications, key=lambda m: (m.start_date or date.min, m.id))
+        return PatientDashboard(patient, GlucoseStats.from_sums(*totals), recent_logs, medications)
+
+    @classmethod
+    def dashboards(cls, session: OrmSession, ids, recent: int = RECENT_LOGS) -> dict:
+        """``dashboard`` for many patients at once: ``{id: PatientDashboard}`` for those that exist.
+
+        Patients with their rollup stats, their medications (selectin), and
+        the recent logs as ``UNION ALL``s of per-patient ``LIMIT`` scans (so
+        a patient's full history is never read), ``UNION_CHUNK`` patients per
+        statement. Recent logs are Core rows with ``id``, ``reading`` and
+        ``timestamp``.
+        """
+        ids = list(dict.fromkeys(ids))
+        if not ids:
+            return {}
+        sums = (
+            select(GlucoseRollup.patient_id, *GlucoseRollup.sum_columns())
+            .where(GlucoseRollup.patient_id.in_(ids), GlucoseRollup.granularity == DAY)
+            .group_by(GlucoseRollup.patient_id)
+            .subquery()
+        )
+        stmt = (
+            select(cls, *list(sums.c)[1:])
+            .outerjoin(sums, sums.c.patient_id == cls.id)
+            .options(selectinload(cls.medications))
+            .where(cls.id.in_(ids))
+        )
+        rows = session.execute(stmt).all()
+        recent_logs = {}
+        if rows and recent > 0:
+            per_patient = [
+                select(GlucoseLog.id, GlucoseLog.patient_id, GlucoseLog.reading, GlucoseLog.timestamp)
+                .where(GlucoseLog.patient_id == patient.id)
+                .order_by(GlucoseLog.timestamp.desc(), GlucoseLog.id.desc())
+                .limit(recent)
+                .subquery()
+                for patient, *_ in rows
+            ]
+            for i in range(0, len(per_patient), UNION_CHUNK):
+                chunk = per_patient[i:i + UNION_CHUNK]
+                logs = union_all(*[select(sub) for sub in chunk]) if len(chunk) > 1 else select(chunk[0])
+                for log in session.execute(logs):
+                    recent_logs.setdefault(log.patient_id, []).append(log)
+        boards = {}
+        for patient, *totals in rows:
+            medications = sorted(patient.medications, key=lambda m: (m.start_date or date.min, m.id))
+            boards[patient.id] = PatientDashboard(patient, GlucoseStats.from_sums(*totals),
+                                                  recent_logs.get(patient.id, []), medications)
+        return boards
+
+    @classmethod
+    def find_by_name(cls, session: OrmSession, name: str, limit: int = SEARCH_LIMIT):
+        """Ranked prefix/substring/fuzzy name search (see ``models.name_search``)."""
+        return find_ranked(session, cls, name, limit)
 
     def delete(self, session: OrmSession):
         session.delete(self)
-        session.commit()
+        finish_write(session)
+
+
+register_name_index(Patient.__table__)
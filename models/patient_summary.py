@@ -0,0 +1,195 @@
+"""Read-through cache of per-patient summaries.
+
+``patient_summary`` backs the detail view ("View related", ``view-patient``,
+the daemon's ``lookup``), ``patient_summaries`` its many-patient form (the
+``batch`` command) and ``stats_by_patient`` the patient list. Entries
+are plain tuples so they can be pickled to the optional disk tier (see
+``db.cache``). Any insert, update or delete of a patient, one of their
+medications or glucose logs -- including ``GlucoseLog.bulk_create`` --
+invalidates that patient's entries when the outermost transaction ends.
+"""
+from datetime import date, datetime
+from typing import NamedTuple, Optional
+
+from sqlalchemy import event
+from sqlalchemy.orm import attributes, object_session, Session as OrmSession
+
+from db.cache import TTLCache
+from models.glucose_log import GlucoseLog, GlucoseStats
+from models.glucose_rollup import GlucoseRollup
+from models.medication import Medication, status_on
+from models.patient import Patient, RECENT_LOGS, age_from
+
+KINDS = ("summary", "stats")
+_DIRTY = "patient_summary_dirty"  # session.info key: patient IDs written in this transaction
+_NO_FILL = "patient_summary_no_fill"  # session.info key: read the cache but never populate it
+
+summary_cache = TTLCache.from_env()
+
+
+class LogLine(NamedTuple):
+    id: int
+    reading: float
+    timestamp: datetime
+
+
+class MedicationLine(NamedTuple):
+    id: int
+    name: str
+    dosage: str
+    start_date: Optional[date]
+    end_date: Optional[date] = None
+
+    @property
+    def status(self) -> str:
+        # Computed when shown, so a cached summary never reports yesterday's status.
+        return status_on(self.start_date, self.end_date)
+
+
+class PatientSummary(NamedTuple):
+    id: int
+    name: str
+    date_of_birth: date
+    contact: str
+    stats: GlucoseStats
+    recent_logs: tuple  # LogLine, newest first
+    medications: tuple  # MedicationLine, by start date
+
+    @property
+    def age(self) -> int:
+        return age_from(self.date_of_birth)
+
+    @classmethod
+    def from_dashboard(cls, board) -> "PatientSummary":
+        p = board.patient
+        return cls(
+            p.id, p.name, p.date_of_birth, p.contact, board.stats,
+            tuple(LogLine(g.id, g.reading, g.timestamp) for g in board.recent_logs),
+            tuple(MedicationLine(m.id, m.name, m.dosage, m.start_date, m.end_date) for m in board.medications),
+        )
+
+
+def _key(kind: str, patient_id: int) -> str:
+    return f"{kind}:{patient_id}"
+
+
+def _dirty(session) -> set:
+    # Patients written in the session's open transaction: their cached entries
+    # are stale for this session, and what it reads must not be cached.
+    return session.info.get(_DIRTY, set())
+
+
+def _fills(session) -> bool:
+    return not session.info.get(_NO_FILL)
+
+
+def disable_fill(session):
+    """Stop ``session``'s reads from populating the cache; it still reads cached entries.
+
+    For sessions that interleave reads with uncommitted writes in long
+    transactions (``batch``), where what they read may yet be rolled back.
+    """
+    session.info[_NO_FILL] = True
+
+
+def patient_summary(session: OrmSession, patient_id: int, recent: int = RECENT_LOGS) -> Optional[PatientSummary]:
+    """Summary for the detail view, or None if the patient does not exist.
+
+    Only the default ``recent`` window is cached; other sizes go to the database.
+    """
+    if recent != RECENT_LOGS or patient_id in _dirty(session):
+        board = Patient.dashboard(session, patient_id, recent=recent)
+        return PatientSummary.from_dashboard(board) if board else None
+    key = _key("summary", patient_id)
+    summary = summary_cache.get(key)
+    if summary is None:
+        token = summary_cache.token()
+        board = Patient.dashboard(session, patient_id)
+        if board is None:
+            return None
+        summary = PatientSummary.from_dashboard(board)
+        if _fills(session):
+            summary_cache.put(key, summary, token)
+    return summary
+
+
+def patient_summaries(session: OrmSession, patient_ids, recent: int = RECENT_LOGS) -> dict:
+    """``patient_summary`` for many patients: ``{id: PatientSummary}`` for those that exist.
+
+    Cache misses are fetched together with ``Patient.dashboards``.
+    """
+    ids = list(dict.fromkeys(patient_ids))
+    dirty = _dirty(session)
+    summaries = {}
+    if recent == RECENT_LOGS:
+        keys = {_key("summary", pid): pid for pid in ids if pid not in dirty}
+        summaries = {keys[key]: value for key, value in summary_cache.get_many(list(keys)).items()}
+    missing = [pid for pid in ids if pid not in summaries]
+    if missing:
+        token = summary_cache.token()
+        fresh = {pid: PatientSummary.from_dashboard(board)
+                 for pid, board in Patient.dashboards(session, missing, recent).items()}
+        if recent == RECENT_LOGS and _fills(session):
+            summary_cache.put_many(((_key("summary", pid), s) for pid, s in fresh.items() if pid not in dirty), token)
+        summaries.update(fresh)
+    return summaries
+
+
+def stats_by_patient(session: OrmSession, patient_ids) -> dict:
+    """Cached drop-in for ``GlucoseRollup.stats_by_patient``; misses are fetched in one query."""
+    dirty = _dirty(session)
+    keys = {_key("stats", pid): pid for pid in patient_ids if pid not in dirty}
+    cached = summary_cache.get_many(list(keys))
+    stats = {keys[key]: value for key, value in cached.items()}
+    missing = [pid for pid in patient_ids if pid not in stats]
+    if missing:
+        token = summary_cache.token()
+        fresh = GlucoseRollup.stats_by_patient(session, missing)
+        computed = {pid: fresh.get(pid, GlucoseStats()) for pid in missing}
+        if _fills(session):
+            summary_cache.put_many(((_key("stats", pid), s) for pid, s in computed.items() if pid not in dirty),
+                                   token)
+        stats.update(computed)
+    return stats
+
+
+def invalidate(patient_ids):
+    """Drop cached entries for ``patient_ids`` (e.g. after writes that bypass the ORM)."""
+    summary_cache.invalidate([_key(kind, pid) for pid in set(patient_ids) for kind in KINDS])
+
+
+def _owner_ids(target):
+    if isinstance(target, Patient):
+        return {target.id}
+    # A log or medication moved to another patient changes both summaries.
+    return {target.patient_id, *attributes.get_history(target, "patient_id").deleted}
+
+
+def _mark_dirty(mapper, connection, target):
+    session = object_session(target)
+    if session is not None:
+        session.info.setdefault(_DIRTY, set()).update(pid for pid in _owner_ids(target) if pid is not None)
+
+
+for _model in (Patient, GlucoseLog, Medication):
+    for _name in ("after_insert", "after_update", "after_delete"):
+        event.listen(_model, _name, _mark_dirty)
+
+
+@event.listens_for(OrmSession, "after_transaction_end")
+def _invalidate_dirty(session, transaction):
+    # Invalidate when the outermost transaction ends, not at flush or at a
+    # SAVEPOINT release: a value cached from this session's own uncommitted
+    # state must not outlive the transaction.
+    if transaction.parent is not None:
+        return
+    dirty = session.info.pop(_DIRTY, None)
+    if dirty:
+        invalidate(dirty)
+
+
+def _mark_dirty_bulk(session, rows):
+    session.info.setdefault(_DIRTY, set()).update(r["patient_id"] for r in rows)
+
+
+GlucoseLog.bulk_insert_hooks.append(_mark_dirty_bulk)
@@ -0,0 +1,83 @@
+"""Queries that span every shard (see ``db.shards``), merged into one answer.
+
+Each function sends the same per-shard query through
+``ShardRouter.fan_out`` and combines the results. Stats travel as additive
+sums (count, sum, sum of squares, min, max, in-range) so the cohort
+figures are exact, not an average of averages.
+"""
+from datetime import date, datetime
+from typing import NamedTuple
+
+from sqlalchemy import select, func
+
+from models.glucose_log import GlucoseStats
+from models.glucose_rollup import GlucoseRollup, DAY
+from models.patient import Patient, SEARCH_LIMIT
+from models.name_search import match_tier
+
+
+class ShardPatient(NamedTuple):
+    shard: str
+    id: int
+    name: str
+    date_of_birth: date
+    contact: str
+
+
+class ShardSummary(NamedTuple):
+    shard: str
+    patients: int
+    stats: GlucoseStats
+
+
+def merge_sums(parts):
+    """Combine ``[count, sum, sum_sq, min, max, in_range]`` lists from several shards."""
+    totals = [0, 0.0, 0.0, None, None, 0]
+    for n, total, total_sq, low, high, in_range in parts:
+        if not n:
+            continue
+        totals[0] += n
+        totals[1] += total
+        totals[2] += total_sq
+        totals[3] = low if totals[3] is None else min(totals[3], low)
+        totals[4] = high if totals[4] is None else max(totals[4], high)
+        totals[5] += in_range
+    return totals
+
+
+def _glucose_sums(session, start: datetime = None, end: datetime = None):
+    if start is not None or end is not None:
+        return GlucoseRollup.window_sums(session, start or datetime.min, end or datetime.max)
+    row = session.execute(select(*GlucoseRollup.sum_columns()).where(GlucoseRollup.granularity == DAY)).one()
+    return list(row)
+
+
+def cohort_stats(router, start: datetime = None, end: datetime = None, shards=None):
+    """``(GlucoseStats for all shards, [ShardSummary])`` from the rollups, one query set per shard."""
+
+    def per_shard(session):
+        return session.scalar(select(func.count(Patient.id))), _glucose_sums(session, start, end)
+
+    results = router.fan_out(per_shard, shards)
+    summaries = [ShardSummary(name, patients, GlucoseStats.from_sums(*sums))
+                 for name, (patients, sums) in results.items()]
+    return GlucoseStats.from_sums(*merge_sums(sums for _, sums in results.values())), summaries
+
+
+def find_patients(router, term: str, limit: int = SEARCH_LIMIT, shards=None):
+    """Ranked name search across shards: ``[ShardPatient]``, best matches first.
+
+    Every shard returns its own top ``limit``; the merge orders them by
+    match tier (exact, prefix, word prefix, substring, fuzzy), then each
+    shard's own rank, then shard order.
+    """
+
+    def per_shard(session):
+        return [(p.id, p.name, p.date_of_birth, p.contact) for p in Patient.find_by_name(session, term, limit)]
+
+    ranked = []
+    for shard_order, (name, rows) in enumerate(router.fan_out(per_shard, shards).items()):
+        for rank, row in enumerate(rows):
+            ranked.append(((match_tier(row[1], term), rank, shard_order), ShardPatient(name, *row)))
+    ranked.sort(key=lambda item: item[0])
+    return [patient for _, patient in ranked[:limit]]